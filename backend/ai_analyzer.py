@@ -4,10 +4,30 @@ Analyzes attacks and provides AI-powered defense recommendations
 """
 
 import os
+import json
+import copy
+import time
+import asyncio
 import httpx
-from typing import Dict, Any, Optional, List
+from contextlib import aclosing
+from typing import Dict, Any, Optional, List, Callable, Set, AsyncIterator, Tuple
 from dotenv import load_dotenv
 
+from analysis_cache import AnalysisCache, attack_fingerprint
+from micro_batcher import MicroBatcher
+from circuit_breaker import CircuitBreaker
+from json_stream import JSONStreamParser, extract_json
+from llm_accounting import LLMAccounting
+from provider_limiter import (
+    ProviderLimiter, PRIORITY_DECISION, PRIORITY_RECOMMENDATION, retry_after_seconds, backoff_delay
+)
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 load_dotenv()
 
 # Cursor AI API Configuration
@@ -18,6 +38,100 @@ CURSOR_API_KEY = os.getenv("CURSOR_API_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_API_URL = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1")
 
+# Shared HTTP client pool settings
+# HTTP/2 by default when h2 (httpx[http2]) is installed
+AI_HTTP2 = os.getenv("AI_HTTP2", str(HTTP2_AVAILABLE)).lower() == "true"
+if AI_HTTP2 and not HTTP2_AVAILABLE:
+    print("AI_HTTP2 is set but the h2 package is not installed (pip install httpx[http2]); using HTTP/1.1")
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "20"))
+AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+AI_KEEPALIVE_EXPIRY = float(os.getenv("AI_KEEPALIVE_EXPIRY", "60"))
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "5"))
+AI_ANALYSIS_TIMEOUT = float(os.getenv("AI_ANALYSIS_TIMEOUT", "30"))
+AI_RECOMMENDATION_TIMEOUT = float(os.getenv("AI_RECOMMENDATION_TIMEOUT", "30"))
+
+# Analysis cache keyed by attack fingerprint (AI_CACHE_PATH enables the on-disk tier)
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "1024"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "900"))
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "")
+
+# Micro-batching of concurrent analyses into one completion (AI_BATCH_WINDOW_MS=0 disables it)
+AI_BATCH_WINDOW_MS = float(os.getenv("AI_BATCH_WINDOW_MS", "0"))
+AI_BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "8"))
+AI_BATCH_MAX_TOKENS = int(os.getenv("AI_BATCH_MAX_TOKENS", "4000"))
+
+# Circuit breaker around the LLM path
+AI_BREAKER_WINDOW = float(os.getenv("AI_BREAKER_WINDOW", "60"))
+AI_BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "10"))
+AI_BREAKER_ERROR_RATE = float(os.getenv("AI_BREAKER_ERROR_RATE", "0.5"))
+AI_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("AI_BREAKER_SLOW_CALL_SECONDS", "10"))
+AI_BREAKER_SLOW_CALL_RATE = float(os.getenv("AI_BREAKER_SLOW_CALL_RATE", "0.5"))
+AI_BREAKER_OPEN_SECONDS = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30"))
+
+# Provider limits (0 disables a bucket); 429/503 and transport errors are retried within the call timeout
+AI_REQUESTS_PER_MINUTE = float(os.getenv("AI_REQUESTS_PER_MINUTE", "500"))
+AI_TOKENS_PER_MINUTE = float(os.getenv("AI_TOKENS_PER_MINUTE", "150000"))
+AI_MAX_CONCURRENT_REQUESTS = int(os.getenv("AI_MAX_CONCURRENT_REQUESTS", "10"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))
+AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", "8"))
+
+RETRYABLE_STATUS = (429, 503)
+
+# Cost per 1k tokens (for accounting) and rolling one-hour budgets; 0 disables a budget
+AI_COST_PER_1K_PROMPT_TOKENS = float(os.getenv("AI_COST_PER_1K_PROMPT_TOKENS", "0"))
+AI_COST_PER_1K_COMPLETION_TOKENS = float(os.getenv("AI_COST_PER_1K_COMPLETION_TOKENS", "0"))
+AI_HOURLY_TOKEN_BUDGET = int(os.getenv("AI_HOURLY_TOKEN_BUDGET", "0"))
+AI_HOURLY_COST_BUDGET = float(os.getenv("AI_HOURLY_COST_BUDGET", "0"))
+
+# Time a blocking decision waits for the LLM before using the rule-based answer (0 waits for the LLM)
+AI_DECISION_BUDGET_MS = float(os.getenv("AI_DECISION_BUDGET_MS", "2000"))
+
+# Rule-based tables, shared with the vectorized batch scorer (ddos threat depends on intensity)
+RULE_THREAT_LEVELS = {
+    'sql_injection': 'Critical',
+    'xss': 'High',
+    'brute_force': 'Medium',
+    'port_scan': 'Low',
+    'phishing': 'Medium'
+}
+
+RULE_RECOMMENDED_DEFENSES = {
+    'ddos': ['rate_limiting', 'firewall', 'ai_detection'],
+    'sql_injection': ['ids', 'ai_detection', 'firewall'],
+    'xss': ['ids', 'ai_detection'],
+    'brute_force': ['rate_limiting', 'firewall'],
+    'port_scan': ['firewall', 'ids'],
+    'phishing': ['ai_detection', 'behavioral_analysis']
+}
+
+HIGH_DAMAGE_ATTACKS = ('sql_injection', 'ddos')
+
+# Threat level -> (active recommended defenses needed to block, confidence)
+BLOCK_THRESHOLDS = {
+    'Critical': (0, 0.95),
+    'High': (1, 0.85),
+    'Medium': (2, 0.70)
+}
+DEFAULT_BLOCK_THRESHOLD = (3, 0.60)
+
+RECOMMENDATION_SYSTEM_PROMPT = "You are a cybersecurity expert providing defense recommendations."
+RECOMMENDATION_PRIORITIES = ("Low", "Medium", "High")
+
+ANALYSIS_SYSTEM_PROMPT = "You are a cybersecurity expert analyzing attack patterns."
+
+ANALYSIS_SCHEMA = """{
+    "attack_classification": "string",
+    "threat_level": "Low|Medium|High|Critical",
+    "recommended_defenses": ["defense1", "defense2"],
+    "characteristics": {
+        "pattern": "string",
+        "sophistication": "Low|Medium|High",
+        "potential_damage": "string"
+    },
+    "confidence": 0.0-1.0
+}"""
+
 
 class AIAnalyzer:
     """AI-powered attack and defense analyzer using Cursor AI API"""
@@ -26,6 +140,332 @@ class AIAnalyzer:
         self.api_key = CURSOR_API_KEY or OPENAI_API_KEY
         self.api_url = CURSOR_API_URL if CURSOR_API_KEY else OPENAI_API_URL
         self.model = "gpt-4" if OPENAI_API_KEY else "cursor-gpt-4"
+        self._client: Optional[httpx.AsyncClient] = None
+        # In-flight LLM calls keyed by attack fingerprint, shared by identical concurrent requests
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced_requests = 0
+        self.cache = AnalysisCache(AI_CACHE_SIZE, AI_CACHE_TTL, AI_CACHE_PATH or None)
+        self.batcher: Optional[MicroBatcher] = None
+        if AI_BATCH_WINDOW_MS > 0 and AI_BATCH_MAX_ITEMS > 1:
+            self.batcher = MicroBatcher(self._analyze_batch, AI_BATCH_WINDOW_MS / 1000, AI_BATCH_MAX_ITEMS)
+        self.breaker = CircuitBreaker(
+            window_seconds=AI_BREAKER_WINDOW,
+            min_calls=AI_BREAKER_MIN_CALLS,
+            error_rate=AI_BREAKER_ERROR_RATE,
+            slow_call_seconds=AI_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate=AI_BREAKER_SLOW_CALL_RATE,
+            open_seconds=AI_BREAKER_OPEN_SECONDS
+        )
+        self.limiter = ProviderLimiter(
+            "cursor" if CURSOR_API_KEY else "openai",
+            AI_REQUESTS_PER_MINUTE,
+            AI_TOKENS_PER_MINUTE,
+            AI_MAX_CONCURRENT_REQUESTS
+        )
+        self.retries = 0
+        self.accounting = LLMAccounting(
+            AI_COST_PER_1K_PROMPT_TOKENS,
+            AI_COST_PER_1K_COMPLETION_TOKENS,
+            AI_HOURLY_TOKEN_BUDGET,
+            AI_HOURLY_COST_BUDGET
+        )
+        # (summary signature + active defenses, recommendation) of the last AI recommendation
+        self._recommendation: Optional[Tuple[str, Dict[str, Any]]] = None
+        # LLM analyses still running after their decision budget ran out
+        self._late: Set[asyncio.Task] = set()
+        self.budget_fallbacks = 0
+        self.late_results = 0
+    
+    async def start(self):
+        """Create the long-lived pooled HTTP client (called on app startup)"""
+        if self._client is not None:
+            return
+        await asyncio.to_thread(self.cache.open)
+        self._client = httpx.AsyncClient(
+            base_url=self.api_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            http2=AI_HTTP2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=AI_MAX_CONNECTIONS,
+                max_keepalive_connections=AI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=AI_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(AI_ANALYSIS_TIMEOUT, connect=AI_CONNECT_TIMEOUT)
+        )
+    
+    async def aclose(self):
+        """Close pooled connections (called on app shutdown)"""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+        self.cache.close()
+    
+    async def invalidate_cache(self):
+        """Drop cached analyses and recommendations, e.g. after the defense configuration changed
+
+        Calls still in flight finish for their callers but are not cached, and
+        new requests no longer join them.
+        """
+        self._recommendation = None
+        self._inflight.clear()
+        await self.cache.invalidate()
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        # Used outside the app lifecycle (scripts, tests): start lazily
+        if self._client is None:
+            await self.start()
+        return self._client
+    
+    def _completion_model(self) -> str:
+        return self.model if CURSOR_API_KEY else "gpt-4-turbo-preview"
+    
+    async def _chat_completion(
+        self,
+        system_prompt: str,
+        prompt: str,
+        timeout: float,
+        max_tokens: int = 500,
+        priority: int = PRIORITY_DECISION,
+        purpose: str = "analysis"
+    ) -> Optional[str]:
+        """Send a chat completion over the shared client; returns the message content or None
+
+        Returns None without calling out while the hourly budget is spent or the
+        circuit breaker is open. Calls queue by priority for the provider limiter,
+        and 429/503 responses are retried (honouring Retry-After) until `timeout`
+        runs out.
+        """
+        if not self._may_call():
+            return None
+        client = await self._get_client()
+        started = time.monotonic()
+        deadline = started + timeout
+        # Rough prompt size (~4 characters per token) plus the completion budget
+        prompt_estimate = (len(system_prompt) + len(prompt)) // 4
+        estimated_tokens = prompt_estimate + max_tokens
+        payload = {
+            "model": self._completion_model(),
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3,
+            "max_tokens": max_tokens
+        }
+        
+        attempt = 0
+        while True:
+            try:
+                await self.limiter.acquire(priority, estimated_tokens, deadline)
+            except asyncio.TimeoutError:
+                # Queued behind our own provider limits: says nothing about the provider's health
+                self.breaker.record_skipped()
+                self.accounting.record_fallback("rate_limited")
+                return None
+            
+            actual_tokens = None
+            retry_delay = None
+            try:
+                response = await client.post(
+                    "/chat/completions",
+                    json=payload,
+                    timeout=httpx.Timeout(max(0.001, deadline - time.monotonic()), connect=AI_CONNECT_TIMEOUT)
+                )
+                if response.status_code == 200:
+                    result = response.json()
+                    actual_tokens = (result.get("usage") or {}).get("total_tokens")
+                elif response.status_code in RETRYABLE_STATUS:
+                    retry_delay = retry_after_seconds(response.headers.get("Retry-After"))
+                    if retry_delay is not None:
+                        # The provider says when quota is back: hold every queued call until then
+                        self.limiter.pause(retry_delay)
+            except httpx.TransportError as e:
+                if isinstance(e, httpx.TimeoutException) or attempt >= AI_MAX_RETRIES:
+                    self.breaker.record_failure(time.monotonic() - started)
+                    status = "timeout" if isinstance(e, httpx.TimeoutException) else "transport_error"
+                    self._account_call(purpose, started, status, prompt_estimate, retries=attempt)
+                    raise
+                response = None
+            except BaseException as e:
+                self.breaker.record_failure(time.monotonic() - started)
+                status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+                self._account_call(purpose, started, status, prompt_estimate, retries=attempt)
+                raise
+            finally:
+                self.limiter.release(actual_tokens, estimated_tokens)
+            
+            if response is not None and response.status_code not in RETRYABLE_STATUS:
+                break
+            if attempt >= AI_MAX_RETRIES:
+                break
+            if retry_delay is None:
+                retry_delay = backoff_delay(attempt, AI_RETRY_BASE_DELAY, AI_RETRY_MAX_DELAY)
+            else:
+                # Spread the callers that were told the same Retry-After
+                retry_delay += backoff_delay(0, AI_RETRY_BASE_DELAY, AI_RETRY_BASE_DELAY)
+            if time.monotonic() + retry_delay >= deadline:
+                break
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(retry_delay)
+        
+        latency = time.monotonic() - started
+        if response is None or response.status_code != 200:
+            self.breaker.record_failure(latency)
+            status = "transport_error" if response is None else f"http_{response.status_code}"
+            self._account_call(purpose, started, status, prompt_estimate, retries=attempt)
+            return None
+        self.breaker.record_success(latency)
+        content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+        self._account_call(purpose, started, "ok", prompt_estimate, result.get("usage"), len(content or ""), attempt)
+        return content
+    
+    def _may_call(self) -> bool:
+        """Budget and circuit breaker check before any provider call"""
+        if self.accounting.budget_exhausted():
+            # Hourly budget spent: rule-based mode until usage drops out of the window
+            self.accounting.record_fallback("budget_exhausted")
+            return False
+        if not self.breaker.allow():
+            self.accounting.record_fallback("circuit_open")
+            return False
+        return True
+    
+    def _account_call(
+        self,
+        purpose: str,
+        started: float,
+        status: str,
+        prompt_estimate: int,
+        usage: Optional[Dict[str, Any]] = None,
+        completion_chars: int = 0,
+        retries: int = 0
+    ):
+        """Record a provider call; token counts come from `usage`, else are estimated from character counts"""
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        self.accounting.record_call(
+            purpose,
+            self._completion_model(),
+            prompt_estimate if prompt_tokens is None else prompt_tokens,
+            completion_chars // 4 if completion_tokens is None else completion_tokens,
+            time.monotonic() - started,
+            status,
+            estimated=prompt_tokens is None or completion_tokens is None,
+            retries=retries
+        )
+    
+    @staticmethod
+    def _parse_json_content(content: str) -> Any:
+        """Parse the first JSON value in a completion (markdown code fences and prose are skipped)"""
+        return extract_json(content)
+    
+    async def _chat_completion_stream(
+        self,
+        system_prompt: str,
+        prompt: str,
+        timeout: float,
+        max_tokens: int = 500,
+        priority: int = PRIORITY_DECISION,
+        purpose: str = "recommendations_stream"
+    ) -> AsyncIterator[str]:
+        """Streamed chat completion: yields content deltas as they arrive
+
+        Goes through the circuit breaker and provider limiter like `_chat_completion`,
+        but is not retried: a failed stream yields nothing. Streamed token counts
+        are estimated from the text length.
+        """
+        if not self._may_call():
+            return
+        client = await self._get_client()
+        started = time.monotonic()
+        deadline = started + timeout
+        prompt_estimate = (len(system_prompt) + len(prompt)) // 4
+        estimated_tokens = prompt_estimate + max_tokens
+        try:
+            await self.limiter.acquire(priority, estimated_tokens, deadline)
+        except asyncio.TimeoutError:
+            self.breaker.record_skipped()
+            self.accounting.record_fallback("rate_limited")
+            return
+        
+        ok = False
+        status = "transport_error"
+        completion_chars = 0
+        try:
+            async with client.stream(
+                "POST",
+                "/chat/completions",
+                json={
+                    "model": self._completion_model(),
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.3,
+                    "max_tokens": max_tokens,
+                    "stream": True
+                },
+                timeout=httpx.Timeout(max(0.001, deadline - time.monotonic()), connect=AI_CONNECT_TIMEOUT)
+            ) as response:
+                status = "ok" if response.status_code == 200 else f"http_{response.status_code}"
+                if response.status_code != 200:
+                    if response.status_code in RETRYABLE_STATUS:
+                        retry_delay = retry_after_seconds(response.headers.get("Retry-After"))
+                        if retry_delay is not None:
+                            self.limiter.pause(retry_delay)
+                    return
+                ok = True
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    delta = ((chunk.get("choices") or [{}])[0].get("delta") or {}).get("content")
+                    if delta:
+                        completion_chars += len(delta)
+                        yield delta
+        except httpx.HTTPError as e:
+            ok = False
+            status = "timeout" if isinstance(e, httpx.TimeoutException) else "transport_error"
+            raise
+        finally:
+            self.limiter.release(None, estimated_tokens)
+            latency = time.monotonic() - started
+            if ok:
+                self.breaker.record_success(latency)
+            else:
+                self.breaker.record_failure(latency)
+            self._account_call(purpose, started, status, prompt_estimate, completion_chars=completion_chars)
+    
+    async def _single_flight(self, key: str, factory) -> Any:
+        """Run factory() once per key; concurrent callers await the same call"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced_requests += 1
+            # Callers get their own copy so later mutations don't leak between attacks
+            return copy.deepcopy(await asyncio.shield(task))
+        
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        
+        def forget(_):
+            # Only this task's entry: after an invalidation a newer call may hold the key
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        
+        task.add_done_callback(forget)
+        # Shielded: cancelling this caller must not cancel the call for the others
+        return copy.deepcopy(await asyncio.shield(task))
     
     async def analyze_attack_pattern(self, attack_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze attack pattern using AI"""
@@ -33,7 +473,74 @@ class AIAnalyzer:
             # Fallback to rule-based analysis if no API key
             return self._rule_based_analysis(attack_data)
         
-        prompt = f"""
+        fingerprint = attack_fingerprint(attack_data)
+        cached = await self.cache.get(fingerprint)
+        if cached is not None:
+            self.accounting.record_cache_hit("analysis")
+            return cached
+        
+        return await self._single_flight(
+            fingerprint, lambda: self._analyze_with_llm(attack_data, fingerprint)
+        )
+    
+    async def analyze_within_budget(
+        self,
+        attack_data: Dict[str, Any],
+        on_late_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Analysis for a blocking decision, bounded by AI_DECISION_BUDGET_MS
+
+        If the LLM has not answered in time the rule-based analysis is returned
+        (marked provisional) and the LLM answer is passed to `on_late_result`
+        when it arrives.
+        """
+        task = asyncio.ensure_future(self.analyze_attack_pattern(attack_data))
+        if AI_DECISION_BUDGET_MS <= 0:
+            return await task
+        done, _ = await asyncio.wait({task}, timeout=AI_DECISION_BUDGET_MS / 1000)
+        if done:
+            return task.result()
+        
+        self.budget_fallbacks += 1
+        fallback = self._rule_based_analysis(attack_data)
+        self._late.add(task)
+        task.add_done_callback(lambda t: self._deliver_late(t, fallback, on_late_result))
+        return dict(fallback, provisional=True)
+    
+    def _deliver_late(self, task: asyncio.Task, fallback: Dict[str, Any], on_late_result):
+        self._late.discard(task)
+        if task.cancelled() or task.exception() is not None:
+            return
+        analysis = task.result()
+        # The LLM path fell back as well: nothing new to attach
+        if analysis == fallback or on_late_result is None:
+            return
+        self.late_results += 1
+        try:
+            on_late_result(analysis)
+        except Exception as e:
+            print(f"Late AI analysis error: {e}")
+    
+    def breaker_stats(self) -> Dict[str, Any]:
+        stats = self.breaker.stats()
+        stats["decision_budget_ms"] = AI_DECISION_BUDGET_MS
+        stats["budget_fallbacks"] = self.budget_fallbacks
+        stats["late_results"] = self.late_results
+        stats["pending_late_results"] = len(self._late)
+        # Provider limiter queue timeouts, kept out of the breaker's failure rate
+        stats["limiter_timeouts"] = self.limiter.timeouts
+        return stats
+    
+    @staticmethod
+    def _attack_details(attack_data: Dict[str, Any]) -> str:
+        return f"""- Type: {attack_data.get('attack_type', 'unknown')}
+- Intensity: {attack_data.get('intensity', 0)}
+- Duration: {attack_data.get('duration', 0)}
+- Target: {attack_data.get('target_url', 'N/A')}
+- Parameters: {attack_data.get('parameters', {})}"""
+    
+    def _analysis_prompt(self, attack_data: Dict[str, Any]) -> str:
+        return f"""
 Analyze the following attack pattern and provide:
 1. Attack type classification
 2. Threat level (Low/Medium/High/Critical)
@@ -41,127 +548,138 @@ Analyze the following attack pattern and provide:
 4. Attack characteristics
 
 Attack Data:
-- Type: {attack_data.get('attack_type', 'unknown')}
-- Intensity: {attack_data.get('intensity', 0)}
-- Duration: {attack_data.get('duration', 0)}
-- Target: {attack_data.get('target_url', 'N/A')}
-- Parameters: {attack_data.get('parameters', {})}
+{self._attack_details(attack_data)}
 
 Provide a JSON response with:
-{{
-    "attack_classification": "string",
-    "threat_level": "Low|Medium|High|Critical",
-    "recommended_defenses": ["defense1", "defense2"],
-    "characteristics": {{
-        "pattern": "string",
-        "sophistication": "Low|Medium|High",
-        "potential_damage": "string"
-    }},
-    "confidence": 0.0-1.0
-}}
+{ANALYSIS_SCHEMA}
+"""
+    
+    def _batch_prompt(self, batch: List[Dict[str, Any]]) -> str:
+        attacks = "\n\n".join(
+            f"Attack {index}:\n{self._attack_details(attack_data)}" for index, attack_data in enumerate(batch)
+        )
+        return f"""
+Analyze each of the following {len(batch)} attack patterns independently and provide for each:
+1. Attack type classification
+2. Threat level (Low/Medium/High/Critical)
+3. Recommended defense mechanisms
+4. Attack characteristics
+
+{attacks}
+
+Provide a JSON array with exactly {len(batch)} objects, one per attack, each with its "index" and:
+{ANALYSIS_SCHEMA}
 """
+    
+    async def _request_analysis(self, attack_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """One completion for one attack; None if the call or the JSON fails"""
+        content = await self._chat_completion(
+            ANALYSIS_SYSTEM_PROMPT, self._analysis_prompt(attack_data), AI_ANALYSIS_TIMEOUT
+        )
+        if content is None:
+            return None
+        try:
+            analysis = self._parse_json_content(content)
+        except json.JSONDecodeError:
+            analysis = None
+        if not isinstance(analysis, dict):
+            self.accounting.record_fallback("invalid_json")
+            return None
+        return analysis
+    
+    async def _analyze_batch(self, batch: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """One completion for a micro-batch; None marks items the answer did not cover"""
+        if len(batch) == 1:
+            return [await self._request_analysis(batch[0])]
         
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+        content = await self._chat_completion(
+            ANALYSIS_SYSTEM_PROMPT,
+            self._batch_prompt(batch),
+            AI_ANALYSIS_TIMEOUT,
+            max_tokens=min(500 * len(batch), AI_BATCH_MAX_TOKENS),
+            purpose="analysis_batch"
+        )
+        if content is None:
+            return results
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # Try Cursor API first, fallback to OpenAI
-                if CURSOR_API_KEY:
-                    response = await client.post(
-                        f"{self.api_url}/chat/completions",
-                        headers=headers,
-                        json={
-                            "model": self.model,
-                            "messages": [
-                                {"role": "system", "content": "You are a cybersecurity expert analyzing attack patterns."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            "temperature": 0.3,
-                            "max_tokens": 500
-                        }
-                    )
-                else:
-                    # Use OpenAI API
-                    response = await client.post(
-                        f"{self.api_url}/chat/completions",
-                        headers=headers,
-                        json={
-                            "model": "gpt-4-turbo-preview",
-                            "messages": [
-                                {"role": "system", "content": "You are a cybersecurity expert analyzing attack patterns."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            "temperature": 0.3,
-                            "max_tokens": 500
-                        }
-                    )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    
-                    # Parse JSON from response
-                    import json
-                    try:
-                        # Extract JSON from markdown code blocks if present
-                        if "```json" in content:
-                            content = content.split("```json")[1].split("```")[0].strip()
-                        elif "```" in content:
-                            content = content.split("```")[1].split("```")[0].strip()
-                        
-                        analysis = json.loads(content)
-                        return analysis
-                    except json.JSONDecodeError:
-                        # If JSON parsing fails, use rule-based analysis
-                        return self._rule_based_analysis(attack_data)
-                else:
-                    return self._rule_based_analysis(attack_data)
+            parsed = self._parse_json_content(content)
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict):
+            parsed = parsed.get("analyses", parsed.get("results"))
+        if not isinstance(parsed, list):
+            self.accounting.record_fallback("invalid_json")
+            return results
         
+        for position, item in enumerate(parsed):
+            if not isinstance(item, dict):
+                continue
+            index = item.pop("index", position)
+            if isinstance(index, int) and 0 <= index < len(batch) and results[index] is None:
+                results[index] = item
+        for result in results:
+            if result is None:
+                self.accounting.record_fallback("batch_item_missing")
+        return results
+    
+    async def _analyze_with_llm(self, attack_data: Dict[str, Any], fingerprint: str) -> Dict[str, Any]:
+        generation = self.cache.generation
+        try:
+            if self.batcher is not None:
+                analysis = await self.batcher.submit(attack_data)
+            else:
+                analysis = await self._request_analysis(attack_data)
         except Exception as e:
             print(f"AI Analysis error: {e}")
+            analysis = None
+        
+        if analysis is None:
+            # Call, JSON or batch item failed: fall back for this attack only
             return self._rule_based_analysis(attack_data)
+        # Only real AI answers are cached; fallbacks are retried next time
+        await self.cache.set(fingerprint, analysis, generation)
+        return analysis
     
     def _rule_based_analysis(self, attack_data: Dict[str, Any]) -> Dict[str, Any]:
         """Fallback rule-based analysis when AI is unavailable"""
         attack_type = attack_data.get('attack_type', 'unknown')
         intensity = attack_data.get('intensity', 5)
         
-        threat_levels = {
-            'ddos': 'High' if intensity > 7 else 'Medium' if intensity > 4 else 'Low',
-            'sql_injection': 'Critical',
-            'xss': 'High',
-            'brute_force': 'Medium',
-            'port_scan': 'Low',
-            'phishing': 'Medium'
-        }
-        
-        recommended_defenses = {
-            'ddos': ['rate_limiting', 'firewall', 'ai_detection'],
-            'sql_injection': ['ids', 'ai_detection', 'firewall'],
-            'xss': ['ids', 'ai_detection'],
-            'brute_force': ['rate_limiting', 'firewall'],
-            'port_scan': ['firewall', 'ids'],
-            'phishing': ['ai_detection', 'behavioral_analysis']
-        }
+        threat_levels = dict(
+            RULE_THREAT_LEVELS, ddos='High' if intensity > 7 else 'Medium' if intensity > 4 else 'Low'
+        )
         
         return {
             "attack_classification": attack_type,
             "threat_level": threat_levels.get(attack_type, 'Medium'),
-            "recommended_defenses": recommended_defenses.get(attack_type, ['ai_detection']),
+            "recommended_defenses": list(RULE_RECOMMENDED_DEFENSES.get(attack_type, ['ai_detection'])),
             "characteristics": {
                 "pattern": f"{attack_type} attack with intensity {intensity}",
                 "sophistication": "High" if intensity > 7 else "Medium" if intensity > 4 else "Low",
-                "potential_damage": "High" if attack_type in ['sql_injection', 'ddos'] else "Medium"
+                "potential_damage": "High" if attack_type in HIGH_DAMAGE_ATTACKS else "Medium"
             },
             "confidence": 0.7
         }
     
-    async def should_block_attack(self, attack_data: Dict[str, Any], current_defenses: List[str]) -> Dict[str, Any]:
-        """Determine if attack should be blocked based on AI analysis"""
-        analysis = await self.analyze_attack_pattern(attack_data)
+    async def should_block_attack(
+        self,
+        attack_data: Dict[str, Any],
+        current_defenses: List[str],
+        analysis: Optional[Dict[str, Any]] = None,
+        anomaly: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Determine if attack should be blocked based on AI analysis
+
+        Reuses `analysis` (or attack_data["ai_analysis"]) when given, so the
+        decision does not pay for a second LLM call. An `anomaly` (the behavior
+        engine's score of the attack's source) over its threshold counts as
+        one more active defense backing the block.
+        """
+        if analysis is None:
+            analysis = attack_data.get("ai_analysis")
+        if analysis is None:
+            analysis = await self.analyze_attack_pattern(attack_data)
         
         threat_level = analysis.get('threat_level', 'Medium')
         recommended_defenses = analysis.get('recommended_defenses', [])
@@ -170,42 +688,39 @@ Provide a JSON response with:
         active_recommended = [d for d in recommended_defenses if any(d.lower() in def_name.lower() for def_name in current_defenses)]
         
         # Decision logic
-        should_block = False
-        confidence = 0.5
-        
-        if threat_level == 'Critical':
-            should_block = True
-            confidence = 0.95
-        elif threat_level == 'High':
-            should_block = len(active_recommended) > 0
-            confidence = 0.85
-        elif threat_level == 'Medium':
-            should_block = len(active_recommended) >= 2
-            confidence = 0.70
-        else:
-            should_block = len(active_recommended) >= 3
-            confidence = 0.60
+        required, confidence = BLOCK_THRESHOLDS.get(threat_level, DEFAULT_BLOCK_THRESHOLD)
+        anomalous = bool(anomaly and anomaly.get("anomalous"))
+        should_block = len(active_recommended) + anomalous >= required
+        reason = f"Threat level: {threat_level}, Active defenses: {len(active_recommended)}/{len(recommended_defenses)}"
+        if anomalous:
+            confidence = max(confidence, anomaly["score"])
+            reason += f", Behavioral anomaly: {anomaly['score']:.2f}"
         
-        return {
+        decision = {
             "should_block": should_block,
             "confidence": confidence,
-            "reason": f"Threat level: {threat_level}, Active defenses: {len(active_recommended)}/{len(recommended_defenses)}",
+            "reason": reason,
             "analysis": analysis
         }
+        if anomaly is not None:
+            decision["anomaly_score"] = anomaly["score"]
+        return decision
     
-    async def generate_defense_recommendations(self, attack_history: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Generate defense recommendations based on attack history"""
-        if not self.api_key or len(attack_history) == 0:
-            return {
-                "recommendations": ["Enable all defense mechanisms", "Monitor logs regularly"],
-                "priority": "Medium"
-            }
-        
-        prompt = f"""
-Based on the following attack history, provide defense recommendations:
+    @staticmethod
+    def _default_recommendations() -> Dict[str, Any]:
+        return {
+            "recommendations": ["Enable all defense mechanisms", "Monitor logs regularly"],
+            "priority": "Medium"
+        }
+    
+    def _recommendation_prompt(self, summary: Dict[str, Any], active_defenses: List[str]) -> str:
+        return f"""
+Based on the following summary of recent attacks, provide defense recommendations:
 
-Attack History:
-{attack_history[:10]}  # Last 10 attacks
+Attack Summary:
+{json.dumps(summary, separators=(",", ":"))}
+
+Active Defenses: {", ".join(active_defenses) or "none"}
 
 Provide recommendations for:
 1. Which defense mechanisms to enable/configure
@@ -220,50 +735,135 @@ Format as JSON:
     "configuration_changes": {{"key": "value"}}
 }}
 """
+    
+    def _cached_recommendation(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None or self._recommendation is None or self._recommendation[0] != key:
+            return None
+        return copy.deepcopy(self._recommendation[1])
+    
+    @staticmethod
+    def _recommendation_key(signature: Optional[str], active_defenses: List[str]) -> Optional[str]:
+        if signature is None:
+            return None
+        return f"{signature}|{','.join(sorted(active_defenses))}"
+    
+    @staticmethod
+    def _validate_recommendations(value: Any) -> Dict[str, Any]:
+        """Normalize a parsed recommendation object; raises ValueError if it has no recommendations"""
+        if not isinstance(value, dict) or not isinstance(value.get("recommendations"), list):
+            raise ValueError("Recommendation response has no recommendations list")
+        recommendations = [str(item) for item in value["recommendations"] if item]
+        if not recommendations:
+            raise ValueError("Recommendation response has no recommendations")
+        priority = str(value.get("priority", "Medium")).capitalize()
+        mechanisms = value.get("mechanisms_to_enable")
+        changes = value.get("configuration_changes")
+        return {
+            "recommendations": recommendations,
+            "priority": priority if priority in RECOMMENDATION_PRIORITIES else "Medium",
+            "mechanisms_to_enable": [str(item) for item in mechanisms] if isinstance(mechanisms, list) else [],
+            "configuration_changes": changes if isinstance(changes, dict) else {}
+        }
+    
+    async def generate_defense_recommendations(
+        self,
+        summary: Dict[str, Any],
+        active_defenses: List[str],
+        signature: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Generate defense recommendations from the attack summary
+
+        With a `signature` (see AttackSummary.signature) the AI answer is reused
+        until the summary or the active defenses change meaningfully.
+        """
+        if not self.api_key or not summary.get("total_attacks"):
+            return self._default_recommendations()
         
+        key = self._recommendation_key(signature, active_defenses)
+        cached = self._cached_recommendation(key)
+        if cached is not None:
+            self.accounting.record_cache_hit("recommendations")
+            return cached
+        
+        generation = self.cache.generation
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                response = await client.post(
-                    f"{self.api_url}/chat/completions",
-                    headers=headers,
-                    json={
-                        "model": self.model if CURSOR_API_KEY else "gpt-4-turbo-preview",
-                        "messages": [
-                            {"role": "system", "content": "You are a cybersecurity expert providing defense recommendations."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.3,
-                        "max_tokens": 500
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    
-                    import json
-                    try:
-                        if "```json" in content:
-                            content = content.split("```json")[1].split("```")[0].strip()
-                        elif "```" in content:
-                            content = content.split("```")[1].split("```")[0].strip()
-                        
-                        return json.loads(content)
-                    except json.JSONDecodeError:
-                        pass
+            content = await self._chat_completion(
+                RECOMMENDATION_SYSTEM_PROMPT,
+                self._recommendation_prompt(summary, active_defenses),
+                AI_RECOMMENDATION_TIMEOUT,
+                priority=PRIORITY_RECOMMENDATION,
+                purpose="recommendations"
+            )
+            if content is not None:
+                try:
+                    result = self._validate_recommendations(self._parse_json_content(content))
+                except (json.JSONDecodeError, ValueError):
+                    self.accounting.record_fallback("invalid_json")
+                    result = None
+                if result is not None:
+                    if key is not None and generation == self.cache.generation:
+                        self._recommendation = (key, copy.deepcopy(result))
+                    return result
         
         except Exception as e:
             print(f"AI Recommendation error: {e}")
         
-        return {
-            "recommendations": ["Enable all defense mechanisms", "Monitor logs regularly"],
-            "priority": "Medium"
-        }
+        return self._default_recommendations()
+    
+    async def stream_defense_recommendations(
+        self,
+        summary: Dict[str, Any],
+        active_defenses: List[str],
+        signature: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ("recommendation", item) as each item completes, then ("result", validated object)"""
+        key = self._recommendation_key(signature, active_defenses)
+        result = None
+        if not self.api_key or not summary.get("total_attacks"):
+            result = self._default_recommendations()
+        else:
+            result = self._cached_recommendation(key)
+            if result is not None:
+                self.accounting.record_cache_hit("recommendations")
+        if result is not None:
+            for item in result["recommendations"]:
+                yield "recommendation", item
+            yield "result", result
+            return
+        
+        parser = JSONStreamParser("recommendations")
+        streamed: List[str] = []
+        generation = self.cache.generation
+        try:
+            # aclosing: a client that disconnects early releases the provider stream at once
+            async with aclosing(self._chat_completion_stream(
+                RECOMMENDATION_SYSTEM_PROMPT,
+                self._recommendation_prompt(summary, active_defenses),
+                AI_RECOMMENDATION_TIMEOUT,
+                priority=PRIORITY_RECOMMENDATION
+            )) as deltas:
+                async for delta in deltas:
+                    for item in parser.feed(delta):
+                        if item:
+                            streamed.append(str(item))
+                            yield "recommendation", str(item)
+        except Exception as e:
+            print(f"AI Recommendation error: {e}")
+        
+        try:
+            result = self._validate_recommendations(parser.result())
+            if key is not None and generation == self.cache.generation:
+                self._recommendation = (key, copy.deepcopy(result))
+        except (json.JSONDecodeError, ValueError):
+            # Truncated or malformed: keep what was streamed, else the defaults
+            if parser.done or streamed:
+                self.accounting.record_fallback("invalid_json")
+            result = dict(self._default_recommendations(), recommendations=streamed) if streamed else None
+        if result is None:
+            result = self._default_recommendations()
+            for item in result["recommendations"]:
+                yield "recommendation", item
+        yield "result", result
 
 
 # Global instance
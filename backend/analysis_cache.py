@@ -0,0 +1,193 @@
+"""
+Analysis Cache Module
+Fingerprint-keyed LRU + TTL cache for AI attack analyses with an optional SQLite tier
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+
+def intensity_band(intensity: Any) -> str:
+    """Same bands the rule-based analysis uses for threat level and sophistication"""
+    try:
+        intensity = float(intensity)
+    except (TypeError, ValueError):
+        return "unknown"
+    return "high" if intensity > 7 else "medium" if intensity > 4 else "low"
+
+
+def duration_band(duration: Any) -> str:
+    try:
+        duration = float(duration)
+    except (TypeError, ValueError):
+        return "unknown"
+    return "long" if duration > 300 else "medium" if duration > 60 else "short"
+
+
+def parameter_shape(value: Any) -> Any:
+    """Structure of the parameters (keys and value types), not their values"""
+    if isinstance(value, dict):
+        return {str(key): parameter_shape(item) for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [sorted({json.dumps(parameter_shape(item), sort_keys=True) for item in value})]
+    return type(value).__name__
+
+
+def attack_fingerprint(attack_data: Dict[str, Any]) -> str:
+    """Normalized fingerprint: attack type, intensity/duration band, target host and parameter shape"""
+    target = attack_data.get("target_url") or ""
+    parsed = urlparse(target if "://" in target else f"//{target}")
+    normalized = {
+        "attack_type": str(attack_data.get("attack_type", "unknown")).strip().lower(),
+        "intensity": intensity_band(attack_data.get("intensity", 0)),
+        "duration": duration_band(attack_data.get("duration", 0)),
+        "host": (parsed.hostname or "").lower(),
+        "parameters": parameter_shape(attack_data.get("parameters") or {})
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class AnalysisCache:
+    """In-process LRU with per-entry TTL, backed by an optional on-disk tier
+
+    `generation` goes up on every invalidate(). A value computed before an
+    invalidation is passed to set() with the generation read when its
+    computation started, and is then discarded instead of cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 900.0, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.generation = 0
+        self.stale_writes = 0
+
+    def open(self):
+        """Open the disk tier (if configured) and drop expired rows"""
+        if not self.disk_path or self._disk is not None:
+            return
+        directory = os.path.dirname(self.disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._disk = sqlite3.connect(self.disk_path, check_same_thread=False)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        with self._disk:
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._disk.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (time.time(),))
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached analysis (a private copy) or None"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+            self.expirations += 1
+
+        if self._disk is not None:
+            generation = self.generation
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                expires_at, value = row
+                if generation == self.generation:
+                    self._store(key, value, expires_at)
+                self.disk_hits += 1
+                return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any], generation: Optional[int] = None):
+        if generation is None:
+            generation = self.generation
+        elif generation != self.generation:
+            self.stale_writes += 1
+            return
+        expires_at = time.time() + self.ttl
+        value = copy.deepcopy(value)
+        self._store(key, value, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at, generation)
+
+    def _store(self, key: str, value: Dict[str, Any], expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT expires_at, value FROM analysis_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _disk_set(self, key: str, value: Dict[str, Any], expires_at: float, generation: int):
+        with self._disk_lock, self._disk:
+            # Invalidated while waiting for the lock: the clear may already have run
+            if generation != self.generation:
+                return
+            self._disk.execute(
+                "INSERT INTO analysis_cache (key, expires_at, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at, value = excluded.value",
+                (key, expires_at, json.dumps(value, default=str))
+            )
+
+    def _disk_clear(self):
+        with self._disk_lock, self._disk:
+            self._disk.execute("DELETE FROM analysis_cache")
+
+    async def invalidate(self):
+        """Drop every cached analysis, in memory and on disk"""
+        self._entries.clear()
+        self.invalidations += 1
+        self.generation += 1
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_clear)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "disk_enabled": self._disk is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_writes": self.stale_writes,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
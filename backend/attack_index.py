@@ -0,0 +1,189 @@
+"""
+Attack Index Module
+Insertion-ordered attack records with time, type and status indexes
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+
+class AttackIndex:
+    """Attack storage ordered by submission time with O(page size) reads
+
+    With a `capacity`, the oldest records are evicted once it is exceeded.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        if capacity is not None and capacity <= 0:
+            raise ValueError("Attack index capacity must be positive")
+        self.capacity = capacity
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # Attack ids by absolute position; _order[0] is at position _order_base
+        self._order: List[str] = []
+        self._order_base = 0
+        self._first = 0  # position of the oldest live record
+        self._position: Dict[str, int] = {}
+        # Secondary indexes: key -> ascending positions (may hold evicted ones below _first)
+        self._by_type: Dict[str, List[int]] = {}
+        self._by_status: Dict[str, List[int]] = {}
+        self.evicted = 0
+
+    def __contains__(self, attack_id: str) -> bool:
+        return attack_id in self._records
+
+    def __getitem__(self, attack_id: str) -> Dict[str, Any]:
+        return self._records[attack_id]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def _next(self) -> int:
+        return self._order_base + len(self._order)
+
+    def get(self, attack_id: str) -> Optional[Dict[str, Any]]:
+        return self._records.get(attack_id)
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Iterate records oldest-first"""
+        return (self._records[self._id_at(position)] for position in range(self._first, self._next))
+
+    def oldest_id(self) -> Optional[str]:
+        return self._id_at(self._first) if self._records else None
+
+    def _id_at(self, position: int) -> str:
+        return self._order[position - self._order_base]
+
+    def add(self, record: Dict[str, Any]):
+        """Append a new attack record (records arrive in submission order)"""
+        attack_id = record["attack_id"]
+        if attack_id in self._records:
+            raise ValueError(f"Attack {attack_id} already exists")
+        position = self._next
+        self._order.append(attack_id)
+        self._position[attack_id] = position
+        self._records[attack_id] = record
+        self._by_type.setdefault(record.get("attack_type", ""), []).append(position)
+        self._by_status.setdefault(record.get("status", ""), []).append(position)
+
+        if self.capacity is not None and len(self._records) > self.capacity:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        attack_id = self._id_at(self._first)
+        del self._records[attack_id]
+        del self._position[attack_id]
+        self._first += 1
+        self.evicted += 1
+        # Compact lazily so eviction stays amortized O(1)
+        if self._first - self._order_base >= max(self.capacity, 1024):
+            self._compact()
+
+    def _compact(self):
+        del self._order[:self._first - self._order_base]
+        self._order_base = self._first
+        for index in (self._by_type, self._by_status):
+            for key in list(index):
+                positions = index[key]
+                del positions[:bisect_left(positions, self._first)]
+                if not positions:
+                    del index[key]
+
+    def update(self, attack_id: str, fields: Dict[str, Any]):
+        """Update fields of a record, keeping the status index in sync"""
+        record = self._records[attack_id]
+        new_status = fields.get("status")
+        old_status = record.get("status", "")
+        if new_status is not None and new_status != old_status:
+            position = self._position[attack_id]
+            # Status changes happen to recent attacks, so the list shifts stay short
+            positions = self._by_status[old_status]
+            del positions[bisect_left(positions, position)]
+            if not positions:
+                del self._by_status[old_status]
+            insort(self._by_status.setdefault(new_status, []), position)
+        record.update(fields)
+
+    def page(
+        self,
+        limit: int = 100,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        attack_type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """Get a newest-first page of attacks.
+
+        `before` returns attacks older than that attack_id, `after` returns the
+        attacks submitted right after it. Returns (items, older_cursor, newer_cursor)
+        where each cursor is None when there is nothing further in that direction.
+        Raises KeyError for a cursor that is not (or no longer) held.
+        """
+        for cursor in (before, after):
+            if cursor is not None and cursor not in self._position:
+                raise KeyError(cursor)
+
+        candidates = []
+        if attack_type:
+            candidates.append(self._by_type.get(attack_type, []))
+        if status:
+            candidates.append(self._by_status.get(status, []))
+        positions = min(candidates, key=len) if candidates else None
+
+        if positions is not None:
+            low, size = bisect_left(positions, self._first), len(positions)
+            position_at = positions.__getitem__
+
+            def index_of(attack_id: str) -> int:
+                return bisect_left(positions, self._position[attack_id])
+        else:
+            low, size = self._first, self._next
+
+            def position_at(i: int) -> int:
+                return i
+
+            def index_of(attack_id: str) -> int:
+                return self._position[attack_id]
+
+        limit = max(limit, 0)
+        if after is not None:
+            # Walk forward from the cursor, then present newest-first
+            start = index_of(after)
+            if start < size and position_at(start) == self._position[after]:
+                start += 1
+            step, end = 1, size
+        else:
+            start = index_of(before) - 1 if before is not None else size - 1
+            step, end = -1, low - 1
+
+        items: List[Dict[str, Any]] = []
+        i = start
+        while i != end and len(items) < limit:
+            record = self._records[self._id_at(position_at(i))]
+            if self._matches(record, attack_type, status):
+                items.append(record)
+            i += step
+        if step == 1:
+            items.reverse()
+
+        if not items:
+            return items, None, None
+        older = self._has_more(index_of(items[-1]["attack_id"]) - 1, low - 1, -1, position_at, attack_type, status)
+        newer = self._has_more(index_of(items[0]["attack_id"]) + 1, size, 1, position_at, attack_type, status)
+        return items, items[-1]["attack_id"] if older else None, items[0]["attack_id"] if newer else None
+
+    def _has_more(self, start, end, step, position_at, attack_type, status) -> bool:
+        i = start
+        while i != end:
+            if self._matches(self._records[self._id_at(position_at(i))], attack_type, status):
+                return True
+            i += step
+        return False
+
+    @staticmethod
+    def _matches(record: Dict[str, Any], attack_type: Optional[str], status: Optional[str]) -> bool:
+        if attack_type and record.get("attack_type") != attack_type:
+            return False
+        if status and record.get("status") != status:
+            return False
+        return True
@@ -0,0 +1,187 @@
+"""
+Attack Summary Module
+Running summary of completed attacks, maintained incrementally for recommendation prompts
+"""
+
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+from latency_histogram import LatencyHistogram
+
+# A type's share or block rate must drift this far to count as a meaningful change
+RATE_STEP = 0.1
+
+
+class TypeSummary:
+    """Counters for one attack type"""
+
+    __slots__ = ("count", "blocked", "threat_levels", "latency")
+
+    def __init__(self):
+        self.count = 0
+        self.blocked = 0
+        self.threat_levels: Dict[str, int] = {}
+        self.latency = LatencyHistogram()
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "blocked": self.blocked,
+            "threat_levels": self.threat_levels,
+            "latency": self.latency.to_state()
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        self.count = state.get("count", 0)
+        self.blocked = state.get("blocked", 0)
+        self.threat_levels = dict(state.get("threat_levels", {}))
+        self.latency.load_state(state.get("latency", {}))
+
+
+class AttackSummary:
+    """Per-type counts, block rates, threat mix, latency percentiles and notable targets
+
+    Updated in O(1) per completed attack. The target table is bounded: when it
+    overflows, the least-attacked half of the hosts is dropped.
+    """
+
+    OVERFLOW_TYPE = "other"
+
+    def __init__(self, max_types: int = 32, max_targets: int = 1000, top_targets: int = 5):
+        self.max_types = max_types
+        self.max_targets = max_targets
+        self.top_targets = top_targets
+        self.types: Dict[str, TypeSummary] = {}
+        # host -> [attacks, blocked]
+        self.targets: Dict[str, List[int]] = {}
+        self.total = 0
+        self.blocked = 0
+        # Features at the last meaningful change, and how many changes there were
+        self._baseline: Optional[Dict[str, Any]] = None
+        self._version = 0
+
+    def record(self, attack_type: str, blocked: bool, latency: float, threat_level: Optional[str], target_url: Optional[str]):
+        summary = self.types.get(attack_type)
+        if summary is None:
+            if len(self.types) >= self.max_types:
+                attack_type = self.OVERFLOW_TYPE
+                summary = self.types.get(attack_type)
+            if summary is None:
+                summary = self.types[attack_type] = TypeSummary()
+        summary.count += 1
+        summary.blocked += blocked
+        threat_level = threat_level or "Unknown"
+        summary.threat_levels[threat_level] = summary.threat_levels.get(threat_level, 0) + 1
+        summary.latency.record(latency)
+        self.total += 1
+        self.blocked += blocked
+
+        host = self._host(target_url)
+        if host:
+            counters = self.targets.get(host)
+            if counters is None:
+                if len(self.targets) >= self.max_targets:
+                    self._shrink_targets()
+                counters = self.targets[host] = [0, 0]
+            counters[0] += 1
+            counters[1] += blocked
+
+    @staticmethod
+    def _host(target_url: Optional[str]) -> str:
+        if not target_url:
+            return ""
+        parsed = urlparse(target_url if "://" in target_url else f"//{target_url}")
+        return (parsed.hostname or "").lower()
+
+    def _shrink_targets(self):
+        keep = sorted(self.targets.items(), key=lambda item: item[1][0], reverse=True)[:self.max_targets // 2]
+        self.targets = dict(keep)
+
+    def notable_targets(self) -> List[Dict[str, Any]]:
+        top = sorted(self.targets.items(), key=lambda item: item[1][0], reverse=True)[:self.top_targets]
+        return [
+            {"host": host, "attacks": attacks, "block_rate": round(blocked / attacks, 2)}
+            for host, (attacks, blocked) in top
+        ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Compact summary, small enough to go into a prompt as-is"""
+        threat_levels: Dict[str, int] = {}
+        by_type = {}
+        for attack_type, summary in sorted(self.types.items(), key=lambda item: item[1].count, reverse=True):
+            for level, count in summary.threat_levels.items():
+                threat_levels[level] = threat_levels.get(level, 0) + count
+            percentiles = summary.latency.percentiles()
+            by_type[attack_type] = {
+                "count": summary.count,
+                "block_rate": round(summary.blocked / summary.count, 2) if summary.count else 0.0,
+                "threat_levels": summary.threat_levels,
+                "latency_ms": {name: round(percentiles[name], 1) for name in ("p50", "p95", "p99")}
+            }
+        return {
+            "total_attacks": self.total,
+            "block_rate": round(self.blocked / self.total, 2) if self.total else 0.0,
+            "threat_levels": threat_levels,
+            "by_type": by_type,
+            "notable_targets": self.notable_targets()
+        }
+
+    def _features(self) -> Dict[str, Any]:
+        types = {}
+        for attack_type, summary in self.types.items():
+            dominant = max(summary.threat_levels.items(), key=lambda item: item[1])[0] if summary.threat_levels else None
+            types[attack_type] = (summary.count / self.total, summary.blocked / summary.count, dominant)
+        return {
+            "total": self.total,
+            "types": types,
+            "top_hosts": {target["host"] for target in self.notable_targets()[:3]}
+        }
+
+    @staticmethod
+    def _changed(baseline: Dict[str, Any], features: Dict[str, Any]) -> bool:
+        if features["total"] >= 2 * baseline["total"] or features["top_hosts"] != baseline["top_hosts"]:
+            return True
+        if features["types"].keys() != baseline["types"].keys():
+            return True
+        for attack_type, (share, block_rate, dominant) in features["types"].items():
+            old_share, old_block_rate, old_dominant = baseline["types"][attack_type]
+            if (
+                abs(share - old_share) >= RATE_STEP
+                or abs(block_rate - old_block_rate) >= RATE_STEP
+                or dominant != old_dominant
+            ):
+                return True
+        return False
+
+    def signature(self) -> str:
+        """Changes only when the summary changes meaningfully
+
+        That is: a new attack type, a type's share or block rate drifting by
+        RATE_STEP from when the signature last changed, a different dominant
+        threat level, different top targets, or the attack count doubling.
+        """
+        if not self.total:
+            return ""
+        features = self._features()
+        if self._baseline is None or self._changed(self._baseline, features):
+            self._baseline = features
+            self._version += 1
+        return str(self._version)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "blocked": self.blocked,
+            "types": {attack_type: summary.to_state() for attack_type, summary in self.types.items()},
+            "targets": self.targets
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        self.total = state.get("total", 0)
+        self.blocked = state.get("blocked", 0)
+        self.types = {}
+        for attack_type, type_state in state.get("types", {}).items():
+            summary = self.types[attack_type] = TypeSummary()
+            summary.load_state(type_state)
+        self.targets = {host: list(counters) for host, counters in state.get("targets", {}).items()}
+        self._baseline = None
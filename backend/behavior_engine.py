@@ -0,0 +1,354 @@
+"""
+Behavior Engine Module
+Streaming per-client behavior features, anomaly scores against a population baseline, and an ASGI middleware
+"""
+
+import heapq
+import logging
+import math
+import sys
+import time
+from collections import OrderedDict
+from math import exp
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Path buckets per client; path entropy is measured over hash(path) modulo this
+PATH_BUCKETS = 16
+# c * ln(c) for bucket counts 0..255, so the entropy sum is updated with two lookups
+C_LOG_C = [0.0] + [count * math.log(count) for count in range(1, 256)]
+LOG_BUCKETS = math.log(PATH_BUCKETS)
+
+RATE_WINDOW = 60.0
+INVERSE_RATE_WINDOW = 1 / RATE_WINDOW
+# EWMA weight of the inter-arrival and error features, about the last 20 events
+ALPHA = 0.05
+# A client's score is checked, and folded into the baseline, every SCORE_EVERY of its events
+SCORE_EVERY = 16
+SCORE_MASK = SCORE_EVERY - 1
+
+# Feature names, in the order of the baseline arrays
+FEATURES = ("rate", "path_entropy", "error_ratio", "interarrival_cv")
+
+
+def parse_behavior_settings(settings: Dict[str, Any]) -> Tuple[float, float, bool, bool]:
+    """(baseline_period days, anomaly_threshold, track_user_patterns, alert_on_deviation); raises ValueError"""
+    try:
+        baseline_period = float(settings.get("baseline_period", 7))
+        anomaly_threshold = float(settings.get("anomaly_threshold", 0.75))
+    except (TypeError, ValueError):
+        raise ValueError("baseline_period and anomaly_threshold must be numbers")
+    if baseline_period <= 0:
+        raise ValueError("baseline_period must be positive")
+    if not 0 < anomaly_threshold <= 1:
+        raise ValueError("anomaly_threshold must be between 0 and 1")
+    return (
+        baseline_period,
+        anomaly_threshold,
+        bool(settings.get("track_user_patterns", True)),
+        bool(settings.get("alert_on_deviation", True))
+    )
+
+
+class ClientBehavior:
+    """Running features of one client, updated in O(1) per event
+
+    `rate` is an exponentially decayed event count (events/s over RATE_WINDOW),
+    `dt_mean`/`dt_var` an EWMA of inter-arrival times and their variance,
+    `error` an EWMA of the error indicator. Path entropy comes from bucket
+    counts and the running sum of c*ln(c); the counts are halved when one of
+    them saturates, so the distribution follows recent paths.
+    """
+
+    __slots__ = ("last", "rate", "dt_mean", "dt_var", "error", "counts", "total", "c_log_c", "events", "alerted")
+
+    def __init__(self, now: float, rate: float):
+        self.last = now
+        self.rate = rate
+        self.dt_mean = 0.0
+        self.dt_var = 0.0
+        self.error = 0.0
+        self.counts = bytearray(PATH_BUCKETS)
+        self.total = 0
+        self.c_log_c = 0.0
+        self.events = 0
+        self.alerted = False
+
+    def halve_paths(self):
+        counts = self.counts
+        for bucket in range(PATH_BUCKETS):
+            counts[bucket] >>= 1
+        self.total = sum(counts)
+        self.c_log_c = sum(C_LOG_C[count] for count in counts)
+
+    def features(self, now: float) -> Tuple[float, float, float, float]:
+        """(rate, path_entropy, error_ratio, interarrival_cv) as of `now`; entropy is 0..1"""
+        rate = self.rate * exp(-max(0.0, now - self.last) * INVERSE_RATE_WINDOW)
+        total = self.total
+        entropy = (math.log(total) - self.c_log_c / total) / LOG_BUCKETS if total else 0.0
+        cv = math.sqrt(self.dt_var) / self.dt_mean if self.dt_mean > 0 else 0.0
+        return rate, entropy, self.error, cv
+
+
+class BehaviorEngine:
+    """Per-client behavior records under a memory cap, scored against a population baseline
+
+    Records are kept in LRU order and the least recently seen client is
+    dropped when `max_clients` is reached. Every SCORE_EVERY events of a
+    client its features are folded into the population baseline (an
+    exponentially weighted mean and variance per feature with a time
+    constant of baseline_period days) and its score is checked.
+
+    The anomaly score of a client is 1 - exp(-z / 3), where z is the largest
+    deviation from the baseline in standard deviations in the suspicious
+    direction: higher request rate (on a log scale), path entropy or error
+    ratio, or more regular timing (lower inter-arrival variation).
+    """
+
+    # Events a client needs, and samples the baseline needs, before a client is scored
+    MIN_EVENTS = 16
+    MIN_BASELINE = 1000
+    # Signs of the suspicious direction of each feature
+    DIRECTIONS = (1.0, 1.0, 1.0, -1.0)
+
+    def __init__(self, memory_bytes: int = 32 * 1024 * 1024):
+        self.record_bytes = self._record_size()
+        self.memory_bytes = memory_bytes
+        self.max_clients = max(1, memory_bytes // self.record_bytes)
+        self._records: "OrderedDict[str, ClientBehavior]" = OrderedDict()
+        # Address -> its `address|credential` keys, so a source address is scored across its users
+        self._credential_keys: Dict[str, Set[str]] = {}
+        self.on_anomaly: Optional[Callable[[str, float, Dict[str, float]], None]] = None
+        self._baseline_mean = [0.0] * len(FEATURES)
+        self._baseline_var = [0.0] * len(FEATURES)
+        self._baseline_spread = [1e-3] * len(FEATURES)
+        self._baseline_samples = 0
+        self._baseline_updated = time.time()
+        self.configure(False, 7, 0.75, True, True)
+        self.events = 0
+        self.evicted = 0
+        self.anomalies = 0
+
+    @staticmethod
+    def _record_size() -> int:
+        """Approximate bytes per client: the record, its floats and path counts, the key and the dict entry"""
+        record = ClientBehavior(time.time(), 1.0)
+        return (
+            sys.getsizeof(record) + sys.getsizeof(record.counts) + 5 * sys.getsizeof(1.0)
+            + sys.getsizeof("255.255.255.255") + 100
+        )
+
+    def configure(
+        self, enabled: bool, baseline_period: float, anomaly_threshold: float,
+        track_user_patterns: bool, alert_on_deviation: bool
+    ):
+        self.enabled = enabled
+        self.baseline_period = baseline_period
+        self.anomaly_threshold = anomaly_threshold
+        self.track_user_patterns = track_user_patterns
+        self.alert_on_deviation = alert_on_deviation
+
+    def observe(self, client: str, path: str, status: int, now: float):
+        """Fold one request of `client` into its record"""
+        self.events += 1
+        records = self._records
+        record = records.get(client)
+        if record is None:
+            if len(records) >= self.max_clients:
+                self._forget(records.popitem(last=False)[0])
+                self.evicted += 1
+            record = records[client] = ClientBehavior(now, INVERSE_RATE_WINDOW)
+            ip, separator, _ = client.partition("|")
+            if separator:
+                self._credential_keys.setdefault(ip, set()).add(client)
+        else:
+            records.move_to_end(client)
+            dt = now - record.last
+            if dt > 0:
+                record.last = now
+                record.rate = record.rate * exp(-dt * INVERSE_RATE_WINDOW) + INVERSE_RATE_WINDOW
+            else:
+                dt = 0.0
+                record.rate += INVERSE_RATE_WINDOW
+            delta = dt - record.dt_mean
+            record.dt_mean += ALPHA * delta
+            record.dt_var = (1 - ALPHA) * (record.dt_var + ALPHA * delta * delta)
+        if status >= 400:
+            record.error += ALPHA * (1 - record.error)
+        else:
+            record.error -= ALPHA * record.error
+
+        counts = record.counts
+        bucket = hash(path) & (PATH_BUCKETS - 1)
+        count = counts[bucket]
+        if count == 255:
+            record.halve_paths()
+            count = counts[bucket]
+        counts[bucket] = count + 1
+        record.c_log_c += C_LOG_C[count + 1] - C_LOG_C[count]
+        record.total += 1
+
+        record.events += 1
+        if not record.events & SCORE_MASK:
+            self._checkpoint(client, record, now)
+
+    def _forget(self, client: str):
+        ip, separator, _ = client.partition("|")
+        if separator:
+            keys = self._credential_keys.get(ip)
+            if keys is not None:
+                keys.discard(client)
+                if not keys:
+                    del self._credential_keys[ip]
+
+    def _checkpoint(self, client: str, record: ClientBehavior, now: float):
+        features = record.features(now)
+        scaled = self._scaled(features)
+        score = self._score(scaled, record.events)
+        self._update_baseline(scaled, now)
+        if score < self.anomaly_threshold:
+            record.alerted = False
+        elif not record.alerted:
+            record.alerted = True
+            self.anomalies += 1
+            if self.alert_on_deviation and self.on_anomaly is not None:
+                self.on_anomaly(client, score, dict(zip(FEATURES, features)))
+
+    def _update_baseline(self, scaled: Tuple[float, ...], now: float):
+        self._baseline_samples += 1
+        # Equal weights while warming up, then a time constant of baseline_period days
+        elapsed = max(0.0, now - self._baseline_updated)
+        alpha = max(1.0 / self._baseline_samples, 1 - exp(-elapsed / (self.baseline_period * 86400)))
+        self._baseline_updated += elapsed
+        mean = self._baseline_mean
+        var = self._baseline_var
+        spread = self._baseline_spread
+        for index in range(len(FEATURES)):
+            delta = scaled[index] - mean[index]
+            mean[index] += alpha * delta
+            var[index] = (1 - alpha) * (var[index] + alpha * delta * delta)
+            # A floor on the spread, so a feature that never varied doesn't make every change infinite
+            spread[index] = max(math.sqrt(var[index]), 0.05 * abs(mean[index]), 1e-3)
+
+    @staticmethod
+    def _scaled(features: Tuple[float, ...]) -> Tuple[float, ...]:
+        # Request rates are heavy tailed, so they are compared on a log scale
+        return (math.log1p(features[0]), features[1], features[2], features[3])
+
+    def _score(self, scaled: Tuple[float, ...], events: int) -> float:
+        if events < self.MIN_EVENTS or self._baseline_samples < self.MIN_BASELINE:
+            return 0.0
+        mean = self._baseline_mean
+        spread = self._baseline_spread
+        directions = self.DIRECTIONS
+        deviation = 0.0
+        for index in range(len(FEATURES)):
+            z = directions[index] * (scaled[index] - mean[index]) / spread[index]
+            if z > deviation:
+                deviation = z
+        return 1 - exp(-deviation / 3)
+
+    def score(self, client: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Features and anomaly score of a client, or None if it isn't tracked"""
+        record = self._records.get(client)
+        if record is None:
+            return None
+        features = record.features(now or time.time())
+        score = self._score(self._scaled(features), record.events)
+        return {
+            "client": client,
+            "score": round(score, 4),
+            "anomalous": score >= self.anomaly_threshold,
+            "threshold": self.anomaly_threshold,
+            "events": record.events,
+            "features": {name: round(value, 4) for name, value in zip(FEATURES, features)}
+        }
+
+    def score_source(self, ip: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Most anomalous record of an address: the address itself or any `address|credential` key"""
+        now = now or time.time()
+        best = None
+        for client in (ip, *self._credential_keys.get(ip, ())):
+            result = self.score(client, now)
+            if result is not None and (best is None or result["score"] > best["score"]):
+                best = result
+        return best
+
+    def top(self, limit: int, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Most anomalous tracked clients, highest score first; call on the loop, which mutates the records"""
+        now = now or time.time()
+        scored = heapq.nlargest(limit, (
+            (self._score(self._scaled(record.features(now)), record.events), client)
+            for client, record in self._records.items() if record.events >= self.MIN_EVENTS
+        ))
+        return [self.score(client, now) for _, client in scored]
+
+    def baseline(self) -> Dict[str, Any]:
+        return {
+            "samples": self._baseline_samples,
+            "mean": {name: round(value, 4) for name, value in zip(FEATURES, self._baseline_mean)},
+            "stddev": {name: round(math.sqrt(value), 4) for name, value in zip(FEATURES, self._baseline_var)}
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "baseline_period": self.baseline_period,
+            "anomaly_threshold": self.anomaly_threshold,
+            "track_user_patterns": self.track_user_patterns,
+            "alert_on_deviation": self.alert_on_deviation,
+            "clients": len(self._records),
+            "max_clients": self.max_clients,
+            "record_bytes": self.record_bytes,
+            "memory_bytes": self.memory_bytes,
+            "events": self.events,
+            "evicted": self.evicted,
+            "anomalies": self.anomalies,
+            "baseline": self.baseline()
+        }
+
+
+class BehaviorMiddleware:
+    """Pure ASGI middleware: feeds every HTTP request's client, path and response status to the engine
+
+    With track_user_patterns, clients sending an API key or bearer token are
+    tracked per address and credential instead of per address only, so users
+    behind one address get separate records.
+    """
+
+    def __init__(self, app, engine: BehaviorEngine):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        engine = self.engine
+        if scope["type"] != "http" or not engine.enabled:
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def observed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, observed_send)
+        finally:
+            try:
+                engine.observe(self.client_key(scope), scope.get("path", ""), status, time.time())
+            except Exception:
+                # Scoring must never fail the request it observed
+                logger.exception("Behavior engine failed to observe a request")
+
+    def client_key(self, scope) -> str:
+        client = scope.get("client")
+        ip = client[0] if client else ""
+        if not self.engine.track_user_patterns:
+            return ip
+        for name, value in scope.get("headers") or ():
+            if name == b"x-api-key" or name == b"authorization":
+                return f"{ip}|{hash(value) & 0xffffffff:08x}"
+        return ip
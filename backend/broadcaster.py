@@ -0,0 +1,101 @@
+"""
+Broadcaster Module
+In-process fan-out of published events to many subscribers with bounded queues
+"""
+
+import asyncio
+from typing import Any, Callable, Optional, Set
+
+# Lag policies for subscribers that cannot keep up
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+
+class Subscription:
+    """A single subscriber with a bounded queue and optional server-side filter"""
+
+    def __init__(
+        self,
+        broadcaster: "Broadcaster",
+        queue_size: int,
+        predicate: Optional[Callable[[Any], bool]] = None,
+        lag_policy: str = DROP_OLDEST
+    ):
+        self._broadcaster = broadcaster
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.predicate = predicate
+        self.lag_policy = lag_policy
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, item: Any, encoded: Any):
+        """Enqueue without blocking the publisher, applying the lag policy when full"""
+        if self.closed:
+            return
+        if self.predicate is not None and not self.predicate(item):
+            return
+        if self._queue.full():
+            self.dropped += 1
+            if self.lag_policy == DISCONNECT:
+                self.close()
+                return
+            self._queue.get_nowait()
+        self._queue.put_nowait(encoded)
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        """Wait for the next encoded item; returns None on timeout or when closed"""
+        if self.closed and self._queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def take_dropped(self) -> int:
+        """Return and reset the number of items dropped since the last call"""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._broadcaster.unsubscribe(self)
+            # Wake a reader blocked on an empty queue
+            if self._queue.empty():
+                self._queue.put_nowait(None)
+
+
+class Broadcaster:
+    """Publishes each item once and fans it out to every subscriber"""
+
+    def __init__(self, queue_size: int = 256, encoder: Optional[Callable[[Any], Any]] = None):
+        self.queue_size = queue_size
+        self.encoder = encoder
+        self._subscribers: Set[Subscription] = set()
+        self.published = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(
+        self,
+        predicate: Optional[Callable[[Any], bool]] = None,
+        queue_size: Optional[int] = None,
+        lag_policy: str = DROP_OLDEST
+    ) -> Subscription:
+        subscription = Subscription(self, queue_size or self.queue_size, predicate, lag_policy)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, item: Any):
+        """Encode the item once and offer it to all subscribers"""
+        self.published += 1
+        if not self._subscribers:
+            return
+        encoded = self.encoder(item) if self.encoder else item
+        for subscription in list(self._subscribers):
+            subscription.offer(item, encoded)
@@ -0,0 +1,145 @@
+"""
+Circuit Breaker Module
+Rolling error-rate and latency breaker that sheds calls to a degraded dependency
+"""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Any, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Opens when the error rate or slow-call rate over the window crosses its threshold
+
+    While open every call is refused; after `open_seconds` up to `half_open_calls`
+    probes are let through and their outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1
+    ):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (timestamp, failed, slow, latency) per call inside the window
+        self._calls: Deque[Tuple[float, bool, bool, float]] = deque()
+        self._failures = 0
+        self._slow = 0
+        self._latency_sum = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self.last_trip_reason: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; counts a probe slot when half-open"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_calls:
+            self._probes += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self, latency: float):
+        self._record(False, latency)
+
+    def record_failure(self, latency: float):
+        self._record(True, latency)
+
+    def record_skipped(self):
+        """A call allow() let through never reached the dependency: free its probe slot, record nothing"""
+        if self._state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _record(self, failed: bool, latency: float):
+        now = time.monotonic()
+        slow = latency >= self.slow_call_seconds
+        if self._state == HALF_OPEN:
+            if failed or slow:
+                self._trip(now, "probe failed" if failed else "probe too slow")
+            else:
+                self._state = CLOSED
+                self._reset_window()
+            return
+        if self._state == OPEN:
+            # Result of a call started before the trip
+            return
+
+        self._calls.append((now, failed, slow, latency))
+        self._failures += failed
+        self._slow += slow
+        self._latency_sum += latency
+        self._expire(now)
+
+        calls = len(self._calls)
+        if calls < self.min_calls:
+            return
+        if self._failures / calls >= self.error_rate:
+            self._trip(now, f"error rate {self._failures / calls:.0%}")
+        elif self._slow / calls >= self.slow_call_rate:
+            self._trip(now, f"slow call rate {self._slow / calls:.0%}")
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        calls = self._calls
+        while calls and calls[0][0] < cutoff:
+            _, failed, slow, latency = calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+            self._latency_sum -= latency
+
+    def _trip(self, now: float, reason: str):
+        self._state = OPEN
+        self._opened_at = now
+        self.trips += 1
+        self.last_trip_reason = reason
+        self._reset_window()
+
+    def _reset_window(self):
+        self._calls.clear()
+        self._failures = 0
+        self._slow = 0
+        self._latency_sum = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        self._expire(time.monotonic())
+        calls = len(self._calls)
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "last_trip_reason": self.last_trip_reason,
+            "window_calls": calls,
+            "window_error_rate": self._failures / calls if calls else 0.0,
+            "window_slow_call_rate": self._slow / calls if calls else 0.0,
+            "window_average_latency": self._latency_sum / calls if calls else 0.0,
+            "error_rate_threshold": self.error_rate,
+            "slow_call_seconds": self.slow_call_seconds,
+            "open_seconds": self.open_seconds
+        }
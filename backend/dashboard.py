@@ -0,0 +1,80 @@
+"""
+Dashboard Channel Module
+Versioned, per-topic state deltas pushed to dashboards over one WebSocket
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Iterable, List, Set
+
+from broadcaster import Broadcaster, Subscription
+
+# Topics a dashboard can subscribe to
+TOPICS = ("defense", "mechanisms", "statistics", "attacks")
+
+
+class DashboardHub:
+    """Publishes versioned deltas per topic and builds snapshots on connect"""
+
+    def __init__(self, queue_size: int = 256):
+        self.broadcaster = Broadcaster(queue_size=queue_size, encoder=self._encode)
+        self.versions: Dict[str, int] = {topic: 0 for topic in TOPICS}
+        self._snapshot_providers: Dict[str, Callable[[], Any]] = {}
+
+    @staticmethod
+    def _encode(message: Dict[str, Any]) -> str:
+        return json.dumps(message, default=str)
+
+    def register_snapshot(self, topic: str, provider: Callable[[], Any]):
+        """Register a function returning the full current state of a topic"""
+        if topic not in self.versions:
+            raise ValueError(f"Unknown dashboard topic: {topic}")
+        self._snapshot_providers[topic] = provider
+
+    def publish(self, topic: str, data: Dict[str, Any], key: Optional[str] = None):
+        """Publish a partial update for a topic; `key` identifies the object within it"""
+        if topic not in self.versions:
+            raise ValueError(f"Unknown dashboard topic: {topic}")
+        self.versions[topic] += 1
+        # Nobody listening: only the version moves, nothing is encoded
+        if not self.broadcaster.subscriber_count:
+            return
+        message = {
+            "type": "delta",
+            "topic": topic,
+            "version": self.versions[topic],
+            "data": data,
+            "timestamp": datetime.now().isoformat()
+        }
+        if key is not None:
+            message["key"] = key
+        self.broadcaster.publish(message)
+
+    def snapshot(self, topics: Iterable[str]) -> List[str]:
+        """Encoded snapshot messages for the given topics"""
+        messages = []
+        for topic in topics:
+            provider = self._snapshot_providers.get(topic)
+            if provider is None:
+                continue
+            messages.append(self._encode({
+                "type": "snapshot",
+                "topic": topic,
+                "version": self.versions[topic],
+                "data": provider(),
+                "timestamp": datetime.now().isoformat()
+            }))
+        return messages
+
+    def subscribe(self, topics: Set[str]) -> Subscription:
+        """Subscribe to deltas; `topics` may be mutated later to change the subscription"""
+        return self.broadcaster.subscribe(predicate=lambda message: message["topic"] in topics)
+
+    @staticmethod
+    def parse_topics(raw: Optional[Iterable[str]]) -> Set[str]:
+        """Validate requested topics; empty means all topics"""
+        topics = {topic.strip() for topic in raw or () if topic and topic.strip()}
+        unknown = topics - set(TOPICS)
+        if unknown:
+            raise ValueError(f"Unknown dashboard topics: {', '.join(sorted(unknown))}")
+        return topics or set(TOPICS)
@@ -0,0 +1,534 @@
+"""
+Firewall Module
+CIDR allow/deny rules in compressed radix tries, per-source connection limits and an ASGI middleware
+"""
+
+import gc
+import ipaddress
+import json
+import math
+import socket
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+ALLOW = "allow"
+DENY = "deny"
+ACTIONS = (ALLOW, DENY)
+
+
+class TrieNode:
+    __slots__ = ("key", "length", "value", "children")
+
+    def __init__(self, key: int, length: int, value: Optional[str] = None):
+        self.key = key
+        self.length = length
+        self.value = value
+        self.children: List[Optional["TrieNode"]] = [None, None]
+
+
+class CIDRTrie:
+    """Path-compressed binary trie over `width`-bit addresses; longest-prefix match
+
+    Each node holds a whole prefix, so a lookup visits at most one node per
+    branching point on the way down: O(prefix length), independent of the
+    number of rules. The top INDEX_BITS levels are also flattened into a
+    direct index (deepest node of length <= INDEX_BITS per address block, and
+    the best value above it), so a walk starts below the densest part of the
+    trie instead of at the root.
+    """
+
+    INDEX_BITS = 16
+
+    def __init__(self, width: int):
+        self.width = width
+        self.root = TrieNode(0, 0)
+        self.size = 0
+        self._shift = width - self.INDEX_BITS
+        self._index_nodes: List[TrieNode] = [self.root] * (1 << self.INDEX_BITS)
+        self._index_best: List[Optional[str]] = [None] * (1 << self.INDEX_BITS)
+
+    def _bit(self, key: int, position: int) -> int:
+        return (key >> (self.width - 1 - position)) & 1
+
+    def insert(self, key: int, length: int, value: str):
+        """Add or overwrite a prefix"""
+        width = self.width
+        # Index entries are always on the key's path, so the walk can start there
+        node = self._index_nodes[key >> self._shift]
+        if node.length > length:
+            node = self.root
+        while True:
+            if length == node.length:
+                if node.value is None:
+                    self.size += 1
+                node.value = value
+                break
+            bit = (key >> (width - 1 - node.length)) & 1
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = node = TrieNode(key, length, value)
+                self.size += 1
+                break
+            if child.length <= length and not (key ^ child.key) >> (width - child.length):
+                node = child
+                continue
+            # Split the edge at the first differing bit (or at the new prefix's end)
+            common = min(length, child.length, width - (key ^ child.key).bit_length())
+            if common == length:
+                new = TrieNode(key, length, value)
+                new.children[self._bit(child.key, length)] = child
+                node.children[bit] = node = new
+            else:
+                new = TrieNode(key >> (width - common) << (width - common), common)
+                new.children[self._bit(child.key, common)] = child
+                node.children[bit] = new
+                new.children[self._bit(key, common)] = node = TrieNode(key, length, value)
+                if common <= self.INDEX_BITS:
+                    self._index_split(new, key)
+            self.size += 1
+            break
+        if length <= self.INDEX_BITS:
+            self._fill(node, self._best_above(key, length))
+
+    def remove(self, key: int, length: int) -> bool:
+        """Clear a prefix's value; the (now valueless) node stays in place"""
+        node = self.root
+        while node is not None and node.length <= length:
+            if node.length == length:
+                if node.key != key or node.value is None:
+                    return False
+                node.value = None
+                self.size -= 1
+                if length <= self.INDEX_BITS:
+                    self._fill(node, self._best_above(key, length))
+                return True
+            node = node.children[self._bit(key, node.length)]
+        return False
+
+    def _best_above(self, key: int, length: int) -> Optional[str]:
+        """Longest-match value among prefixes of (key, length) shorter than `length`"""
+        node = self.root
+        best = None
+        while node is not None and node.length < length and not (key ^ node.key) >> (self.width - node.length):
+            if node.value is not None:
+                best = node.value
+            node = node.children[self._bit(key, node.length)]
+        return best
+
+    def _index_split(self, split: TrieNode, key: int):
+        """Point the new leaf's side of a valueless split node's range at the split node
+
+        The other side holds the existing subtree, whose entries stay valid.
+        """
+        best = self._best_above(split.key, split.length)
+        if split.length == self.INDEX_BITS:
+            start, span = split.key >> self._shift, 1
+        else:
+            span = 1 << (self.INDEX_BITS - split.length - 1)
+            start = (split.key >> self._shift) + span * self._bit(key, split.length)
+        self._index_nodes[start:start + span] = [split] * span
+        self._index_best[start:start + span] = [best] * span
+
+    def _fill(self, node: TrieNode, best: Optional[str]):
+        if node.value is not None:
+            best = node.value
+        start = node.key >> self._shift
+        span = 1 << (self.INDEX_BITS - node.length)
+        self._index_nodes[start:start + span] = [node] * span
+        self._index_best[start:start + span] = [best] * span
+        for child in node.children:
+            if child is not None and child.length <= self.INDEX_BITS:
+                self._fill(child, best)
+
+    def lookup(self, address: int) -> Optional[str]:
+        width = self.width
+        block = address >> self._shift
+        node = self._index_nodes[block]
+        best = self._index_best[block]
+        length = node.length
+        while length < width:
+            node = node.children[(address >> (width - 1 - length)) & 1]
+            if node is None:
+                break
+            length = node.length
+            if (address ^ node.key) >> (width - length):
+                break
+            if node.value is not None:
+                best = node.value
+        return best
+
+
+def parse_address(ip: str) -> Tuple[int, int]:
+    """(version, integer) for an IP string; raises OSError/ValueError if invalid"""
+    if ":" in ip:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big")
+    return 4, int.from_bytes(socket.inet_aton(ip), "big")
+
+
+def parse_cidr(text: str) -> Tuple[str, int, int, int]:
+    """(normalized cidr, version, network integer, prefix length); host bits are cleared
+
+    Done with inet_pton rather than ipaddress, which is ~10x slower and
+    dominates bulk loads of 100k+ rules. Raises ValueError if invalid.
+    """
+    address, _, length_text = text.strip().partition("/")
+    try:
+        version, key = parse_address(address)
+        width = 32 if version == 4 else 128
+        length = int(length_text) if length_text else width
+    except (OSError, ValueError):
+        raise ValueError(f"Invalid CIDR: {text!r}")
+    if not 0 <= length <= width or (version == 4 and address.count(".") != 3):
+        raise ValueError(f"Invalid CIDR: {text!r}")
+    key = key >> (width - length) << (width - length)
+    if version == 4:
+        network = socket.inet_ntop(socket.AF_INET, key.to_bytes(4, "big"))
+    else:
+        network = socket.inet_ntop(socket.AF_INET6, key.to_bytes(16, "big"))
+    return f"{network}/{length}", version, key, length
+
+
+def parse_rule(rule: Dict[str, Any]) -> Tuple[str, int, int, int, str]:
+    """(normalized cidr, version, network integer, prefix length, action) for a rule dict; raises ValueError"""
+    if not isinstance(rule, dict):
+        raise ValueError("Each rule must be an object with cidr and action")
+    cidr, version, key, length = parse_cidr(str(rule.get("cidr", "")))
+    action = rule.get("action", DENY)
+    if action not in ACTIONS:
+        raise ValueError(f"Invalid action for {cidr}: {action!r} (allow or deny)")
+    return cidr, version, key, length, action
+
+
+def parse_firewall_settings(settings: Dict[str, Any]) -> Tuple[int, bool, bool, float]:
+    """(max_connections, strict_mode, auto_learn, block_threshold); raises ValueError"""
+    try:
+        max_connections = int(settings.get("max_connections", 1000))
+        block_threshold = float(settings.get("block_threshold", 0.8))
+    except (TypeError, ValueError):
+        raise ValueError("max_connections and block_threshold must be numbers")
+    if max_connections < 0:
+        raise ValueError("max_connections must not be negative")
+    if not 0 <= block_threshold <= 1:
+        raise ValueError("block_threshold must be between 0 and 1")
+    return max_connections, bool(settings.get("strict_mode", False)), bool(settings.get("auto_learn", False)), block_threshold
+
+
+class RuleTable:
+    """Rules by CIDR plus one trie per address family; replaced as a whole on bulk loads
+
+    Learned host rules (source auto_learn) are not put in the tries; `build`
+    keeps them in `learned` for Firewall.replace_rules, which tracks them
+    separately with their expiry.
+    """
+
+    def __init__(self):
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        self.tries = {4: CIDRTrie(32), 6: CIDRTrie(128)}
+        self.learned: List[Tuple[Tuple[int, int], Dict[str, Any]]] = []
+
+    def add(
+        self,
+        cidr: str,
+        version: int,
+        key: int,
+        length: int,
+        action: str,
+        source: str,
+        created: Optional[str] = None
+    ):
+        self.rules[cidr] = {"cidr": cidr, "action": action, "source": source, "created": created or datetime.now().isoformat()}
+        self.tries[version].insert(key, length, action)
+
+    def remove(self, cidr: str) -> bool:
+        if self.rules.pop(cidr, None) is None:
+            return False
+        _, version, key, length = parse_cidr(cidr)
+        self.tries[version].remove(key, length)
+        return True
+
+    @classmethod
+    def build(cls, rules: Iterable[Dict[str, Any]]) -> "RuleTable":
+        """New table from rule dicts; raises ValueError on the first invalid rule"""
+        table = cls()
+        created = datetime.now().isoformat()
+        # Hundreds of thousands of acyclic nodes: skip the GC passes they would trigger
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for rule in rules:
+                cidr, version, key, length, action = parse_rule(rule)
+                source = rule.get("source", "manual")
+                if source == "auto_learn" and action == DENY and length == (32 if version == 4 else 128):
+                    table.learned.append(((version, key), {
+                        "cidr": cidr, "action": DENY, "source": source,
+                        "created": rule.get("created") or created, "expires": rule.get("expires")
+                    }))
+                    continue
+                table.add(cidr, version, key, length, action, source, rule.get("created") or created)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return table
+
+
+def is_learnable(ip: str) -> bool:
+    """False for loopback, private, link-local and other non-public addresses, which are never learned"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    address = getattr(address, "ipv4_mapped", None) or address
+    return not (
+        address.is_private or address.is_loopback or address.is_link_local
+        or address.is_unspecified or address.is_reserved or address.is_multicast
+    )
+
+
+def parse_expiry(text: Optional[str], default: float) -> float:
+    try:
+        return datetime.fromisoformat(text).timestamp() if text else default
+    except (TypeError, ValueError):
+        return default
+
+
+class Firewall:
+    """Allow/deny decisions by longest matching CIDR, and per-source concurrent connection limits
+
+    The rule table is one object swapped in a single assignment, so a bulk
+    replace is atomic for lookups. Recent trie matches are cached per source
+    address, so repeat clients skip the trie walk. Unmatched sources are allowed, or denied
+    in strict mode.
+
+    Learned deny rules (auto_learn) are host rules kept apart from the tries:
+    they expire after `learn_ttl` seconds, are capped at `max_learned` (the
+    oldest are dropped first), lose to explicit allow rules, and are not
+    applied to management requests, so a learned rule can never lock an
+    operator out of the API that removes it.
+    """
+
+    def __init__(self, max_learned: int = 10000, cache_size: int = 65536, learn_ttl: float = 3600):
+        self.table = RuleTable()
+        # (trie match, learned) by source IP; cleared whenever the rules change
+        self.cache_size = cache_size
+        self._decisions: Dict[str, Tuple[Optional[str], bool]] = {}
+        self.enabled = False
+        self.max_connections = 0
+        self.strict_mode = False
+        self.auto_learn = False
+        self.block_threshold = 0.8
+        self.max_learned = max_learned
+        self.learn_ttl = learn_ttl
+        # (version, address) -> (expiry timestamp, rule), in expiry order
+        self._learned: Dict[Tuple[int, int], Tuple[float, Dict[str, Any]]] = {}
+        self._next_expiry = math.inf
+        self.connections: Dict[str, int] = {}
+        self.on_block: Optional[Callable[[str, str], None]] = None
+        self.allowed = 0
+        self.denied = 0
+        self.connections_rejected = 0
+        self.learned = 0
+        self.expired = 0
+
+    def configure(self, enabled: bool, max_connections: int, strict_mode: bool, auto_learn: bool, block_threshold: float):
+        self.enabled = enabled
+        self.max_connections = max_connections
+        self.strict_mode = strict_mode
+        self.auto_learn = auto_learn
+        self.block_threshold = block_threshold
+
+    def decide(self, ip: str, management: bool = False) -> str:
+        """ALLOW or DENY for a source address (unparseable sources match no rule)
+
+        Management requests ignore learned rules; explicit allow rules always win over them.
+        """
+        entry = self._decisions.get(ip)
+        if entry is None:
+            try:
+                version, address = parse_address(ip)
+            except (OSError, ValueError):
+                entry = (None, False)
+            else:
+                entry = (self.table.tries[version].lookup(address), (version, address) in self._learned)
+            if len(self._decisions) >= self.cache_size:
+                self._decisions.clear()
+            self._decisions[ip] = entry
+        action, learned = entry
+        if action == ALLOW:
+            return ALLOW
+        if learned and not management:
+            return DENY
+        if action is None:
+            return DENY if self.strict_mode else ALLOW
+        return action
+
+    def admit(self, ip: str, management: bool = False) -> Optional[str]:
+        """None if a connection from `ip` may proceed (call release() when it ends), else why not"""
+        if self._learned and self._next_expiry <= time.time():
+            self.expire()
+        if self.decide(ip, management) == DENY:
+            self.denied += 1
+            reason = "denied"
+        elif self.max_connections and self.connections.get(ip, 0) >= self.max_connections:
+            self.connections_rejected += 1
+            reason = "max_connections"
+        else:
+            self.connections[ip] = self.connections.get(ip, 0) + 1
+            self.allowed += 1
+            return None
+        if self.on_block is not None:
+            self.on_block(ip, reason)
+        return reason
+
+    def release(self, ip: str):
+        count = self.connections.get(ip, 0) - 1
+        if count > 0:
+            self.connections[ip] = count
+        else:
+            self.connections.pop(ip, None)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop learned rules past their expiry; returns how many"""
+        now = time.time() if now is None else now
+        expired = 0
+        for key, (expires, _) in list(self._learned.items()):
+            if expires > now:
+                break
+            del self._learned[key]
+            expired += 1
+        if expired:
+            self.expired += expired
+            self._decisions.clear()
+        self._reset_next_expiry()
+        return expired
+
+    def _reset_next_expiry(self):
+        self._next_expiry = next(iter(self._learned.values()))[0] if self._learned else math.inf
+
+    def replace_rules(self, table: RuleTable):
+        now = time.time()
+        learned = sorted(
+            ((parse_expiry(rule.pop("expires", None), now + self.learn_ttl), key, rule) for key, rule in table.learned),
+            key=lambda item: item[0]
+        )[-self.max_learned:] if self.max_learned else []
+        self._learned = {}
+        for expires, key, rule in learned:
+            if expires > now:
+                rule["expires"] = datetime.fromtimestamp(expires).isoformat()
+                self._learned[key] = (expires, rule)
+        table.learned = []
+        self.table = table
+        self._decisions.clear()
+        self._reset_next_expiry()
+
+    def add_rule(self, rule: Dict[str, Any], source: str = "manual") -> Dict[str, Any]:
+        cidr, version, key, length, action = parse_rule(rule)
+        self.table.add(cidr, version, key, length, action, source)
+        self._decisions.clear()
+        return self.table.rules[cidr]
+
+    def remove_rule(self, cidr: str) -> bool:
+        try:
+            cidr, version, key, length = parse_cidr(cidr)
+        except ValueError:
+            return False
+        removed = self.table.remove(cidr)
+        if self._learned.pop((version, key), None) is not None:
+            self._reset_next_expiry()
+            removed = True
+        self._decisions.clear()
+        return removed
+
+    def learn(self, ip: str, confidence: float = 1.0) -> Optional[Dict[str, Any]]:
+        """Deny a blocked public source for learn_ttl seconds (auto_learn); None if not learned"""
+        if not self.auto_learn or confidence < self.block_threshold or not self.max_learned or not is_learnable(ip):
+            return None
+        try:
+            version, address = parse_address(ip)
+        except (OSError, ValueError):
+            return None
+        cidr = parse_cidr(ip)[0]
+        # Explicit allow rules and existing rules win over learning
+        if (version, address) in self._learned or cidr in self.table.rules or self._matches_allow(ip):
+            return None
+        now = time.time()
+        expires = now + self.learn_ttl
+        rule = {
+            "cidr": cidr, "action": DENY, "source": "auto_learn",
+            "created": datetime.fromtimestamp(now).isoformat(), "expires": datetime.fromtimestamp(expires).isoformat()
+        }
+        self._learned[(version, address)] = (expires, rule)
+        self._decisions.pop(ip, None)
+        self.learned += 1
+        while len(self._learned) > self.max_learned:
+            del self._learned[next(iter(self._learned))]
+            self._decisions.clear()
+        self._reset_next_expiry()
+        return rule
+
+    def _matches_allow(self, ip: str) -> bool:
+        try:
+            version, address = parse_address(ip)
+        except (OSError, ValueError):
+            return False
+        return self.table.tries[version].lookup(address) == ALLOW
+
+    def rules(self) -> List[Dict[str, Any]]:
+        if self._learned:
+            self.expire()
+        return list(self.table.rules.values()) + [rule for _, rule in self._learned.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "strict_mode": self.strict_mode,
+            "auto_learn": self.auto_learn,
+            "max_connections": self.max_connections,
+            "rules": len(self.table.rules) + len(self._learned),
+            "learned_rules": len(self._learned),
+            "learned_rule_ttl": self.learn_ttl,
+            "active_sources": len(self.connections),
+            "active_connections": sum(self.connections.values()),
+            "allowed": self.allowed,
+            "denied": self.denied,
+            "connections_rejected": self.connections_rejected,
+            "learned": self.learned,
+            "learned_expired": self.expired
+        }
+
+
+class FirewallMiddleware:
+    """Pure ASGI middleware: refuses denied sources and sources over max_connections
+
+    Requests under `management_prefixes` are exempt from learned rules.
+    """
+
+    def __init__(self, app, firewall: Firewall, management_prefixes: Tuple[str, ...] = ()):
+        self.app = app
+        self.firewall = firewall
+        self.management_prefixes = tuple(management_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not self.firewall.enabled:
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        ip = client[0] if client else ""
+        reason = self.firewall.admit(ip, scope.get("path", "").startswith(self.management_prefixes))
+        if reason is None:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.firewall.release(ip)
+            return
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        status = 403 if reason == "denied" else 429
+        body = json.dumps({"detail": "Blocked by firewall" if reason == "denied" else "Too many concurrent connections"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,231 @@
+"""
+Heavy Hitters Module
+Approximate top-K sources, targets and paths over a sliding window, in fixed memory
+"""
+
+import math
+import time
+from array import array
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+DIMENSIONS = ("ips", "hosts", "paths")
+
+
+class CountMinSketch:
+    """`depth` rows of `width` 32-bit counters; estimates never undercount
+
+    Row indexes come from one hash by double hashing. Updates are
+    conservative (only the counters at the current minimum are raised),
+    which keeps the overestimate of rare keys low.
+    """
+
+    __slots__ = ("width", "depth", "mask", "counts")
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        # Power of two, so the column is picked with a mask
+        self.width = 1 << max(0, (width - 1).bit_length())
+        self.depth = depth
+        self.mask = self.width - 1
+        self.counts = array("I", bytes(4 * self.width * depth))
+
+    def _indexes(self, key: str) -> List[int]:
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        mask = self.mask
+        width = self.width
+        first = h & mask
+        step = (h >> 32) | 1
+        return [row * width + ((first + row * step) & mask) for row in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """Count one occurrence of `key`; returns its new estimate"""
+        counts = self.counts
+        indexes = self._indexes(key)
+        estimate = min([counts[index] for index in indexes]) + 1
+        for index in indexes:
+            if counts[index] < estimate:
+                counts[index] = estimate
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        counts = self.counts
+        return min([counts[index] for index in self._indexes(key)])
+
+    def clear(self):
+        self.counts = array("I", bytes(4 * self.width * self.depth))
+
+
+class SpaceSaving:
+    """Space-Saving top list of at most `capacity` keys, O(1) per update
+
+    Keys are grouped in buckets by count (the Stream-Summary structure), so
+    the key to replace is always found in the lowest bucket. A new key takes
+    over the count of the key it replaces plus one, recorded as its error.
+    """
+
+    __slots__ = ("capacity", "counts", "errors", "buckets", "min_count")
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # count -> keys with that count (dicts used as ordered sets)
+        self.buckets: Dict[int, Dict[str, None]] = {}
+        self.min_count = 0
+
+    def add(self, key: str):
+        counts = self.counts
+        buckets = self.buckets
+        count = counts.get(key)
+        if count is None:
+            if len(counts) < self.capacity:
+                count = 0
+                self.errors[key] = 0
+                self.min_count = 0
+            else:
+                # Replace a key with the lowest count
+                count = self.min_count
+                lowest = buckets[count]
+                victim = next(iter(lowest))
+                del lowest[victim]
+                if not lowest:
+                    del buckets[count]
+                del counts[victim]
+                del self.errors[victim]
+                self.errors[key] = count
+        else:
+            bucket = buckets[count]
+            del bucket[key]
+            if not bucket:
+                del buckets[count]
+        counts[key] = count + 1
+        bucket = buckets.get(count + 1)
+        if bucket is None:
+            bucket = buckets[count + 1] = {}
+        bucket[key] = None
+        if count == self.min_count and count not in buckets:
+            self.min_count = count + 1
+
+    def clear(self):
+        self.counts.clear()
+        self.errors.clear()
+        self.buckets.clear()
+        self.min_count = 0
+
+
+class WindowSlice:
+    """Counts of one dimension during one slice of the window"""
+
+    __slots__ = ("sketch", "top", "total")
+
+    def __init__(self, width: int, depth: int, capacity: int):
+        self.sketch = CountMinSketch(width, depth)
+        self.top = SpaceSaving(capacity)
+        self.total = 0
+
+    def add(self, key: str):
+        self.sketch.add(key)
+        self.top.add(key)
+        self.total += 1
+
+    def clear(self):
+        self.sketch.clear()
+        self.top.clear()
+        self.total = 0
+
+
+class TopTalkers:
+    """Sliding-window heavy hitters per dimension (client IPs, target hosts, request paths)
+
+    The window is a ring of `slices` equal slices per dimension, each with a
+    Count-Min Sketch and a Space-Saving list; the oldest slice is cleared
+    and reused when the clock enters a new one. A query sums the sketch
+    estimates of the slices in the requested window for the keys that any of
+    their top lists holds, so memory depends only on the sketch size, the
+    list capacity and the number of slices, never on the number of keys.
+    """
+
+    def __init__(
+        self, window_seconds: float = 300, slices: int = 10, width: int = 2048, depth: int = 4, capacity: int = 64
+    ):
+        self.slices = max(1, slices)
+        self.slice_seconds = window_seconds / self.slices
+        self.window_seconds = self.slice_seconds * self.slices
+        self.capacity = capacity
+        self._rings: Dict[str, List[WindowSlice]] = {
+            dimension: [WindowSlice(width, depth, capacity) for _ in range(self.slices)] for dimension in DIMENSIONS
+        }
+        self._epoch = int(time.time() // self.slice_seconds)
+        # Called after the clock moves into a new slice, e.g. to act on the window that just ended
+        self.on_rotate: Optional[Callable[[], None]] = None
+
+    def _advance(self, now: float) -> int:
+        epoch = int(now // self.slice_seconds)
+        if epoch > self._epoch:
+            # Clear the slices skipped since the last event (all of them after a long quiet period)
+            for skipped in range(max(self._epoch + 1, epoch - self.slices + 1), epoch + 1):
+                for ring in self._rings.values():
+                    ring[skipped % self.slices].clear()
+            self._epoch = epoch
+            if self.on_rotate is not None:
+                self.on_rotate()
+        return self._epoch
+
+    def record(self, dimension: str, key: str, now: Optional[float] = None):
+        epoch = self._advance(now if now is not None else time.time())
+        self._rings[dimension][epoch % self.slices].add(key)
+
+    def _window(self, dimension: str, window: Optional[float], now: float) -> List[WindowSlice]:
+        epoch = self._advance(now)
+        count = self.slices if window is None else min(self.slices, max(1, math.ceil(window / self.slice_seconds)))
+        ring = self._rings[dimension]
+        return [ring[(epoch - offset) % self.slices] for offset in range(count)]
+
+    def estimate(self, dimension: str, key: str, window: Optional[float] = None) -> int:
+        return sum(part.sketch.estimate(key) for part in self._window(dimension, window, time.time()))
+
+    def top(self, dimension: str, limit: int = 10, window: Optional[float] = None) -> Dict[str, Any]:
+        """Top `limit` keys of a dimension over the last `window` seconds (the whole window by default)"""
+        parts = self._window(dimension, window, time.time())
+        candidates = set()
+        for part in parts:
+            candidates.update(part.top.counts)
+        total = sum(part.total for part in parts)
+        ranked: List[Tuple[int, str]] = sorted(
+            ((sum(part.sketch.estimate(key) for part in parts), key) for key in candidates), reverse=True
+        )
+        return {
+            "dimension": dimension,
+            "window": len(parts) * self.slice_seconds,
+            "total": total,
+            "top": [
+                {"key": key, "count": count, "share": round(count / total, 4) if total else 0.0}
+                for count, key in ranked[:limit]
+            ]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        part = self._rings[DIMENSIONS[0]][0]
+        return {
+            "window_seconds": self.window_seconds,
+            "slices": self.slices,
+            "sketch_width": part.sketch.width,
+            "sketch_depth": part.sketch.depth,
+            "capacity": self.capacity,
+            "sketch_bytes": part.sketch.counts.itemsize * len(part.sketch.counts) * self.slices * len(DIMENSIONS)
+        }
+
+
+class TopTalkersMiddleware:
+    """Pure ASGI middleware: counts every HTTP request's client IP and path"""
+
+    def __init__(self, app, tracker: TopTalkers):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            now = time.time()
+            client = scope.get("client")
+            self.tracker.record("ips", client[0] if client else "", now)
+            self.tracker.record("paths", scope.get("path", ""), now)
+        await self.app(scope, receive, send)
@@ -0,0 +1,476 @@
+"""
+Intrusion Detection Module
+Aho-Corasick signature matching over request paths, queries and streamed bodies, and an ASGI middleware
+"""
+
+import json
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+# Built-in signatures are derived from the attack payloads; custom ones are added through the API
+BUILTIN = "builtin"
+CUSTOM = "custom"
+# Patterns up to this length match only as whole words unless word_boundary says otherwise
+SHORT_PATTERN_LENGTH = 6
+# ASCII letters, digits, underscore and non-ASCII (UTF-8) bytes
+WORD_BYTES = frozenset(b"0123456789_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ" + bytes(range(128, 256)))
+
+
+def parse_ids_settings(settings: Dict[str, Any]) -> Tuple[float, bool, int, bool]:
+    """(sensitivity, real_time_analysis, alert_threshold, learning_enabled) from the mechanism settings; raises ValueError"""
+    try:
+        sensitivity = float(settings.get("sensitivity", 0.7))
+        alert_threshold = int(settings.get("alert_threshold", 5))
+    except (TypeError, ValueError):
+        raise ValueError("sensitivity and alert_threshold must be numbers")
+    if not 0 <= sensitivity <= 1:
+        raise ValueError("sensitivity must be between 0 and 1")
+    if alert_threshold < 1:
+        raise ValueError("alert_threshold must be at least 1")
+    return (
+        sensitivity,
+        bool(settings.get("real_time_analysis", True)),
+        alert_threshold,
+        bool(settings.get("learning_enabled", True))
+    )
+
+
+def parse_signature(signature: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized signature record {id, pattern, category, severity, source, word_boundary}; raises ValueError"""
+    if not isinstance(signature, dict):
+        raise ValueError("Signature must be an object")
+    pattern = signature.get("pattern")
+    if not isinstance(pattern, str) or not pattern.strip():
+        raise ValueError("Signature pattern must be a non-empty string")
+    if len(pattern) > 1024:
+        raise ValueError("Signature pattern is longer than 1024 characters")
+    try:
+        severity = float(signature.get("severity", 0.8))
+    except (TypeError, ValueError):
+        raise ValueError("Signature severity must be a number")
+    if not 0 <= severity <= 1:
+        raise ValueError("Signature severity must be between 0 and 1")
+    source = signature.get("source", CUSTOM)
+    return {
+        "id": str(signature.get("id") or f"custom-{uuid.uuid4().hex[:8]}"),
+        "pattern": pattern,
+        "category": str(signature.get("category") or "custom"),
+        "severity": severity,
+        "source": source if source in (BUILTIN, CUSTOM) else CUSTOM,
+        "word_boundary": bool(signature.get("word_boundary", len(pattern) <= SHORT_PATTERN_LENGTH))
+    }
+
+
+def builtin_signatures(groups: Iterable[Tuple[str, str, float, Iterable[str]]]) -> List[Dict[str, Any]]:
+    """Signature records for (id prefix, category, severity, patterns) groups"""
+    signatures = []
+    for prefix, category, severity, patterns in groups:
+        for number, pattern in enumerate(patterns, 1):
+            signatures.append({
+                "id": f"{prefix}-{number:02d}", "pattern": pattern,
+                "category": category, "severity": severity, "source": BUILTIN
+            })
+    return signatures
+
+
+class SignatureMatcher:
+    """Aho-Corasick automaton over a signature set, compiled to a dense DFA
+
+    Matching is case-insensitive. Bytes are first mapped to classes with
+    bytes.translate: bytes that occur in no signature share class 0 if they
+    are not word characters and class 1 if they are, so the transition table
+    has one row of `width` classes per trie state.
+
+    A word_boundary signature whose first (last) byte is a word character
+    only matches after (before) a non-word byte or the edge of the field. It
+    is inserted once per non-word class before (after) it, and every field
+    is scanned as if it began and ended with a class 0 byte: `start` is the
+    state after that leading byte, and `end` feeds the trailing one.
+    Failure links are folded into the table at build time, so a scan is one
+    table lookup per byte whatever the number of signatures. States are
+    numbered so that the matching ones come last and a single comparison per
+    byte tells whether anything matched.
+
+    States are stored pre-multiplied by `width`: a state is the offset of
+    its row in `delta`.
+    """
+
+    def __init__(self, signatures: List[Dict[str, Any]]):
+        self.signatures = signatures
+        patterns = [signature["pattern"].lower().encode() for signature in signatures]
+
+        # Byte classes; upper case ASCII letters share the class of their lower case letter
+        classes = [1 if byte in WORD_BYTES else 0 for byte in range(256)]
+        width = 2
+        used = sorted({byte for pattern in patterns for byte in pattern})
+        for byte in used:
+            classes[byte] = width
+            width += 1
+        for byte in range(ord("A"), ord("Z") + 1):
+            classes[byte] = classes[byte + 32]
+        self.table = bytes(classes)
+        self.width = width
+        boundaries = [0] + [classes[byte] for byte in used if byte not in WORD_BYTES]
+
+        # Trie of class sequences
+        goto: List[Dict[int, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+        for index, pattern in enumerate(patterns):
+            symbols = list(pattern.translate(self.table))
+            bounded = signatures[index].get("word_boundary", False) and bool(pattern)
+            before = boundaries if bounded and pattern[0] in WORD_BYTES else [None]
+            after = boundaries if bounded and pattern[-1] in WORD_BYTES else [None]
+            for lead in before:
+                for trail in after:
+                    state = 0
+                    for symbol in ([lead] if lead is not None else []) + symbols + ([trail] if trail is not None else []):
+                        child = goto[state].get(symbol)
+                        if child is None:
+                            child = len(goto)
+                            goto[state][symbol] = child
+                            goto.append({})
+                            outputs.append(())
+                        state = child
+                    if index not in outputs[state]:
+                        outputs[state] += (index,)
+
+        # Breadth-first: each state's row is its own edges over its failure state's row
+        rows: List[List[int]] = [[0] * width for _ in goto]
+        fail = [0] * len(goto)
+        order = [0]
+        for symbol, child in goto[0].items():
+            rows[0][symbol] = child
+            order.append(child)
+        position = 1
+        while position < len(order):
+            state = order[position]
+            position += 1
+            row = rows[state]
+            row[:] = rows[fail[state]]
+            for symbol, child in goto[state].items():
+                fail[child] = rows[fail[state]][symbol]
+                outputs[child] += tuple(index for index in outputs[fail[child]] if index not in outputs[child])
+                row[symbol] = child
+                order.append(child)
+
+        # Renumber: non-matching states first, then matching ones
+        ranked = sorted(range(len(goto)), key=lambda state: (bool(outputs[state]), state))
+        offset = [0] * len(goto)
+        for rank, state in enumerate(ranked):
+            offset[state] = rank * width
+        self.delta = [offset[target] for state in ranked for target in rows[state]]
+        # After the virtual non-word byte every field starts with; it can't be a matching state
+        self.start = self.delta[offset[0]]
+        self.first_match = sum(1 for state in ranked if not outputs[state]) * width
+        self.outputs = {offset[state]: outputs[state] for state in ranked if outputs[state]}
+        self.states = len(goto)
+
+    def scan(self, data: bytes, state: int, matched: set) -> int:
+        """Feed `data` from `state`, adding indexes of signatures seen to `matched`; returns the new state"""
+        delta = self.delta
+        first_match = self.first_match
+        for symbol in data.translate(self.table):
+            state = delta[state + symbol]
+            if state >= first_match:
+                matched.update(self.outputs[state])
+        return state
+
+    def end(self, state: int, matched: set):
+        """Feed the virtual non-word byte every field ends with"""
+        state = self.delta[state]
+        if state >= self.first_match:
+            matched.update(self.outputs[state])
+
+
+class PercentDecoder:
+    """URL-decodes a stream of chunks; an escape split across chunks is held back for the next one"""
+
+    __slots__ = ("pending",)
+
+    def __init__(self):
+        self.pending = b""
+
+    def decode(self, chunk: bytes) -> bytes:
+        data = self.pending + chunk
+        cut = data.find(b"%", len(data) - 2)
+        if cut == -1:
+            self.pending = b""
+        else:
+            self.pending = data[cut:]
+            data = data[:cut]
+        return unquote_to_bytes(data.replace(b"+", b" "))
+
+
+class RequestScan:
+    """Signatures matched in one request so far and the automaton state of its body"""
+
+    __slots__ = ("matcher", "matched", "locations", "body_state", "body_scanned", "decoder")
+
+    def __init__(self, matcher: SignatureMatcher, form_body: bool):
+        self.matcher = matcher
+        self.matched: set = set()
+        self.locations: List[str] = []
+        self.body_state = matcher.start
+        self.body_scanned = 0
+        self.decoder = PercentDecoder() if form_body else None
+
+    def scan_field(self, location: str, data: bytes):
+        before = len(self.matched)
+        self.matcher.end(self.matcher.scan(data, self.matcher.start, self.matched), self.matched)
+        if len(self.matched) > before:
+            self.locations.append(location)
+
+    def scan_body(self, chunk: bytes, limit: int, more_body: bool = True) -> bool:
+        """Scan the next body chunk, up to `limit` body bytes per request; False once past the limit"""
+        if self.body_scanned >= limit:
+            return False
+        complete = not more_body and len(chunk) <= limit - self.body_scanned
+        chunk = chunk[:limit - self.body_scanned]
+        self.body_scanned += len(chunk)
+        if self.decoder is not None:
+            chunk = self.decoder.decode(chunk)
+            if complete and self.decoder.pending:
+                chunk += unquote_to_bytes(self.decoder.pending)
+        before = len(self.matched)
+        self.body_state = self.matcher.scan(chunk, self.body_state, self.matched)
+        if complete:
+            self.matcher.end(self.body_state, self.matched)
+        if len(self.matched) > before and "body" not in self.locations:
+            self.locations.append("body")
+        return True
+
+
+class IntrusionDetector:
+    """Signature set, per-signature hit counters, recent events and per-source alert counts
+
+    A request is flagged when the most severe signature it matched has a
+    severity of at least 1 - sensitivity. With real_time_analysis on,
+    flagged requests are refused; otherwise they are only recorded. After
+    `alert_threshold` flagged requests from one source, `on_alert` is called
+    and the count starts over.
+    """
+
+    def __init__(self, max_scan_bytes: int = 16384, event_capacity: int = 1000, max_sources: int = 10000):
+        self.max_scan_bytes = max_scan_bytes
+        self.max_sources = max_sources
+        self.matcher = SignatureMatcher([])
+        self.hits: Dict[str, int] = {}
+        self.events: deque = deque(maxlen=event_capacity)
+        self._source_counts: Dict[str, int] = {}
+        self.exempt_prefixes: Tuple[str, ...] = ()
+        self.on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.on_alert: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        self.configure(False, 0.7, True, 5, True)
+        self.requests_scanned = 0
+        self.bytes_scanned = 0
+        self.bodies_truncated = 0
+        self.flagged = 0
+        self.blocked = 0
+        self.alerts = 0
+
+    def configure(self, enabled: bool, sensitivity: float, real_time_analysis: bool, alert_threshold: int, learning_enabled: bool):
+        self.enabled = enabled
+        self.sensitivity = sensitivity
+        self.real_time_analysis = real_time_analysis
+        self.alert_threshold = alert_threshold
+        self.learning_enabled = learning_enabled
+
+    def replace_signatures(self, matcher: SignatureMatcher):
+        """Swap in a compiled signature set; hit counters of signatures that remain are kept"""
+        self.matcher = matcher
+        ids = {signature["id"] for signature in matcher.signatures}
+        self.hits = {signature_id: count for signature_id, count in self.hits.items() if signature_id in ids}
+
+    def start(self, scope) -> Optional[RequestScan]:
+        """Scan the path and query of a request; None if the request is exempt"""
+        path = scope.get("path", "")
+        if path.startswith(self.exempt_prefixes):
+            return None
+        form_body = False
+        for name, value in scope.get("headers") or ():
+            if name == b"content-type":
+                form_body = value.startswith(b"application/x-www-form-urlencoded")
+                break
+        scan = RequestScan(self.matcher, form_body)
+        # The server has already URL-decoded the path
+        raw_path = path.encode("utf-8", "surrogateescape")
+        query = scope.get("query_string") or b""
+        scan.scan_field("path", raw_path)
+        if query:
+            scan.scan_field("query", unquote_to_bytes(query.replace(b"+", b" ")))
+        self.requests_scanned += 1
+        self.bytes_scanned += len(raw_path) + len(query)
+        return scan
+
+    def scan_body(self, scan: RequestScan, chunk: bytes, more_body: bool = True):
+        scanned = scan.body_scanned
+        if not scan.scan_body(chunk, self.max_scan_bytes, more_body):
+            return
+        self.bytes_scanned += scan.body_scanned - scanned
+        if scan.body_scanned >= self.max_scan_bytes:
+            self.bodies_truncated += 1
+
+    def severity(self, scan: RequestScan) -> float:
+        signatures = scan.matcher.signatures
+        return max((signatures[index]["severity"] for index in scan.matched), default=0.0)
+
+    def flags(self, scan: RequestScan) -> bool:
+        return bool(scan.matched) and self.severity(scan) >= 1 - self.sensitivity
+
+    def record(self, scan: RequestScan, scope, blocked: bool):
+        """Count a finished scan's matches; flagged requests become IDS events"""
+        if not scan.matched:
+            return
+        signatures = [scan.matcher.signatures[index] for index in sorted(scan.matched)]
+        for signature in signatures:
+            self.hits[signature["id"]] = self.hits.get(signature["id"], 0) + 1
+        if not self.flags(scan):
+            return
+        client = scope.get("client")
+        source = client[0] if client else ""
+        self.flagged += 1
+        if blocked:
+            self.blocked += 1
+        event = {
+            "event_id": str(uuid.uuid4()),
+            "timestamp": datetime.now().isoformat(),
+            "source": source,
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "locations": list(scan.locations),
+            "signatures": [signature["id"] for signature in signatures],
+            "categories": sorted({signature["category"] for signature in signatures}),
+            "severity": self.severity(scan),
+            "action": "blocked" if blocked else "detected"
+        }
+        self.events.append(event)
+        if self.on_event is not None:
+            self.on_event(event)
+        self._count_source(source, event)
+
+    def _count_source(self, source: str, event: Dict[str, Any]):
+        counts = self._source_counts
+        count = counts.pop(source, 0) + 1
+        if count >= self.alert_threshold:
+            self.alerts += 1
+            if self.on_alert is not None:
+                self.on_alert(source, event)
+            return
+        if len(counts) >= self.max_sources:
+            # Dicts keep insertion order and a counted source is reinserted, so the first is the stalest
+            del counts[next(iter(counts))]
+        counts[source] = count
+
+    def signatures(self) -> List[Dict[str, Any]]:
+        return [dict(signature, hits=self.hits.get(signature["id"], 0)) for signature in self.matcher.signatures]
+
+    def recent_events(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent IDS events first"""
+        events = list(self.events)[-limit:] if limit > 0 else []
+        events.reverse()
+        return events
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sensitivity": self.sensitivity,
+            "real_time_analysis": self.real_time_analysis,
+            "alert_threshold": self.alert_threshold,
+            "learning_enabled": self.learning_enabled,
+            "signatures": len(self.matcher.signatures),
+            "automaton_states": self.matcher.states,
+            "byte_classes": self.matcher.width,
+            "max_scan_bytes": self.max_scan_bytes,
+            "requests_scanned": self.requests_scanned,
+            "bytes_scanned": self.bytes_scanned,
+            "bodies_truncated": self.bodies_truncated,
+            "flagged": self.flagged,
+            "blocked": self.blocked,
+            "alerts": self.alerts,
+            "tracked_sources": len(self._source_counts)
+        }
+
+
+def compile_signatures(signatures: Iterable[Dict[str, Any]]) -> SignatureMatcher:
+    """Validate signature records and compile them; the last record with a given id wins"""
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for signature in signatures:
+        parsed = parse_signature(signature)
+        by_id.pop(parsed["id"], None)
+        by_id[parsed["id"]] = parsed
+    return SignatureMatcher(list(by_id.values()))
+
+
+class IDSMiddleware:
+    """Pure ASGI middleware: scans request paths, queries and bodies as they stream in
+
+    Body chunks are scanned as the application reads them, carrying the
+    automaton state from one chunk to the next, so nothing is buffered. A
+    flagged request is refused with 403 when real_time_analysis is on: at
+    once if the path or query matched, or, if the body did, by answering the
+    application's next read with a disconnect and dropping its response.
+    """
+
+    def __init__(self, app, detector: IntrusionDetector):
+        self.app = app
+        self.detector = detector
+
+    async def __call__(self, scope, receive, send):
+        detector = self.detector
+        if scope["type"] != "http" or not detector.enabled:
+            await self.app(scope, receive, send)
+            return
+        scan = detector.start(scope)
+        if scan is None:
+            await self.app(scope, receive, send)
+            return
+        if detector.real_time_analysis and detector.flags(scan):
+            detector.record(scan, scope, blocked=True)
+            await self._refuse(send)
+            return
+
+        blocked = False
+        response_started = False
+
+        async def scanned_receive():
+            nonlocal blocked
+            if blocked:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                detector.scan_body(scan, message.get("body", b""), message.get("more_body", False))
+                if detector.real_time_analysis and not response_started and detector.flags(scan):
+                    blocked = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if blocked:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, scanned_receive, guarded_send)
+        except Exception:
+            # The application may fail on the disconnect it was handed
+            if not blocked:
+                raise
+        finally:
+            detector.record(scan, scope, blocked)
+        if blocked and not response_started:
+            await self._refuse(send)
+
+    async def _refuse(self, send):
+        body = json.dumps({"detail": "Blocked by intrusion detection"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 403,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
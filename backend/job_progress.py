@@ -0,0 +1,55 @@
+"""
+Job Progress Module
+Throttled progress snapshots for running attacks
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+
+
+class ProgressSlot:
+    """Latest progress of one running job
+
+    The executor loop asks `due()` (one clock read) and only builds a snapshot
+    when it returns True, at most once per `interval`. Each snapshot is a new
+    dict swapped in whole, so readers never see a half-written one.
+    """
+
+    __slots__ = ("interval", "started", "snapshot", "on_publish", "_next_due", "_last_time", "_last_count")
+
+    def __init__(self, interval: float = 1.0, on_publish: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.interval = interval
+        self.started = time.monotonic()
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.on_publish = on_publish
+        self._next_due = self.started + interval
+        self._last_time = self.started
+        self._last_count = 0
+
+    def due(self) -> bool:
+        return time.monotonic() >= self._next_due
+
+    def publish(self, counters: Dict[str, int], errors: Optional[Dict[str, int]] = None, rate_key: Optional[str] = None):
+        """Record a snapshot; `rate_key` names the counter the rates are computed for"""
+        now = time.monotonic()
+        elapsed = now - self.started
+        count = counters.get(rate_key or next(iter(counters), ""), 0)
+        since_last = now - self._last_time
+        snapshot = {
+            "counters": dict(counters),
+            "errors": dict(errors or {}),
+            "elapsed": round(elapsed, 2),
+            "rate": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+            "current_rate": round((count - self._last_count) / since_last, 2) if since_last > 0 else 0.0,
+            "updated_at": datetime.now().isoformat()
+        }
+        self.snapshot = snapshot
+        self._next_due = now + self.interval
+        self._last_time = now
+        self._last_count = count
+        if self.on_publish is not None:
+            try:
+                self.on_publish(snapshot)
+            except Exception as e:
+                print(f"Progress publish error: {e}")
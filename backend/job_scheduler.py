@@ -0,0 +1,255 @@
+"""
+Job Scheduler Module
+Bounded background execution with a priority queue and per-type concurrency caps
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from latency_histogram import WindowedHistogram
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+
+
+class SchedulerFull(Exception):
+    """The queue is at capacity; the submission was rejected"""
+
+
+class Job:
+    __slots__ = (
+        "job_id", "job_type", "priority", "seq", "factory", "timeout", "state",
+        "submitted_at", "started_at", "finished_at", "task", "timer", "deadline_cleared"
+    )
+
+    def __init__(
+        self,
+        job_id: str,
+        job_type: str,
+        priority: int,
+        seq: int,
+        factory: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None
+    ):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.timeout = timeout
+        self.state = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.deadline_cleared = False
+
+
+class JobScheduler:
+    """Runs at most `workers` jobs at once (and at most `type_limits[type]` of one type)
+
+    Jobs wait in a priority queue (higher priority first, then submission
+    order). A queued job whose type is at its cap is passed over for the next
+    runnable one, so one busy type can't stall the others. A running job is
+    cancelled outright once it has run for its `timeout`, unless it has called
+    clear_deadline() to say its bounded phase is over.
+
+    Failed and timed-out jobs are reported to `on_error(job, message)`, or
+    logged when it is not set.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 100,
+        type_limits: Optional[Dict[str, int]] = None,
+        window_seconds: float = 60.0,
+        windows: int = 10
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.type_limits = type_limits or {}
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List[tuple] = []
+        self._counter = itertools.count()
+        self._running_by_type: Dict[str, int] = {}
+        self.running = 0
+        self.queued = 0
+        self.wait_times = WindowedHistogram(window_seconds, windows)
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.timed_out = 0
+        self.on_error: Optional[Callable[[Job, str], None]] = None
+
+    def submit(
+        self,
+        job_id: str,
+        job_type: str,
+        factory: Callable[[], Awaitable[Any]],
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ) -> Job:
+        """Queue a job; raises SchedulerFull when the queue is at capacity"""
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerFull(f"Job queue is full ({self.max_queue} waiting)")
+        job = Job(job_id, job_type, priority, next(self._counter), factory, timeout)
+        self.jobs[job_id] = job
+        heapq.heappush(self._queue, (-priority, job.seq, job))
+        self.queued += 1
+        self.submitted += 1
+        self._dispatch()
+        return job
+
+    def _type_has_capacity(self, job_type: str) -> bool:
+        limit = self.type_limits.get(job_type)
+        return limit is None or self._running_by_type.get(job_type, 0) < limit
+
+    def _dispatch(self):
+        skipped = []
+        while self._queue and self.running < self.workers:
+            entry = heapq.heappop(self._queue)
+            job = entry[2]
+            if job.state != QUEUED:
+                continue
+            if not self._type_has_capacity(job.job_type):
+                skipped.append(entry)
+                continue
+            self._start(job)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+
+    def _start(self, job: Job):
+        job.state = RUNNING
+        job.started_at = time.time()
+        self.queued -= 1
+        self.wait_times.record((job.started_at - job.submitted_at) * 1000)
+        self.running += 1
+        self._running_by_type[job.job_type] = self._running_by_type.get(job.job_type, 0) + 1
+        job.task = asyncio.ensure_future(job.factory())
+        job.task.add_done_callback(lambda task: self._finish(job, task))
+        if job.timeout is not None:
+            job.timer = asyncio.get_running_loop().call_later(job.timeout, self._expire, job)
+
+    def clear_deadline(self, job_id: str):
+        """Drop a running job's hard deadline; later cancel() graces no longer set one"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.deadline_cleared = True
+        if job.timer is not None:
+            job.timer.cancel()
+            job.timer = None
+
+    def _report(self, job: Job, message: str):
+        if self.on_error is not None:
+            self.on_error(job, message)
+        else:
+            logger.warning(message)
+
+    def _expire(self, job: Job):
+        job.timer = None
+        if job.task is not None and not job.task.done():
+            self.timed_out += 1
+            self._report(job, f"Job {job.job_id} exceeded its deadline ({job.timeout}s); cancelling")
+            job.task.cancel()
+
+    def _finish(self, job: Job, task: asyncio.Task):
+        if job.timer is not None:
+            job.timer.cancel()
+            job.timer = None
+        job.state = FINISHED
+        job.finished_at = time.time()
+        self.running -= 1
+        self._running_by_type[job.job_type] -= 1
+        if task.cancelled() or task.exception() is not None:
+            self.failed += 1
+            if not task.cancelled():
+                self._report(job, f"Job {job.job_id} failed: {task.exception()}")
+        else:
+            self.completed += 1
+        # Finished jobs are only kept while they are queued or running
+        self.jobs.pop(job.job_id, None)
+        self._dispatch()
+
+    def cancel(self, job_id: str, grace: Optional[float] = None) -> Optional[str]:
+        """Cancel a job; returns the state it was in (None if unknown or finished)
+
+        A queued job is dropped at once. A running job is expected to stop by
+        itself (the caller signals it); `grace` moves its hard deadline to at
+        most that many seconds from now.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.state == QUEUED:
+            # The heap entry is skipped lazily by _dispatch
+            job.state = FINISHED
+            job.finished_at = time.time()
+            self.queued -= 1
+            self.cancelled += 1
+            self.jobs.pop(job_id, None)
+            return QUEUED
+        if job.state == RUNNING:
+            self.cancelled += 1
+            if grace is not None and not job.deadline_cleared:
+                remaining = job.started_at + job.timeout - time.time() if job.timeout is not None else None
+                if remaining is None or grace < remaining:
+                    if job.timer is not None:
+                        job.timer.cancel()
+                    job.timer = asyncio.get_running_loop().call_later(grace, self._expire, job)
+            return RUNNING
+        return None
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position among queued jobs (None if not queued)"""
+        job = self.jobs.get(job_id)
+        if job is None or job.state != QUEUED:
+            return None
+        key = (-job.priority, job.seq)
+        return 1 + sum(1 for priority, seq, other in self._queue if other.state == QUEUED and (priority, seq) < key)
+
+    async def stop(self):
+        """Cancel running jobs and drop the queue (app shutdown)"""
+        for _, _, job in self._queue:
+            job.state = FINISHED
+        self._queue.clear()
+        self.queued = 0
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        queued_by_type: Dict[str, int] = {}
+        for _, _, job in self._queue:
+            if job.state == QUEUED:
+                queued_by_type[job.job_type] = queued_by_type.get(job.job_type, 0) + 1
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "running_by_type": {key: value for key, value in self._running_by_type.items() if value},
+            "queue_depth": self.queued,
+            "queued_by_type": queued_by_type,
+            "max_queue": self.max_queue,
+            "type_limits": self.type_limits,
+            "wait_time": self.wait_times.percentiles(),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "timed_out": self.timed_out
+        }
@@ -0,0 +1,118 @@
+"""
+JSON Stream Module
+Incremental scanner for a JSON value arriving in chunks from an LLM completion
+"""
+
+import json
+from typing import Any, List, Optional
+
+_INVALID = object()
+
+
+class JSONStreamParser:
+    """Finds the first JSON object/array in streamed text (prose and markdown fences are skipped)
+
+    `feed()` returns the elements of the top-level `array_key` array as soon as
+    each one is complete, so callers can act on them before the value ends.
+    """
+
+    def __init__(self, array_key: Optional[str] = None):
+        self.array_key = array_key
+        self.done = False
+        self._chars: List[str] = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Any]:
+        items = []
+        for char in text:
+            if self.done:
+                break
+            if not self._started:
+                if char not in "{[":
+                    continue
+                self._started = True
+            position = len(self._chars)
+            self._chars.append(char)
+            in_items = self._in_array and self._depth == 2
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = "".join(self._chars[self._string_start:position + 1])
+                    elif in_items:
+                        items.append(self._take_item(position + 1))
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = position
+                if in_items and self._item_start is None:
+                    self._item_start = position
+            elif char in "{[":
+                if in_items and self._item_start is None:
+                    self._item_start = position
+                if self._depth == 1 and char == "[" and self.array_key is not None and self._key == self.array_key:
+                    self._in_array = True
+                self._depth += 1
+            elif char in "}]":
+                if in_items:
+                    # Closing the tracked array itself; flush a trailing number/literal
+                    if self._item_start is not None:
+                        items.append(self._take_item(position))
+                    self._in_array = False
+                self._depth -= 1
+                if self._in_array and self._depth == 2 and self._item_start is not None:
+                    items.append(self._take_item(position + 1))
+                if self._depth == 0:
+                    self.done = True
+            elif char == ":":
+                if self._depth == 1 and self._last_string is not None:
+                    self._key = json.loads(self._last_string)
+            elif char == ",":
+                if self._depth == 1:
+                    self._key = None
+                elif in_items and self._item_start is not None:
+                    items.append(self._take_item(position))
+            elif not char.isspace() and in_items and self._item_start is None:
+                self._item_start = position
+        return [item for item in items if item is not _INVALID]
+
+    def _take_item(self, end: int) -> Any:
+        text = "".join(self._chars[self._item_start:end]).strip()
+        self._item_start = None
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return _INVALID
+
+    def result(self) -> Any:
+        """The complete value; raises json.JSONDecodeError if it is missing or incomplete"""
+        return json.loads("".join(self._chars))
+
+
+def extract_json(content: str) -> Any:
+    """First JSON object/array in a completion; inside the first markdown fence if there is one
+
+    Prose before a fence may hold brackets of its own ("see [1] below"), so a
+    fenced block is taken first and the bracket scan only covers its content.
+    """
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    parser = JSONStreamParser()
+    parser.feed(content)
+    return parser.result()
@@ -0,0 +1,180 @@
+"""
+Latency Histogram Module
+Log-bucketed, mergeable latency histograms with windowed rotation
+"""
+
+import math
+import time
+from array import array
+from typing import Dict, Any, Optional
+
+# Each power of two is split into SUB_BUCKETS linear buckets (~4% relative error)
+SUB_BUCKETS = 16
+MIN_EXPONENT = -10   # ~0.001 ms
+MAX_EXPONENT = 24    # ~16.7 million ms (~4.6 hours)
+BUCKET_COUNT = (MAX_EXPONENT - MIN_EXPONENT) * SUB_BUCKETS
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+_ZERO_COUNTS = array("q", [0]) * BUCKET_COUNT
+
+
+def bucket_index(value: float) -> int:
+    """Bucket for a latency value in milliseconds"""
+    if value <= 0:
+        return 0
+    mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+    if exponent <= MIN_EXPONENT:
+        return 0
+    if exponent > MAX_EXPONENT:
+        return BUCKET_COUNT - 1
+    return (exponent - MIN_EXPONENT - 1) * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+
+def bucket_upper_bound(index: int) -> float:
+    """Upper edge of a bucket in milliseconds"""
+    exponent = index // SUB_BUCKETS + MIN_EXPONENT + 1
+    sub_bucket = index % SUB_BUCKETS
+    return math.ldexp(0.5 + (sub_bucket + 1) / (2 * SUB_BUCKETS), exponent)
+
+
+class LatencyHistogram:
+    """Fixed-size histogram of latencies; histograms with the same layout can be merged"""
+
+    def __init__(self):
+        self.counts = array("q", [0]) * BUCKET_COUNT
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, value: float):
+        """O(1): increments one preallocated counter"""
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram"):
+        if not other.count:
+            return
+        counts = self.counts
+        for index, value in enumerate(other.counts):
+            if value:
+                counts[index] += value
+        self.count += other.count
+        if other.max > self.max:
+            self.max = other.max
+
+    def reset(self):
+        if self.count:
+            self.counts[:] = _ZERO_COUNTS
+        self.count = 0
+        self.max = 0.0
+
+    def to_state(self) -> Dict[str, Any]:
+        """Sparse form: only non-empty buckets"""
+        return {
+            "counts": {str(index): value for index, value in enumerate(self.counts) if value},
+            "max": self.max
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        self.reset()
+        for index, value in state.get("counts", {}).items():
+            index = int(index)
+            if 0 <= index < BUCKET_COUNT:
+                self.counts[index] = value
+                self.count += value
+        self.max = state.get("max", 0.0)
+
+    def percentiles(self) -> Dict[str, Any]:
+        """p50/p95/p99/max in milliseconds (bucket upper bounds, capped at the observed max) and the sample count"""
+        result = {name: 0.0 for name, _ in PERCENTILES}
+        result["max"] = self.max
+        result["count"] = self.count
+        if not self.count:
+            return result
+
+        targets = [(name, max(1, math.ceil(fraction * self.count))) for name, fraction in PERCENTILES]
+        cumulative = 0
+        target = 0
+        for index, value in enumerate(self.counts):
+            if not value:
+                continue
+            cumulative += value
+            while target < len(targets) and cumulative >= targets[target][1]:
+                result[targets[target][0]] = min(bucket_upper_bound(index), self.max)
+                target += 1
+            if target == len(targets):
+                break
+        return result
+
+
+class WindowedHistogram:
+    """Ring of per-window histograms covering the last `windows * window_seconds`"""
+
+    def __init__(self, window_seconds: float = 60.0, windows: int = 10, cache_seconds: float = 1.0):
+        self.window_seconds = window_seconds
+        self.windows = [LatencyHistogram() for _ in range(windows)]
+        self.window_ids = [-1] * windows
+        self.cache_seconds = cache_seconds
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+
+    def _current(self, now: float) -> LatencyHistogram:
+        window_id = int(now // self.window_seconds)
+        slot = window_id % len(self.windows)
+        if self.window_ids[slot] != window_id:
+            # Rotate: the slot holds an expired window
+            self.windows[slot].reset()
+            self.window_ids[slot] = window_id
+        return self.windows[slot]
+
+    def record(self, value: float, now: Optional[float] = None):
+        self._current(time.time() if now is None else now).record(value)
+
+    def merged(self, now: Optional[float] = None) -> LatencyHistogram:
+        now = time.time() if now is None else now
+        oldest = int(now // self.window_seconds) - len(self.windows) + 1
+        merged = LatencyHistogram()
+        for window_id, histogram in zip(self.window_ids, self.windows):
+            if window_id >= oldest:
+                merged.merge(histogram)
+        return merged
+
+    def percentiles(self) -> Dict[str, Any]:
+        """Percentiles over the live windows, recomputed at most once per cache period"""
+        now = time.time()
+        if self._cached is None or now - self._cached_at >= self.cache_seconds:
+            self._cached = self.merged(now).percentiles()
+            self._cached_at = now
+        return self._cached
+
+
+class LatencyTracker:
+    """Windowed histograms keyed by name (attack type, defense mechanism, ...)"""
+
+    OVERFLOW_KEY = "other"
+
+    def __init__(self, window_seconds: float = 60.0, windows: int = 10, max_keys: int = 64):
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self.max_keys = max_keys
+        self.histograms: Dict[str, WindowedHistogram] = {}
+
+    def record(self, key: str, value: float):
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            if len(self.histograms) >= self.max_keys:
+                # Bound memory when keys come from user input
+                key = self.OVERFLOW_KEY
+                histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = WindowedHistogram(self.window_seconds, self.windows)
+        histogram.record(value)
+
+    def percentiles(self, key: str) -> Optional[Dict[str, Any]]:
+        histogram = self.histograms.get(key)
+        return histogram.percentiles() if histogram else None
+
+    def all_percentiles(self) -> Dict[str, Dict[str, Any]]:
+        return {key: histogram.percentiles() for key, histogram in self.histograms.items()}
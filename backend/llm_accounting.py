@@ -0,0 +1,182 @@
+"""
+LLM Accounting Module
+Per-call token, cost and latency records with rolling counters and hourly budgets
+"""
+
+import contextvars
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from latency_histogram import LatencyTracker
+
+# Caller name for LLM calls (API route or background task), set where the work starts
+llm_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("llm_endpoint", default="unknown")
+
+# Rolling hour made of one-minute buckets
+BUCKET_SECONDS = 60
+BUCKETS = 60
+
+
+class HourlyUsage:
+    """Calls, tokens and cost over the last hour in a fixed ring of minute buckets"""
+
+    def __init__(self):
+        self.bucket_ids = array("q", [-1]) * BUCKETS
+        self.calls = array("q", [0]) * BUCKETS
+        self.tokens = array("q", [0]) * BUCKETS
+        self.cost = array("d", [0.0]) * BUCKETS
+
+    def add(self, tokens: int, cost: float, now: float):
+        bucket = int(now // BUCKET_SECONDS)
+        slot = bucket % BUCKETS
+        if self.bucket_ids[slot] != bucket:
+            self.bucket_ids[slot] = bucket
+            self.calls[slot] = 0
+            self.tokens[slot] = 0
+            self.cost[slot] = 0.0
+        self.calls[slot] += 1
+        self.tokens[slot] += tokens
+        self.cost[slot] += cost
+
+    def totals(self, now: float) -> Dict[str, float]:
+        oldest = int(now // BUCKET_SECONDS) - BUCKETS + 1
+        calls = tokens = 0
+        cost = 0.0
+        for slot, bucket in enumerate(self.bucket_ids):
+            if bucket >= oldest:
+                calls += self.calls[slot]
+                tokens += self.tokens[slot]
+                cost += self.cost[slot]
+        return {"calls": calls, "tokens": tokens, "cost": cost}
+
+
+class LLMAccounting:
+    """Records every LLM call (and every cache hit or fallback that avoided one)"""
+
+    def __init__(
+        self,
+        prompt_cost_per_1k: float = 0.0,
+        completion_cost_per_1k: float = 0.0,
+        hourly_token_budget: int = 0,
+        hourly_cost_budget: float = 0.0,
+        recent: int = 200
+    ):
+        self.prompt_cost_per_1k = prompt_cost_per_1k
+        self.completion_cost_per_1k = completion_cost_per_1k
+        self.hourly_token_budget = hourly_token_budget
+        self.hourly_cost_budget = hourly_cost_budget
+        self.recent: deque = deque(maxlen=recent)
+        self.hourly = HourlyUsage()
+        self.latency = LatencyTracker(BUCKET_SECONDS, 10)
+        self.totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0, "cache_hits": 0}
+        self.by_endpoint: Dict[str, Dict[str, float]] = {}
+        self.by_model: Dict[str, Dict[str, float]] = {}
+        self.fallbacks: Dict[str, int] = {}
+        # Cached budget check: summing the ring on every call is wasteful
+        self._exhausted = False
+        self._checked_at = 0.0
+
+    def record_call(
+        self,
+        purpose: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        status: str = "ok",
+        estimated: bool = False,
+        retries: int = 0
+    ):
+        """One request to the provider; `status` is "ok" or the reason it fell back"""
+        now = time.time()
+        endpoint = llm_endpoint.get()
+        cost = (
+            prompt_tokens * self.prompt_cost_per_1k + completion_tokens * self.completion_cost_per_1k
+        ) / 1000
+        tokens = prompt_tokens + completion_tokens
+        self.totals["calls"] += 1
+        self.totals["prompt_tokens"] += prompt_tokens
+        self.totals["completion_tokens"] += completion_tokens
+        self.totals["cost"] += cost
+        self.hourly.add(tokens, cost, now)
+        self.latency.record(purpose, latency * 1000)
+        for table, key in ((self.by_endpoint, endpoint), (self.by_model, model)):
+            counters = table.get(key)
+            if counters is None:
+                counters = table[key] = {"calls": 0, "tokens": 0, "cost": 0.0, "cache_hits": 0, "failures": 0}
+            counters["calls"] += 1
+            counters["tokens"] += tokens
+            counters["cost"] += cost
+            if status != "ok":
+                counters["failures"] += 1
+        if status != "ok":
+            self.fallbacks[status] = self.fallbacks.get(status, 0) + 1
+        self.recent.append({
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
+            "endpoint": endpoint,
+            "purpose": purpose,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "estimated_tokens": estimated,
+            "cost": cost,
+            "latency_ms": latency * 1000,
+            "retries": retries,
+            "cache_hit": False,
+            "status": status
+        })
+
+    def record_cache_hit(self, purpose: str):
+        endpoint = llm_endpoint.get()
+        self.totals["cache_hits"] += 1
+        counters = self.by_endpoint.get(endpoint)
+        if counters is None:
+            counters = self.by_endpoint[endpoint] = {"calls": 0, "tokens": 0, "cost": 0.0, "cache_hits": 0, "failures": 0}
+        counters["cache_hits"] += 1
+        self.recent.append({
+            "timestamp": datetime.now().isoformat(),
+            "endpoint": endpoint,
+            "purpose": purpose,
+            "cache_hit": True,
+            "status": "ok"
+        })
+
+    def record_fallback(self, reason: str):
+        """A rule-based answer was used without (or after) a provider call"""
+        self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def budget_exhausted(self) -> bool:
+        """True while the last hour's tokens or cost exceed a configured budget"""
+        if not self.hourly_token_budget and not self.hourly_cost_budget:
+            return False
+        now = time.time()
+        if now - self._checked_at >= 1.0:
+            usage = self.hourly.totals(now)
+            self._exhausted = bool(
+                (self.hourly_token_budget and usage["tokens"] >= self.hourly_token_budget)
+                or (self.hourly_cost_budget and usage["cost"] >= self.hourly_cost_budget)
+            )
+            self._checked_at = now
+        return self._exhausted
+
+    def stats(self) -> Dict[str, Any]:
+        exhausted = self.budget_exhausted()
+        lookups = self.totals["calls"] + self.totals["cache_hits"]
+        return {
+            "mode": "rule_based" if exhausted else "ai",
+            "totals": dict(self.totals, cache_hit_rate=self.totals["cache_hits"] / lookups if lookups else 0.0),
+            "last_hour": self.hourly.totals(time.time()),
+            "budget": {
+                "hourly_tokens": self.hourly_token_budget or None,
+                "hourly_cost": self.hourly_cost_budget or None,
+                "exhausted": exhausted
+            },
+            "by_endpoint": self.by_endpoint,
+            "by_model": self.by_model,
+            "fallbacks": self.fallbacks,
+            "latency": self.latency.all_percentiles(),
+            "recent": list(self.recent)
+        }
@@ -0,0 +1,141 @@
+"""
+Log Store Module
+Fixed-capacity ring buffer for system logs with secondary indexes
+"""
+
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, Optional, List, Deque, Iterator, Tuple
+
+
+class LogStore:
+    """Bounded log storage with O(1) append and per-level/category/attack indexes"""
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("Log store capacity must be positive")
+        self.capacity = capacity
+        self._slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._next_seq = 0
+
+        # Secondary indexes: key -> sequence numbers, oldest on the left
+        self._by_level: Dict[str, Deque[int]] = {}
+        self._by_category: Dict[str, Deque[int]] = {}
+        self._by_attack: Dict[str, Deque[int]] = {}
+        self._seq_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return min(self._next_seq, self.capacity)
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest entry still held"""
+        return max(0, self._next_seq - self.capacity)
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest entry (-1 when empty)"""
+        return self._next_seq - 1
+
+    def append(self, entry: Dict[str, Any]) -> int:
+        """Store a log entry, evicting the oldest one when full. Returns its sequence number."""
+        seq = self._next_seq
+        slot = seq % self.capacity
+
+        evicted = self._slots[slot]
+        if evicted is not None:
+            self._evict(evicted)
+
+        self._slots[slot] = entry
+        self._seq_by_id[entry["log_id"]] = seq
+        for index, key in self._index_keys(entry):
+            bucket = index.get(key)
+            if bucket is None:
+                bucket = index[key] = deque()
+            bucket.append(seq)
+
+        self._next_seq = seq + 1
+        return seq
+
+    def _evict(self, entry: Dict[str, Any]):
+        # The evicted entry is always the oldest, so it sits at the left of every bucket
+        for index, key in self._index_keys(entry):
+            bucket = index[key]
+            bucket.popleft()
+            if not bucket:
+                del index[key]
+        self._seq_by_id.pop(entry["log_id"], None)
+
+    def _index_keys(self, entry: Dict[str, Any]) -> List[Tuple[Dict[str, Deque[int]], str]]:
+        keys = [(self._by_level, entry["level"]), (self._by_category, entry["category"])]
+        attack_id = (entry.get("metadata") or {}).get("attack_id")
+        if attack_id:
+            keys.append((self._by_attack, attack_id))
+        return keys
+
+    def get(self, seq: int) -> Optional[Dict[str, Any]]:
+        """Get entry by sequence number if it has not been evicted"""
+        if seq < self.first_seq or seq > self.last_seq:
+            return None
+        return self._slots[seq % self.capacity]
+
+    def seq_of(self, log_id: str) -> Optional[int]:
+        """Get sequence number of a log_id still held in the buffer"""
+        return self._seq_by_id.get(log_id)
+
+    def iter_since(self, seq: int) -> Iterator[Dict[str, Any]]:
+        """Iterate entries newer than `seq`, oldest first"""
+        for next_seq in range(max(seq + 1, self.first_seq), self._next_seq):
+            yield self._slots[next_seq % self.capacity]
+
+    def iter_newest(
+        self,
+        level: Optional[str] = None,
+        category: Optional[str] = None,
+        attack_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate entries newest-first, walking the most selective index"""
+        candidates = []
+        if level:
+            candidates.append(self._by_level.get(level, ()))
+        if category:
+            candidates.append(self._by_category.get(category, ()))
+        if attack_id:
+            candidates.append(self._by_attack.get(attack_id, ()))
+
+        if not candidates:
+            for seq in range(self.last_seq, self.first_seq - 1, -1):
+                yield self._slots[seq % self.capacity]
+            return
+
+        bucket = min(candidates, key=len)
+        for seq in reversed(bucket):
+            entry = self._slots[seq % self.capacity]
+            if len(candidates) > 1 and not self._matches(entry, level, category, attack_id):
+                continue
+            yield entry
+
+    def newest(
+        self,
+        limit: int = 100,
+        level: Optional[str] = None,
+        category: Optional[str] = None,
+        attack_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get up to `limit` entries newest-first"""
+        return list(islice(self.iter_newest(level, category, attack_id), max(limit, 0)))
+
+    @staticmethod
+    def _matches(
+        entry: Dict[str, Any],
+        level: Optional[str],
+        category: Optional[str],
+        attack_id: Optional[str]
+    ) -> bool:
+        if level and entry["level"] != level:
+            return False
+        if category and entry["category"] != category:
+            return False
+        if attack_id and (entry.get("metadata") or {}).get("attack_id") != attack_id:
+            return False
+        return True
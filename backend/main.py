@@ -3,12 +3,15 @@ FastAPI Backend for AI Attack & Defense System
 Research and Demonstration Platform with Real Attacks
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
 from datetime import datetime
+import logging
 import uuid
 import time
 import random
@@ -16,20 +19,111 @@ import asyncio
 from enum import Enum
 import os
 import socket
+import json
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 # Import attack executor and AI analyzer
-from attack_executor import attack_executor, set_log_function
+from attack_executor import attack_executor, set_log_function, SQL_PAYLOADS, XSS_PAYLOADS
 from ai_analyzer import ai_analyzer
+from llm_accounting import llm_endpoint
+from batch_scoring import score_records, is_known_type
+from log_store import LogStore
+from attack_index import AttackIndex
+from storage import create_storage, GroupCommitWriter
+from rollups import StatisticsRollups
+from latency_histogram import LatencyTracker, WindowedHistogram
+from attack_summary import AttackSummary
+from job_scheduler import JobScheduler, SchedulerFull
+from rate_limiter import RateLimiter, RateLimitMiddleware, parse_rate_limit_settings
+from firewall import Firewall, FirewallMiddleware, RuleTable, parse_firewall_settings
+from behavior_engine import BehaviorEngine, BehaviorMiddleware, parse_behavior_settings
+from heavy_hitters import TopTalkers, TopTalkersMiddleware, DIMENSIONS as TOP_DIMENSIONS
+from ids import IntrusionDetector, IDSMiddleware, builtin_signatures, compile_signatures, parse_ids_settings, parse_signature
+from broadcaster import Broadcaster
+from dashboard import DashboardHub
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    yield
+    await shutdown()
+
 app = FastAPI(
     title="AI Attack & Defense API",
     description="API for simulating attacks and monitoring defense mechanisms",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Signature matching on request paths, queries and bodies, configured by the ids defense mechanism.
+# Innermost, so that firewall-denied and rate-limited requests are never scanned
+ids = IntrusionDetector(
+    max_scan_bytes=int(os.getenv("IDS_MAX_SCAN_BYTES", "16384")),
+    event_capacity=int(os.getenv("IDS_EVENT_CAPACITY", "1000"))
+)
+# Paths not scanned: the dashboard's own API carries attack payloads as data (signatures,
+# analysis and ingest records, attack parameters, log and history searches)
+IDS_EXEMPT_PATHS = (
+    "/api/defense/ids/signatures,/api/defense/behavior/events,/api/defense/history,"
+    "/api/ai/,/api/attacks/,/api/logs,/api/statistics"
+)
+ids.exempt_prefixes = tuple(
+    prefix.strip() for prefix in os.getenv("IDS_EXEMPT_PATHS", IDS_EXEMPT_PATHS).split(",") if prefix.strip()
+)
+IDS_MAX_SIGNATURES = int(os.getenv("IDS_MAX_SIGNATURES", "5000"))
+IDS_BUILTIN_SIGNATURES = builtin_signatures([
+    ("sqli", "sql_injection", 0.9, SQL_PAYLOADS),
+    ("xss", "xss", 0.9, XSS_PAYLOADS)
+])
+ids.replace_signatures(compile_signatures(IDS_BUILTIN_SIGNATURES))
+app.add_middleware(IDSMiddleware, detector=ids)
+
+# Per-client request limits, configured live by the rate_limiting defense mechanism.
+# Added before CORS so that 429 responses still carry CORS headers
+rate_limiter = RateLimiter(
+    shards=int(os.getenv("RATE_LIMIT_SHARDS", "64")),
+    max_clients=int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+)
+# The dashboard pages through these on its own; limiting them would throttle the operator
+RATE_LIMIT_EXEMPT_PATHS = tuple(
+    prefix.strip() for prefix in os.getenv("RATE_LIMIT_EXEMPT_PATHS", "/api/defense/,/api/logs,/api/attacks/").split(",")
+    if prefix.strip()
+)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, exempt_prefixes=RATE_LIMIT_EXEMPT_PATHS)
+
+# CIDR allow/deny rules and per-source connection limits of the firewall mechanism
+# (runs before rate limiting, so denied sources never reach the buckets)
+FIREWALL_MAX_RULES = int(os.getenv("FIREWALL_MAX_RULES", "500000"))
+firewall = Firewall(
+    max_learned=int(os.getenv("FIREWALL_MAX_LEARNED_RULES", "10000")),
+    learn_ttl=max(1.0, float(os.getenv("FIREWALL_LEARNED_RULE_TTL", "3600")))
+)
+# Learned rules never apply to the management API, so operators can always inspect and remove them
+app.add_middleware(FirewallMiddleware, firewall=firewall, management_prefixes=("/api/defense/",))
+
+# Per-client behavior features of the behavioral_analysis mechanism; outermost of the defenses,
+# so requests refused by the others count towards their clients' error ratio
+behavior_engine = BehaviorEngine(memory_bytes=int(float(os.getenv("BEHAVIOR_MEMORY_MB", "32")) * 1024 * 1024))
+BEHAVIOR_MAX_EVENTS = int(os.getenv("BEHAVIOR_MAX_EVENTS", "1000000"))
+app.add_middleware(BehaviorMiddleware, engine=behavior_engine)
+
+# Approximate top client IPs, request paths and attack target hosts over a sliding window, in fixed memory
+top_talkers = TopTalkers(
+    window_seconds=float(os.getenv("TOP_WINDOW_SECONDS", "300")),
+    slices=int(os.getenv("TOP_WINDOW_SLICES", "10")),
+    width=int(os.getenv("TOP_SKETCH_WIDTH", "2048")),
+    depth=int(os.getenv("TOP_SKETCH_DEPTH", "4")),
+    capacity=int(os.getenv("TOP_CAPACITY", "64"))
+)
+# Requests per window above which the firewall's auto_learn denies a client IP (0: never)
+TOP_TALKER_LEARN_THRESHOLD = int(os.getenv("TOP_TALKER_LEARN_THRESHOLD", "0"))
+app.add_middleware(TopTalkersMiddleware, tracker=top_talkers)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -37,13 +131,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 # Security
 security = HTTPBearer()
 
-# In-memory storage (use database in production)
-attacks_db: Dict[str, Dict] = {}
+# Durable storage backend (STORAGE_BACKEND=memory|sqlite); writes are group-committed off the event loop
+storage = create_storage()
+storage_writer = GroupCommitWriter(
+    storage,
+    flush_interval=float(os.getenv("STORAGE_FLUSH_INTERVAL_MS", "50")) / 1000,
+    retention_days=float(os.getenv("STORAGE_RETENTION_DAYS", "7")),
+    max_pending_logs=int(os.getenv("STORAGE_MAX_PENDING_LOGS", "10000"))
+)
+
+# In-memory hot set; older records are served from storage
+attacks_db = AttackIndex(capacity=int(os.getenv("ATTACK_MEMORY_CAPACITY", "5000")))
 defense_status: Dict[str, Any] = {
     "defense_id": "def-001",
     "status": "active",
@@ -53,7 +157,20 @@ defense_status: Dict[str, Any] = {
     "active_defenses": ["Firewall", "IDS", "Rate Limiting", "AI Detection"],
     "timestamp": datetime.now().isoformat()
 }
-logs_db: List[Dict] = []
+logs_db = LogStore(capacity=int(os.getenv("LOG_CAPACITY", "1000")))
+
+def encode_log_event(log_entry: Dict) -> str:
+    """Encode a log entry as a Server-Sent Event frame"""
+    return f"id: {log_entry['log_id']}\nevent: log\ndata: {json.dumps(log_entry, default=str)}\n\n"
+
+# Live log fan-out: each entry is encoded once and shared by all stream subscribers
+log_broadcaster = Broadcaster(
+    queue_size=int(os.getenv("LOG_STREAM_QUEUE_SIZE", "500")),
+    encoder=encode_log_event
+)
+
+# Push channel for dashboard state deltas
+dashboard_hub = DashboardHub(queue_size=int(os.getenv("DASHBOARD_QUEUE_SIZE", "256")))
 statistics_db: Dict[str, Any] = {
     "total_attacks": 0,
     "blocked_attacks": 0,
@@ -61,9 +178,37 @@ statistics_db: Dict[str, Any] = {
     "average_latency": 0,
     "attack_types": {},
     "defense_mechanisms": {},
-    "time_series": []
 }
 
+# Attack counts and latency pre-aggregated at 1s/1m/1h/1d resolution
+statistics_rollups = StatisticsRollups()
+
+# Windowed latency histograms for p50/p95/p99/max
+LATENCY_WINDOW_SECONDS = float(os.getenv("LATENCY_WINDOW_SECONDS", "60"))
+LATENCY_WINDOWS = int(os.getenv("LATENCY_WINDOWS", "10"))
+overall_latency = WindowedHistogram(LATENCY_WINDOW_SECONDS, LATENCY_WINDOWS)
+attack_latency = LatencyTracker(LATENCY_WINDOW_SECONDS, LATENCY_WINDOWS)
+mechanism_latency = LatencyTracker(LATENCY_WINDOW_SECONDS, LATENCY_WINDOWS)
+
+# Bounded attack execution: worker pool, priority queue and per-type caps ("ddos=1,port_scan=2")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_TYPE_LIMITS = {
+    name.strip(): int(limit)
+    for name, _, limit in (item.partition("=") for item in os.getenv("JOB_TYPE_LIMITS", "ddos=1").split(","))
+    if name.strip() and limit.strip()
+}
+job_scheduler = JobScheduler(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_TYPE_LIMITS)
+# An attack is told to stop this long after its duration; it is cancelled outright
+# if it hasn't stopped JOB_CANCEL_GRACE seconds after being told to
+JOB_DEADLINE_GRACE = float(os.getenv("JOB_DEADLINE_GRACE", "30"))
+JOB_CANCEL_GRACE = float(os.getenv("JOB_CANCEL_GRACE", "5"))
+# Minimum seconds between progress snapshots of a running attack
+ATTACK_PROGRESS_INTERVAL = float(os.getenv("ATTACK_PROGRESS_INTERVAL", "1"))
+
+# Running summary of completed attacks, used for AI recommendation prompts
+attack_summary = AttackSummary()
+
 # Defense mechanisms storage
 defense_mechanisms_db: Dict[str, Dict] = {
     "firewall": {
@@ -108,7 +253,7 @@ defense_mechanisms_db: Dict[str, Dict] = {
         "settings": {
             "requests_per_minute": 100,
             "adaptive_threshold": True,
-            "ip_whitelist": [],
+            "ip_whitelist": ["127.0.0.1", "::1"],
             "strict_enforcement": False
         },
         "stats": {
@@ -160,6 +305,7 @@ class AttackRequest(BaseModel):
     intensity: int = 5
     duration: int = 60
     parameters: Optional[Dict[str, Any]] = None
+    priority: int = 0  # higher runs first when attacks are queued
 
 class AttackResponse(BaseModel):
     attack_id: str
@@ -167,6 +313,7 @@ class AttackResponse(BaseModel):
     message: str
     timestamp: str
     estimated_duration: Optional[int] = None
+    queue_position: Optional[int] = None
 
 class DefenseStatus(BaseModel):
     defense_id: str
@@ -193,6 +340,9 @@ class Statistics(BaseModel):
     attack_types: Dict[str, int]
     defense_mechanisms: Dict[str, int]
     time_series: List[Dict[str, Any]]
+    resolution: Optional[str] = None
+    latency_percentiles: Optional[Dict[str, Any]] = None
+    attack_type_latency: Dict[str, Dict[str, Any]] = {}
 
 class DefenseMechanism(BaseModel):
     id: str
@@ -235,14 +385,200 @@ def create_log(level: str, category: str, message: str, metadata: Optional[Dict]
         "message": message,
         "metadata": metadata
     }
-    logs_db.insert(0, log_entry)
-    if len(logs_db) > 1000:
-        logs_db.pop()
+    logs_db.append(log_entry)
+    storage_writer.put_log(log_entry)
+    log_broadcaster.publish(log_entry)
     return log_entry
 
 # Set log function for attack_executor
 set_log_function(create_log)
 
+# Large attack fields left out of dashboard snapshots
+ATTACK_DETAIL_FIELDS = ("result", "ai_analysis", "block_decision")
+
+def update_attack(attack_id: str, **fields):
+    """Update an attack record, persist it and push the changed fields to dashboards"""
+    if attack_id not in attacks_db:
+        return
+    attacks_db.update(attack_id, fields)
+    storage_writer.put_attack(attacks_db[attack_id])
+    dashboard_hub.publish("attacks", fields, key=attack_id)
+
+def attach_late_analysis(attack_id: str, analysis: Dict):
+    """AI analysis that arrived after the decision's latency budget; the block decision stands"""
+    if attack_id not in attacks_db:
+        return
+    update_attack(attack_id, ai_analysis=analysis)
+    create_log("INFO", "DEFENSE", f"Late AI analysis attached to attack {attack_id}", {
+        "attack_id": attack_id,
+        "threat_level": analysis.get("threat_level", "Unknown")
+    })
+
+def publish_defense_status(*fields: str):
+    """Persist defense status and push the changed fields to dashboards"""
+    storage_writer.put_state("defense_status", defense_status)
+    dashboard_hub.publish("defense", {field: defense_status[field] for field in fields})
+
+def publish_mechanism(mechanism_id: str, *fields: str):
+    """Persist defense mechanisms and push the changed fields to dashboards"""
+    storage_writer.put_state("defense_mechanisms", defense_mechanisms_db)
+    mechanism = mechanism_view(mechanism_id)
+    dashboard_hub.publish("mechanisms", {field: mechanism.get(field) for field in fields}, key=mechanism_id)
+
+def mechanism_view(mechanism_id: str) -> Dict:
+    """Defense mechanism with response time percentiles from its latency histogram
+
+    Once every window has expired, response_time keeps the last measured p50.
+    """
+    mechanism = defense_mechanisms_db[mechanism_id]
+    percentiles = mechanism_latency.percentiles(mechanism_id)
+    if not percentiles:
+        return mechanism
+    stats = mechanism.setdefault("stats", {})
+    if percentiles["count"]:
+        stats["response_time"] = percentiles["p50"]
+    return {**mechanism, "stats": dict(stats, latency=percentiles)}
+
+def project_attack(attack: Dict, fields: Optional[List[str]] = None) -> Dict:
+    """Select attack fields; by default the large detail fields are left out"""
+    if fields is None:
+        return {key: value for key, value in attack.items() if key not in ATTACK_DETAIL_FIELDS}
+    projected = {"attack_id": attack["attack_id"]}
+    for field in fields:
+        if field in attack:
+            projected[field] = attack[field]
+    return projected
+
+def with_progress(attack: Dict) -> Dict:
+    """Attack record plus the latest progress snapshot while it is running"""
+    slot = attack_executor.progress.get(attack["attack_id"])
+    if slot is None or slot.snapshot is None:
+        return attack
+    return dict(attack, progress=slot.snapshot)
+
+def attacks_snapshot(limit: int = 50) -> List[Dict]:
+    """Most recent attacks without their large detail fields"""
+    recent, _, _ = attacks_db.page(limit)
+    return [with_progress(project_attack(attack)) for attack in recent]
+
+dashboard_hub.register_snapshot("defense", lambda: defense_status)
+dashboard_hub.register_snapshot(
+    "mechanisms", lambda: {mechanism_id: mechanism_view(mechanism_id) for mechanism_id in defense_mechanisms_db}
+)
+dashboard_hub.register_snapshot("statistics", lambda: statistics_db)
+dashboard_hub.register_snapshot("attacks", attacks_snapshot)
+
+def validate_mechanism_settings(mechanism_id: str, settings: Dict):
+    """Raise ValueError if an enforced mechanism can't use these settings"""
+    if mechanism_id == "rate_limiting":
+        parse_rate_limit_settings(settings)
+    elif mechanism_id == "firewall":
+        parse_firewall_settings(settings)
+    elif mechanism_id == "ids":
+        parse_ids_settings(settings)
+    elif mechanism_id == "behavioral_analysis":
+        parse_behavior_settings(settings)
+
+def apply_mechanism(mechanism_id: str):
+    """Push a mechanism's enabled flag and settings to the component enforcing it"""
+    mechanism = defense_mechanisms_db.get(mechanism_id)
+    if mechanism is None:
+        return
+    if mechanism_id == "rate_limiting":
+        requests_per_minute, adaptive, whitelist = parse_rate_limit_settings(mechanism.get("settings") or {})
+        rate_limiter.configure(mechanism["enabled"], requests_per_minute, adaptive, whitelist)
+    elif mechanism_id == "firewall":
+        firewall.configure(mechanism["enabled"], *parse_firewall_settings(mechanism.get("settings") or {}))
+    elif mechanism_id == "ids":
+        ids.configure(mechanism["enabled"], *parse_ids_settings(mechanism.get("settings") or {}))
+    elif mechanism_id == "behavioral_analysis":
+        behavior_engine.configure(mechanism["enabled"], *parse_behavior_settings(mechanism.get("settings") or {}))
+
+# Pending deferred publishes of mechanism stats, by mechanism_id
+_stats_publish_pending: Dict[str, asyncio.TimerHandle] = {}
+
+def count_enforcement_block(mechanism_id: str, counter: str = "requests_blocked"):
+    """Count a request blocked by a mechanism; dashboards get the stats at most once a second"""
+    stats = defense_mechanisms_db[mechanism_id].setdefault("stats", {})
+    stats[counter] = stats.get(counter, 0) + 1
+    if mechanism_id not in _stats_publish_pending:
+        def flush():
+            _stats_publish_pending.pop(mechanism_id, None)
+            publish_mechanism(mechanism_id, "stats")
+        _stats_publish_pending[mechanism_id] = asyncio.get_running_loop().call_later(1.0, flush)
+
+def learn_source(ip: str, confidence: float, reason: str, metadata: Optional[Dict] = None):
+    """Let the firewall deny a source that was blocked (when auto_learn is on)
+
+    Every learning path goes through here: rate-limit saturation, IDS alerts,
+    top talkers and blocked attacks. Whitelisted sources are never learned,
+    and Firewall.learn refuses loopback and private addresses.
+    """
+    if ip in rate_limiter.whitelist:
+        return
+    rule = firewall.learn(ip, confidence)
+    if rule is None:
+        return
+    count_enforcement_block("firewall", "rules_learned")
+    create_log("WARNING", "DEFENSE", f"Firewall learned a deny rule for {rule['cidr']} ({reason})", dict(
+        metadata or {}, cidr=rule["cidr"], reason=reason, confidence=confidence
+    ))
+
+def persist_firewall_rules():
+    storage_writer.put_state("firewall_rules", firewall.rules())
+
+def custom_ids_signatures() -> List[Dict]:
+    return [signature for signature in ids.matcher.signatures if signature["source"] == "custom"]
+
+def ids_alert(source: str, event: Dict):
+    """A source reached alert_threshold flagged requests: log it, and let the firewall learn it"""
+    create_log("WARNING", "DEFENSE", f"IDS alert: {ids.alert_threshold} suspicious requests from {source}", {
+        "source": source, "categories": event["categories"], "signatures": event["signatures"]
+    })
+    if ids.learning_enabled:
+        learn_source(source, event["severity"], "IDS alert", {"categories": event["categories"]})
+
+rate_limiter.on_block = lambda client: count_enforcement_block("rate_limiting")
+rate_limiter.on_saturated = lambda client: learn_source(client, 1.0, "kept sending while rate limited")
+firewall.on_block = lambda ip, reason: count_enforcement_block(
+    "firewall", "requests_blocked" if reason == "denied" else "connections_rejected"
+)
+ids.on_event = lambda event: count_enforcement_block(
+    "ids", "requests_blocked" if event["action"] == "blocked" else "threats_detected"
+)
+ids.on_alert = ids_alert
+
+def behavior_anomaly(client: str, score: float, features: Dict[str, float]):
+    count_enforcement_block("behavioral_analysis", "anomalies_detected")
+    create_log("WARNING", "DEFENSE", f"Behavioral anomaly: {client} deviates from the baseline (score {score:.2f})", {
+        "client": client, "score": round(score, 4), "features": {name: round(value, 4) for name, value in features.items()}
+    })
+
+behavior_engine.on_anomaly = behavior_anomaly
+
+# Scheduler failures and deadline cancellations reach the log store and dashboards
+job_scheduler.on_error = lambda job, message: create_log("ERROR", "ATTACK", message, {
+    "attack_id": job.job_id,
+    "attack_type": job.job_type
+})
+
+def learn_top_talkers():
+    """Let the firewall deny client IPs over TOP_TALKER_LEARN_THRESHOLD requests in the window"""
+    if TOP_TALKER_LEARN_THRESHOLD <= 0 or not firewall.auto_learn:
+        return
+    for entry in top_talkers.top("ips", top_talkers.capacity)["top"]:
+        if entry["count"] < TOP_TALKER_LEARN_THRESHOLD:
+            break
+        learn_source(entry["key"], 1.0, f"top talker: ~{entry['count']} requests in {top_talkers.window_seconds:g}s", {
+            "requests": entry["count"]
+        })
+
+top_talkers.on_rotate = learn_top_talkers
+apply_mechanism("rate_limiting")
+apply_mechanism("firewall")
+apply_mechanism("ids")
+apply_mechanism("behavioral_analysis")
+
 def update_statistics(attack_type: str, blocked: bool, latency: float):
     stats = statistics_db
     stats["total_attacks"] += 1
@@ -262,17 +598,82 @@ def update_statistics(attack_type: str, blocked: bool, latency: float):
     total_latency = stats["average_latency"] * (stats["total_attacks"] - 1) + latency
     stats["average_latency"] = total_latency / stats["total_attacks"]
     
-    # Add to time series
-    stats["time_series"].append({
-        "timestamp": datetime.now().isoformat(),
-        "attacks": 1,
-        "blocked": 1 if blocked else 0,
-        "latency": latency
+    # Record latency distributions
+    overall_latency.record(latency)
+    attack_latency.record(attack_type, latency)
+    
+    # Add to time series rollups
+    rollup_points = statistics_rollups.record(blocked, latency)
+    
+    storage_writer.put_state("statistics", stats)
+    dashboard_hub.publish("statistics", {
+        "total_attacks": stats["total_attacks"],
+        "blocked_attacks": stats["blocked_attacks"],
+        "success_rate": stats["success_rate"],
+        "average_latency": stats["average_latency"],
+        "attack_types": {attack_type: stats["attack_types"][attack_type]},
+        "defense_mechanisms": {
+            defense: stats["defense_mechanisms"][defense] for defense in defense_status["active_defenses"]
+        },
+        "rollup_points": rollup_points
     })
+
+async def restore_state():
+    """Load persisted statistics, defense config and the most recent attacks and logs"""
+    state = await asyncio.to_thread(storage.load_state)
+    statistics_db.update(state.get("statistics", {}))
+    statistics_db.pop("time_series", None)
+    statistics_rollups.load_state(state.get("rollups", {}))
+    attack_summary.load_state(state.get("attack_summary", {}))
+    defense_status.update(state.get("defense_status", {}))
+    try:
+        firewall.replace_rules(await asyncio.to_thread(RuleTable.build, state.get("firewall_rules", [])))
+    except ValueError as e:
+        logger.warning("Invalid stored firewall rules: %s", e)
+    try:
+        ids.replace_signatures(await asyncio.to_thread(
+            compile_signatures, IDS_BUILTIN_SIGNATURES + state.get("ids_signatures", [])
+        ))
+    except ValueError as e:
+        logger.warning("Invalid stored IDS signatures: %s", e)
+    for mechanism_id, mechanism in state.get("defense_mechanisms", {}).items():
+        if mechanism_id in defense_mechanisms_db:
+            defense_mechanisms_db[mechanism_id].update(mechanism)
+            try:
+                apply_mechanism(mechanism_id)
+            except ValueError as e:
+                logger.warning("Invalid stored settings for %s: %s", mechanism_id, e)
+    
+    for attack in await asyncio.to_thread(storage.recent_attacks, attacks_db.capacity):
+        if attack.get("status") in ("queued", "running"):
+            attack["status"] = "failed"
+            attack["message"] = "Attack interrupted by server restart"
+            storage_writer.put_attack(attack)
+        attacks_db.add(attack)
     
-    # Keep last 100 points
-    if len(stats["time_series"]) > 100:
-        stats["time_series"] = stats["time_series"][-100:]
+    for log_entry in await asyncio.to_thread(storage.recent_logs, logs_db.capacity):
+        logs_db.append(log_entry)
+
+async def startup():
+    """Open storage, restore state and start background writers and clients (see `lifespan`)"""
+    await asyncio.to_thread(storage.open)
+    await restore_state()
+    storage_writer.start()
+    await ai_analyzer.start()
+
+async def shutdown():
+    """Stop running attacks and flush state before storage is closed"""
+    for attack_id in list(attack_executor.active_attacks):
+        attack_executor.cancel(attack_id, "server shutdown")
+    await job_scheduler.stop()
+    # Rollups and the summary's histograms are large, so they are only persisted on shutdown
+    storage_writer.put_state("rollups", statistics_rollups.to_state())
+    storage_writer.put_state("attack_summary", attack_summary.to_state())
+    # Learned rules are only persisted here; API changes are persisted as they happen
+    persist_firewall_rules()
+    await storage_writer.stop()
+    await asyncio.to_thread(storage.close)
+    await ai_analyzer.aclose()
 
 # Routes
 @app.get("/")
@@ -313,8 +714,8 @@ async def simulate_attack(attack: AttackRequest, auth: bool = Depends(verify_api
     
     attack_data = {
         "attack_id": attack_id,
-        "status": "running",
-        "message": f"Real attack started: {attack.attack_type}",
+        "status": "queued",
+        "message": f"Attack queued: {attack.attack_type}",
         "timestamp": datetime.now().isoformat(),
         "estimated_duration": estimated_duration,
         "attack_type": attack.attack_type,
@@ -323,22 +724,53 @@ async def simulate_attack(attack: AttackRequest, auth: bool = Depends(verify_api
         "target_url": target_url
     }
     
-    attacks_db[attack_id] = attack_data
+    # Execute real attack in background once a worker is free
+    attack_executor.register(attack_id)
+    try:
+        job_scheduler.submit(
+            attack_id,
+            attack.attack_type,
+            lambda: process_attack(attack_id, attack),
+            priority=attack.priority,
+            timeout=attack.duration + JOB_DEADLINE_GRACE + JOB_CANCEL_GRACE
+        )
+    except SchedulerFull as e:
+        attack_executor.unregister(attack_id)
+        raise HTTPException(status_code=429, detail=str(e))
+    if target_url:
+        top_talkers.record("hosts", urlparse(target_url).hostname or target_url)
+    
+    attacks_db.add(attack_data)
+    storage_writer.put_attack(attack_data)
+    dashboard_hub.publish("attacks", attack_data, key=attack_id)
     
-    create_log("INFO", "ATTACK", f"Real attack started: {attack.attack_type} on {target_url}", {
+    create_log("INFO", "ATTACK", f"Attack queued: {attack.attack_type} on {target_url}", {
         "attack_id": attack_id,
         "intensity": attack.intensity,
         "target_url": target_url
     })
     
-    # Execute real attack in background
-    asyncio.create_task(process_attack(attack_id, attack))
-    
-    return AttackResponse(**attack_data)
+    return AttackResponse(**attack_data, queue_position=job_scheduler.queue_position(attack_id))
+
+@app.get("/api/attacks/queue")
+async def get_attack_queue(auth: bool = Depends(verify_api_key)):
+    """Get scheduler metrics: running and queued attacks, wait times, rejections"""
+    return job_scheduler.stats()
 
 async def process_attack(attack_id: str, attack: AttackRequest):
     """Process real attack execution in background"""
+    llm_endpoint.set("process_attack")
     start_time = time.time()
+    token = attack_executor.active_attacks.get(attack_id) or attack_executor.register(attack_id)
+    token.deadline = start_time + attack.duration + JOB_DEADLINE_GRACE
+    # Snapshots go to dashboards only; the record is written once the attack ends
+    progress = attack_executor.track(
+        attack_id,
+        ATTACK_PROGRESS_INTERVAL,
+        on_publish=lambda snapshot: dashboard_hub.publish("attacks", {"progress": snapshot}, key=attack_id)
+    )
+    update_attack(attack_id, status="running", message=f"Real attack started: {attack.attack_type}")
+    create_log("INFO", "ATTACK", f"Real attack started: {attack.attack_type}", {"attack_id": attack_id})
     attack_result = {}
     blocked = False
     latency = 0
@@ -351,63 +783,78 @@ async def process_attack(attack_id: str, attack: AttackRequest):
             create_log("ERROR", "ATTACK", f"Target URL required for {attack.attack_type} attack", {
                 "attack_id": attack_id
             })
-            if attack_id in attacks_db:
-                attacks_db[attack_id]["status"] = "failed"
-                attacks_db[attack_id]["message"] = "Target URL is required"
+            update_attack(attack_id, status="failed", message="Target URL is required")
+            attack_executor.unregister(attack_id)
             return
         
         # Execute real attack
         if attack.attack_type == 'ddos':
             attack_result = await attack_executor.execute_ddos(
-                target_url, attack.intensity, attack.duration
+                target_url, attack.intensity, attack.duration, token, progress
             )
         elif attack.attack_type == 'sql_injection':
             attack_result = await attack_executor.execute_sql_injection(
-                target_url, attack.intensity, attack.duration
+                target_url, attack.intensity, attack.duration, token, progress
             )
         elif attack.attack_type == 'xss':
             attack_result = await attack_executor.execute_xss(
-                target_url, attack.intensity, attack.duration
+                target_url, attack.intensity, attack.duration, token, progress
             )
         elif attack.attack_type == 'brute_force':
             attack_result = await attack_executor.execute_brute_force(
-                target_url, attack.intensity, attack.duration
+                target_url, attack.intensity, attack.duration, token, progress
             )
         elif attack.attack_type == 'port_scan':
             attack_result = await attack_executor.execute_port_scan(
-                target_url, attack.intensity, attack.duration
+                target_url, attack.intensity, attack.duration, token, progress
             )
         else:
             # For other attack types, use simulation
-            await asyncio.sleep(2)
+            await token.sleep(2)
             attack_result = {"simulated": True, "duration": attack.duration}
         
+        # Past this point the attack finishes normally; analysis has its own budget
+        attack_executor.unregister(attack_id)
+        job_scheduler.clear_deadline(attack_id)
+        if token.cancelled:
+            finish_cancelled(attack_id, token.reason, attack_result)
+            return
+        
         latency = (time.time() - start_time) * 1000  # Convert to milliseconds
         
-        # AI-powered analysis
-        ai_analysis = await ai_analyzer.analyze_attack_pattern({
+        # AI-powered analysis (rule-based if the LLM misses the decision budget)
+        ai_analysis = await ai_analyzer.analyze_within_budget({
             "attack_type": attack.attack_type,
             "intensity": attack.intensity,
             "duration": attack.duration,
             "target_url": target_url,
             "parameters": attack.parameters or {},
             "result": attack_result
-        })
+        }, on_late_result=lambda analysis: attach_late_analysis(attack_id, analysis))
         
         # Get active defenses
         active_defenses = defense_status.get("active_defenses", [])
         
+        # Behavioral anomaly score of the attack's source, if it has been seen
+        source_ip = (attack.parameters or {}).get("source_ip")
+        anomaly = (
+            behavior_engine.score_source(source_ip) if behavior_engine.enabled and isinstance(source_ip, str) else None
+        )
+        
         # AI decision on blocking
         block_decision = await ai_analyzer.should_block_attack({
             "attack_type": attack.attack_type,
             "intensity": attack.intensity,
             "duration": attack.duration,
             "target_url": target_url,
-            "result": attack_result,
-            "ai_analysis": ai_analysis
-        }, active_defenses)
+            "result": attack_result
+        }, active_defenses, analysis=ai_analysis, anomaly=anomaly)
         
         blocked = block_decision.get("should_block", False)
+        if blocked and isinstance(source_ip, str):
+            learn_source(source_ip, block_decision.get("confidence", 0), f"blocked {attack.attack_type} attack", {
+                "attack_id": attack_id
+            })
         
         # Update defense status
         defense_status["total_attacks"] += 1
@@ -418,6 +865,7 @@ async def process_attack(attack_id: str, attack: AttackRequest):
             if defense_status["total_attacks"] > 0 else 100.0
         )
         defense_status["timestamp"] = datetime.now().isoformat()
+        publish_defense_status("total_attacks", "blocked_attacks", "success_rate", "timestamp")
         
         # Update individual defense mechanism stats
         for mechanism_id, mechanism in defense_mechanisms_db.items():
@@ -425,7 +873,7 @@ async def process_attack(attack_id: str, attack: AttackRequest):
                 if mechanism.get("stats"):
                     if blocked:
                         mechanism["stats"]["blocked"] = mechanism["stats"].get("blocked", 0) + 1
-                    mechanism["stats"]["response_time"] = latency
+                    mechanism_latency.record(mechanism_id, latency)
                     # Update success rate for this mechanism
                     total_for_mech = mechanism["stats"].get("total", 0) + 1
                     mechanism["stats"]["total"] = total_for_mech
@@ -433,17 +881,21 @@ async def process_attack(attack_id: str, attack: AttackRequest):
                         mechanism["stats"]["success_rate"] = (
                             mechanism["stats"].get("blocked", 0) / total_for_mech * 100
                         )
+                    publish_mechanism(mechanism_id, "stats")
         
         # Update statistics
         update_statistics(attack.attack_type, blocked, latency)
+        attack_summary.record(attack.attack_type, blocked, latency, ai_analysis.get("threat_level"), target_url)
         
         # Update attack status with results
-        if attack_id in attacks_db:
-            attacks_db[attack_id]["status"] = "completed"
-            attacks_db[attack_id]["message"] = f"Attack {'blocked' if blocked else 'detected'} by AI analysis"
-            attacks_db[attack_id]["result"] = attack_result
-            attacks_db[attack_id]["ai_analysis"] = ai_analysis
-            attacks_db[attack_id]["block_decision"] = block_decision
+        update_attack(
+            attack_id,
+            status="completed",
+            message=f"Attack {'blocked' if blocked else 'detected'} by AI analysis",
+            result=attack_result,
+            ai_analysis=ai_analysis,
+            block_decision=block_decision
+        )
         
         create_log(
             "SUCCESS" if blocked else "WARNING",
@@ -458,30 +910,125 @@ async def process_attack(attack_id: str, attack: AttackRequest):
             }
         )
     
+    except asyncio.CancelledError:
+        # Hard deadline (or shutdown): the last progress snapshot stands in for the results
+        if (attacks_db.get(attack_id) or {}).get("status") == "running":
+            finish_cancelled(attack_id, token.reason or "stopped by the scheduler", progress.snapshot)
+        raise
+    
     except Exception as e:
         create_log("ERROR", "ATTACK", f"Attack {attack_id} failed: {str(e)}", {
             "attack_id": attack_id,
             "error": str(e)
         })
-        if attack_id in attacks_db:
-            attacks_db[attack_id]["status"] = "failed"
-            attacks_db[attack_id]["message"] = f"Attack failed: {str(e)}"
+        update_attack(attack_id, status="failed", message=f"Attack failed: {str(e)}")
+    
+    finally:
+        attack_executor.unregister(attack_id)
+
+def finish_cancelled(attack_id: str, reason: str, partial_result: Optional[Dict]):
+    """Record a stopped attack; it is not analyzed or counted in the statistics"""
+    update_attack(
+        attack_id,
+        status="cancelled",
+        message=f"Attack cancelled: {reason}",
+        cancel_reason=reason,
+        result=partial_result
+    )
+    create_log("WARNING", "ATTACK", f"Attack {attack_id} cancelled: {reason}", {
+        "attack_id": attack_id,
+        "partial_result": partial_result is not None
+    })
 
 @app.get("/api/attacks/history")
-async def get_attack_history(limit: int = 100, auth: bool = Depends(verify_api_key)):
-    """Get full attack history with all details"""
-    attacks = list(attacks_db.values())
-    # Sort by timestamp descending (most recent first)
-    attacks.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-    return attacks[:limit]
+async def get_attack_history(
+    response: Response,
+    limit: int = 100,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    attack_type: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    auth: bool = Depends(verify_api_key)
+):
+    """Get attack history, most recent first
+
+    Page with `before`/`after` set to an attack_id; the next cursors are returned in
+    the X-Next-Cursor (older) and X-Prev-Cursor (newer) headers. `result`, `ai_analysis`
+    and `block_decision` are only included when named in `fields` (or `fields=all`).
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    try:
+        attacks, older, newer = attacks_db.page(
+            limit, before=before, after=after, attack_type=attack_type, status=status
+        )
+    except KeyError:
+        # Cursor is older than the in-memory set: page from storage
+        if not storage.durable:
+            raise HTTPException(status_code=400, detail="Unknown pagination cursor")
+        attacks = await asyncio.to_thread(
+            storage.attack_page, limit, before, after, attack_type, status
+        )
+        older = attacks[-1]["attack_id"] if len(attacks) == limit else None
+        newer = attacks[0]["attack_id"] if attacks else None
+    else:
+        if storage.durable and after is None and len(attacks) < limit:
+            # Fill the rest of the page with records no longer held in memory
+            cursor = attacks[-1]["attack_id"] if attacks else attacks_db.oldest_id()
+            older_attacks = await asyncio.to_thread(
+                storage.attack_page, limit - len(attacks), cursor, None, attack_type, status
+            )
+            if older_attacks:
+                attacks = attacks + older_attacks
+                older = attacks[-1]["attack_id"] if len(attacks) == limit else None
+    
+    if older:
+        response.headers["X-Next-Cursor"] = older
+    if newer:
+        response.headers["X-Prev-Cursor"] = newer
+    
+    if fields == "all":
+        return attacks
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    return [project_attack(attack, selected) for attack in attacks]
 
 @app.get("/api/attacks/{attack_id}")
 async def get_attack_status(attack_id: str, auth: bool = Depends(verify_api_key)):
     """Get attack status with full details"""
-    if attack_id not in attacks_db:
+    attack = attacks_db.get(attack_id)
+    if attack is None and storage.durable:
+        attack = await asyncio.to_thread(storage.get_attack, attack_id)
+    if attack is None:
         raise HTTPException(status_code=404, detail="Attack not found")
+    if attack.get("status") == "queued":
+        attack = dict(attack, queue_position=job_scheduler.queue_position(attack_id))
+    elif attack.get("status") == "running":
+        attack = with_progress(attack)
     # Return full attack data including result, ai_analysis, etc.
-    return attacks_db[attack_id]
+    return attack
+
+@app.post("/api/attacks/{attack_id}/cancel")
+async def cancel_attack(attack_id: str, auth: bool = Depends(verify_api_key)):
+    """Stop a queued or running attack; a running one ends with its partial results"""
+    attack = attacks_db.get(attack_id)
+    if attack is None:
+        raise HTTPException(status_code=404, detail="Attack not found")
+    status = attack.get("status")
+    if status not in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Attack is already {status}")
+    if attack_id not in attack_executor.active_attacks:
+        raise HTTPException(status_code=409, detail="Attack is finishing and can no longer be cancelled")
+    
+    attack_executor.cancel(attack_id, "cancelled by user")
+    if job_scheduler.cancel(attack_id, grace=JOB_CANCEL_GRACE) == "queued":
+        attack_executor.unregister(attack_id)
+        finish_cancelled(attack_id, "cancelled by user before it started", None)
+    else:
+        update_attack(attack_id, message="Cancellation requested")
+    
+    attack = attacks_db.get(attack_id)
+    return {"attack_id": attack_id, "status": attack["status"], "message": attack["message"]}
 
 # Defense endpoints
 @app.get("/api/defense/status", response_model=DefenseStatus)
@@ -497,16 +1044,180 @@ async def get_defense_history(auth: bool = Depends(verify_api_key)):
 @app.get("/api/defense/config", response_model=DefenseConfig)
 async def get_defense_config(auth: bool = Depends(verify_api_key)):
     """Get defense configuration with all mechanisms"""
-    mechanisms = [DefenseMechanism(**mech) for mech in defense_mechanisms_db.values()]
+    mechanisms = [DefenseMechanism(**mechanism_view(mechanism_id)) for mechanism_id in defense_mechanisms_db]
     return DefenseConfig(mechanisms=mechanisms)
 
+@app.get("/api/defense/firewall")
+async def get_firewall(auth: bool = Depends(verify_api_key)):
+    """Get firewall metrics: rule counts, allowed/denied requests, active connections per source"""
+    return firewall.stats()
+
+@app.get("/api/defense/firewall/check")
+async def check_firewall(ip: str, auth: bool = Depends(verify_api_key)):
+    """Decision the firewall rules give for a source address"""
+    return {"ip": ip, "action": firewall.decide(ip)}
+
+@app.get("/api/defense/firewall/rules")
+async def get_firewall_rules(
+    limit: int = 1000, offset: int = 0, source: Optional[str] = None, auth: bool = Depends(verify_api_key)
+):
+    """List firewall rules (`source`: manual or auto_learn)"""
+    rules = firewall.rules()
+    if source:
+        rules = [rule for rule in rules if rule["source"] == source]
+    return {"total": len(rules), "rules": rules[offset:offset + limit]}
+
+@app.put("/api/defense/firewall/rules")
+async def replace_firewall_rules(request: Request, auth: bool = Depends(verify_api_key)):
+    """Replace all firewall rules at once (JSON array, {"rules": [...]} or NDJSON of {cidr, action})
+
+    The new rule set is built off the event loop and swapped in as a whole;
+    if any rule is invalid, nothing changes.
+    """
+    rules = await read_batch_records(request, key="rules", max_records=FIREWALL_MAX_RULES, noun="rule")
+    try:
+        table = await asyncio.to_thread(RuleTable.build, rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    firewall.replace_rules(table)
+    persist_firewall_rules()
+    create_log("INFO", "DEFENSE", f"Firewall rules replaced ({len(table.rules)} rules)", {"rules": len(table.rules)})
+    return firewall.stats()
+
+@app.post("/api/defense/firewall/rules")
+async def add_firewall_rule(rule: Dict[str, Any], auth: bool = Depends(verify_api_key)):
+    """Add or overwrite one firewall rule: {"cidr": "203.0.113.0/24", "action": "deny"}"""
+    try:
+        added = firewall.add_rule(rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    persist_firewall_rules()
+    create_log("INFO", "DEFENSE", f"Firewall rule added: {added['action']} {added['cidr']}", added)
+    return added
+
+@app.delete("/api/defense/firewall/rules")
+async def delete_firewall_rule(cidr: str, auth: bool = Depends(verify_api_key)):
+    """Remove one firewall rule"""
+    if not firewall.remove_rule(cidr):
+        raise HTTPException(status_code=404, detail="Firewall rule not found")
+    persist_firewall_rules()
+    create_log("INFO", "DEFENSE", f"Firewall rule removed: {cidr}", {"cidr": cidr})
+    return {"message": f"Firewall rule {cidr} removed", "status": "success"}
+
+@app.get("/api/defense/ids")
+async def get_ids(auth: bool = Depends(verify_api_key)):
+    """Get intrusion detection metrics: signatures, automaton size, scanned requests/bytes, flagged/blocked"""
+    return ids.stats()
+
+@app.get("/api/defense/ids/events")
+async def get_ids_events(limit: int = 100, auth: bool = Depends(verify_api_key)):
+    """Most recent IDS events (flagged requests), newest first"""
+    return ids.recent_events(limit)
+
+@app.get("/api/defense/ids/signatures")
+async def get_ids_signatures(source: Optional[str] = None, auth: bool = Depends(verify_api_key)):
+    """List IDS signatures with their hit counters (`source`: builtin or custom)"""
+    signatures = ids.signatures()
+    if source:
+        signatures = [signature for signature in signatures if signature["source"] == source]
+    return signatures
+
+@app.post("/api/defense/ids/signatures")
+async def add_ids_signature(signature: Dict[str, Any], auth: bool = Depends(verify_api_key)):
+    """Add a custom signature: {"pattern": "...", "category": "...", "severity": 0.8}
+
+    The automaton is recompiled off the event loop and swapped in; requests
+    already being scanned finish with the previous one.
+    """
+    try:
+        added = parse_signature({key: value for key, value in signature.items() if key != "source"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if any(existing["id"] == added["id"] and existing["source"] == "builtin" for existing in ids.matcher.signatures):
+        raise HTTPException(status_code=400, detail="Built-in signatures can't be replaced")
+    if len(ids.matcher.signatures) >= IDS_MAX_SIGNATURES:
+        raise HTTPException(status_code=400, detail=f"At most {IDS_MAX_SIGNATURES} signatures")
+    ids.replace_signatures(await asyncio.to_thread(compile_signatures, ids.matcher.signatures + [added]))
+    storage_writer.put_state("ids_signatures", custom_ids_signatures())
+    create_log("INFO", "DEFENSE", f"IDS signature added: {added['id']}", added)
+    return added
+
+@app.delete("/api/defense/ids/signatures/{signature_id}")
+async def delete_ids_signature(signature_id: str, auth: bool = Depends(verify_api_key)):
+    """Remove a custom IDS signature"""
+    signature = next((signature for signature in ids.matcher.signatures if signature["id"] == signature_id), None)
+    if signature is None:
+        raise HTTPException(status_code=404, detail="IDS signature not found")
+    if signature["source"] == "builtin":
+        raise HTTPException(status_code=400, detail="Built-in signatures can't be removed")
+    remaining = [existing for existing in ids.matcher.signatures if existing["id"] != signature_id]
+    ids.replace_signatures(await asyncio.to_thread(compile_signatures, remaining))
+    storage_writer.put_state("ids_signatures", custom_ids_signatures())
+    create_log("INFO", "DEFENSE", f"IDS signature removed: {signature_id}", {"signature_id": signature_id})
+    return {"message": f"IDS signature {signature_id} removed", "status": "success"}
+
+@app.get("/api/defense/behavior")
+async def get_behavior(auth: bool = Depends(verify_api_key)):
+    """Get behavioral analysis metrics: tracked clients, memory cap, events, anomalies and the baseline"""
+    return behavior_engine.stats()
+
+@app.get("/api/defense/behavior/clients")
+async def get_behavior_clients(limit: int = 20, auth: bool = Depends(verify_api_key)):
+    """Most anomalous tracked clients, highest score first"""
+    return behavior_engine.top(max(0, limit))
+
+@app.get("/api/defense/behavior/clients/{client}")
+async def get_behavior_client(client: str, auth: bool = Depends(verify_api_key)):
+    """Features and anomaly score of one client"""
+    result = behavior_engine.score(client)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Client not tracked")
+    return result
+
+@app.post("/api/defense/behavior/events")
+async def ingest_behavior_events(request: Request, auth: bool = Depends(verify_api_key)):
+    """Feed request events seen elsewhere (e.g. a target server's access log) to the behavior engine
+
+    The body is a JSON array, {"events": [...]} or NDJSON of
+    {"client", "path", "status", "timestamp"} (timestamp in epoch seconds,
+    default now; path default "/", status default 200).
+    """
+    records = await read_batch_records(request, key="events", max_records=BEHAVIOR_MAX_EVENTS, noun="event")
+    now = time.time()
+    events = []
+    for index, record in enumerate(records):
+        client = record.get("client")
+        path = record.get("path", "/")
+        status = record.get("status", 200)
+        timestamp = record.get("timestamp", now)
+        if not isinstance(client, str) or not isinstance(path, str) or not isinstance(status, int) \
+                or not isinstance(timestamp, (int, float)):
+            raise HTTPException(status_code=400, detail=f"Event {index} needs a string client and path, an integer status and a numeric timestamp")
+        events.append((client, path, status, float(timestamp)))
+    observe = behavior_engine.observe
+    record = top_talkers.record
+    for start in range(0, len(events), 50000):
+        for client, path, status, timestamp in events[start:start + 50000]:
+            observe(client, path, status, timestamp)
+            # Counted when they arrive here: the window only covers recent time
+            record("ips", client)
+            record("paths", path)
+        # Let other requests run between slices of a large batch
+        await asyncio.sleep(0)
+    return {"ingested": len(events), "clients": behavior_engine.stats()["clients"]}
+
+@app.get("/api/defense/rate_limiting")
+async def get_rate_limiting(auth: bool = Depends(verify_api_key)):
+    """Get request rate limiter metrics: tracked clients, allowed/blocked counts, evictions"""
+    return rate_limiter.stats()
+
 # Note: Parameterized routes must come after static routes
 @app.get("/api/defense/mechanism/{mechanism_id}", response_model=DefenseMechanism)
 async def get_defense_mechanism(mechanism_id: str, auth: bool = Depends(verify_api_key)):
     """Get specific defense mechanism configuration"""
     if mechanism_id not in defense_mechanisms_db:
         raise HTTPException(status_code=404, detail="Defense mechanism not found")
-    return DefenseMechanism(**defense_mechanisms_db[mechanism_id])
+    return DefenseMechanism(**mechanism_view(mechanism_id))
 
 @app.put("/api/defense/mechanism/{mechanism_id}", response_model=DefenseMechanism)
 async def update_defense_mechanism(
@@ -520,6 +1231,12 @@ async def update_defense_mechanism(
     
     mechanism = defense_mechanisms_db[mechanism_id]
     
+    if update.settings:
+        try:
+            validate_mechanism_settings(mechanism_id, {**(mechanism.get("settings") or {}), **update.settings})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     if update.enabled is not None:
         mechanism["enabled"] = update.enabled
         # Update active_defenses list
@@ -533,8 +1250,12 @@ async def update_defense_mechanism(
             mechanism["settings"].update(update.settings)
         else:
             mechanism["settings"] = update.settings
+    apply_mechanism(mechanism_id)
     
     defense_status["timestamp"] = datetime.now().isoformat()
+    publish_defense_status("active_defenses", "timestamp")
+    publish_mechanism(mechanism_id, "enabled", "settings")
+    await ai_analyzer.invalidate_cache()
     
     create_log(
         "INFO",
@@ -543,7 +1264,7 @@ async def update_defense_mechanism(
         {"mechanism_id": mechanism_id, "enabled": mechanism["enabled"]}
     )
     
-    return DefenseMechanism(**mechanism)
+    return DefenseMechanism(**mechanism_view(mechanism_id))
 
 @app.post("/api/defense/mechanism/{mechanism_id}/enable")
 async def enable_defense_mechanism(mechanism_id: str, auth: bool = Depends(verify_api_key)):
@@ -553,9 +1274,13 @@ async def enable_defense_mechanism(mechanism_id: str, auth: bool = Depends(verif
     
     defense_mechanisms_db[mechanism_id]["enabled"] = True
     mechanism = defense_mechanisms_db[mechanism_id]
+    apply_mechanism(mechanism_id)
     
     if mechanism["name"] not in defense_status["active_defenses"]:
         defense_status["active_defenses"].append(mechanism["name"])
+    publish_defense_status("active_defenses")
+    publish_mechanism(mechanism_id, "enabled")
+    await ai_analyzer.invalidate_cache()
     
     create_log("SUCCESS", "DEFENSE", f"Defense mechanism {mechanism['name']} enabled")
     
@@ -569,9 +1294,13 @@ async def disable_defense_mechanism(mechanism_id: str, auth: bool = Depends(veri
     
     defense_mechanisms_db[mechanism_id]["enabled"] = False
     mechanism = defense_mechanisms_db[mechanism_id]
+    apply_mechanism(mechanism_id)
     
     if mechanism["name"] in defense_status["active_defenses"]:
         defense_status["active_defenses"].remove(mechanism["name"])
+    publish_defense_status("active_defenses")
+    publish_mechanism(mechanism_id, "enabled")
+    await ai_analyzer.invalidate_cache()
     
     create_log("WARNING", "DEFENSE", f"Defense mechanism {mechanism['name']} disabled")
     
@@ -582,19 +1311,161 @@ async def disable_defense_mechanism(mechanism_id: str, auth: bool = Depends(veri
 async def get_logs(
     limit: int = 100,
     level: Optional[str] = None,
+    category: Optional[str] = None,
+    attack_id: Optional[str] = None,
     auth: bool = Depends(verify_api_key)
 ):
-    """Get system logs"""
-    filtered_logs = logs_db
-    if level and level != "all":
-        filtered_logs = [log for log in logs_db if log["level"] == level.upper()]
-    return [LogEntry(**log) for log in filtered_logs[:limit]]
+    """Get system logs (newest first)"""
+    if level == "all":
+        level = None
+    level = level.upper() if level else None
+    category = category.upper() if category else None
+    logs = logs_db.newest(limit, level=level, category=category, attack_id=attack_id)
+    
+    # Older entries than the in-memory ring come from storage
+    if storage.durable and len(logs) < limit:
+        oldest = logs[-1] if logs else logs_db.get(logs_db.first_seq)
+        logs = logs + await asyncio.to_thread(
+            storage.log_page, limit - len(logs), oldest["log_id"] if oldest else None,
+            level, category, attack_id
+        )
+    return logs
 
 @app.get("/api/logs/stream")
-async def stream_logs(token: Optional[str] = None):
-    """Stream logs via Server-Sent Events (simplified)"""
-    # In production, implement proper SSE streaming
-    return {"message": "Use WebSocket or SSE for real-time logs"}
+async def stream_logs(
+    request: Request,
+    level: Optional[str] = None,
+    category: Optional[str] = None,
+    last_id: Optional[str] = None,
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """Stream logs via Server-Sent Events
+
+    `level` and `category` accept comma-separated values. Reconnecting clients
+    resume after `last_id` (or the Last-Event-ID header sent by EventSource).
+    """
+    levels = {l.strip().upper() for l in level.split(",") if l.strip()} if level and level != "all" else None
+    categories = {c.strip().upper() for c in category.split(",") if c.strip()} if category else None
+
+    def matches(log_entry: Dict) -> bool:
+        if levels and log_entry["level"] not in levels:
+            return False
+        if categories and log_entry["category"] not in categories:
+            return False
+        return True
+
+    # Subscribe and collect the replay backlog before the first await so no entry is missed
+    subscription = log_broadcaster.subscribe(predicate=matches)
+    resume_from = last_id or last_event_id
+    backlog: List[str] = []
+    gap = False
+    if resume_from:
+        seq = logs_db.seq_of(resume_from)
+        if seq is None:
+            # Entry already evicted: replay everything still held
+            gap = True
+            seq = logs_db.first_seq - 1
+        backlog = [encode_log_event(entry) for entry in logs_db.iter_since(seq) if matches(entry)]
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if gap:
+                yield "event: gap\ndata: {}\n\n"
+            for frame in backlog:
+                yield frame
+            while not subscription.closed:
+                frame = await subscription.get(timeout=15.0)
+                dropped = subscription.take_dropped()
+                if dropped:
+                    yield f"event: lag\ndata: {json.dumps({'dropped': dropped})}\n\n"
+                if frame is None:
+                    if await request.is_disconnected():
+                        break
+                    # Keep-alive comment for idle connections
+                    yield ": ping\n\n"
+                    continue
+                yield frame
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Dashboard push channel
+@app.websocket("/ws/dashboard")
+async def dashboard_channel(websocket: WebSocket, topics: Optional[str] = None):
+    """Multiplexed dashboard updates: snapshot on connect, then versioned deltas
+
+    Clients may send {"action": "subscribe" | "unsubscribe" | "resync", "topics": [...]}.
+    """
+    try:
+        subscribed = dashboard_hub.parse_topics(topics.split(",") if topics else None)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    subscription = dashboard_hub.subscribe(subscribed)
+    
+    async def send_snapshot(names):
+        for message in dashboard_hub.snapshot(sorted(names)):
+            await websocket.send_text(message)
+    
+    async def receive_commands():
+        try:
+            while True:
+                try:
+                    command = json.loads(await websocket.receive_text())
+                except json.JSONDecodeError:
+                    command = None
+                if not isinstance(command, dict):
+                    await websocket.send_json({"type": "error", "detail": "Commands must be JSON objects"})
+                    continue
+                action = command.get("action")
+                try:
+                    requested = dashboard_hub.parse_topics(command.get("topics"))
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    continue
+                if action == "subscribe":
+                    subscribed.update(requested)
+                    await send_snapshot(requested)
+                elif action == "unsubscribe":
+                    subscribed.difference_update(requested)
+                elif action == "resync":
+                    await send_snapshot(requested & subscribed)
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"Unknown action: {action}"})
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            # Wakes the sender loop below
+            subscription.close()
+    
+    receiver = asyncio.create_task(receive_commands())
+    try:
+        await send_snapshot(subscribed)
+        while not subscription.closed:
+            message = await subscription.get(timeout=30.0)
+            if subscription.take_dropped():
+                # Deltas were lost while this client lagged: resend full state
+                await send_snapshot(subscribed)
+                continue
+            if message is None:
+                if not subscription.closed:
+                    await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_text(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        subscription.close()
+        receiver.cancel()
 
 # Statistics endpoints
 @app.get("/api/statistics", response_model=Statistics)
@@ -602,8 +1473,42 @@ async def get_statistics(
     time_range: Optional[str] = "24h",
     auth: bool = Depends(verify_api_key)
 ):
-    """Get system statistics"""
-    return Statistics(**statistics_db)
+    """Get system statistics with the time series for `time_range` (e.g. 15m, 24h, 7d)"""
+    try:
+        resolution, time_series = statistics_rollups.query(time_range or "24h")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Statistics(
+        **statistics_db,
+        time_series=time_series,
+        resolution=resolution,
+        latency_percentiles=overall_latency.percentiles(),
+        attack_type_latency=attack_latency.all_percentiles()
+    )
+
+@app.get("/api/statistics/top")
+async def get_top_talkers(
+    dimension: Optional[str] = None,
+    limit: int = 10,
+    window: Optional[float] = None,
+    auth: bool = Depends(verify_api_key)
+):
+    """Approximate top client IPs (`ips`), attack target hosts (`hosts`) and request paths (`paths`)
+
+    Counts cover the last `window` seconds (rounded up to whole slices, at
+    most TOP_WINDOW_SECONDS) and may overestimate, never underestimate.
+    """
+    if dimension is not None and dimension not in TOP_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of: {', '.join(TOP_DIMENSIONS)}")
+    if window is not None and window <= 0:
+        raise HTTPException(status_code=400, detail="window must be positive")
+    limit = max(0, min(limit, top_talkers.capacity))
+    if dimension is not None:
+        return top_talkers.top(dimension, limit, window)
+    return dict(
+        {name: top_talkers.top(name, limit, window) for name in TOP_DIMENSIONS},
+        tracker=top_talkers.stats()
+    )
 
 # AI Analysis endpoints
 @app.post("/api/ai/analyze")
@@ -612,25 +1517,186 @@ async def analyze_attack_ai(
     auth: bool = Depends(verify_api_key)
 ):
     """Analyze attack pattern using AI"""
+    llm_endpoint.set("/api/ai/analyze")
     try:
         analysis = await ai_analyzer.analyze_attack_pattern(attack_data)
         return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI analysis failed: {str(e)}")
 
+# Bulk analysis limits
+BATCH_ANALYSIS_MAX_RECORDS = int(os.getenv("BATCH_ANALYSIS_MAX_RECORDS", "200000"))
+BATCH_ANALYSIS_MAX_AI_RECORDS = int(os.getenv("BATCH_ANALYSIS_MAX_AI_RECORDS", "50"))
+
+async def read_batch_records(
+    request: Request, key: str = "attacks", max_records: Optional[int] = None, noun: str = "attack"
+) -> List[Dict[str, Any]]:
+    """Records from a JSON array body (or an object with the array under `key`) or an NDJSON stream"""
+    max_records = max_records or BATCH_ANALYSIS_MAX_RECORDS
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        records = []
+        buffer = b""
+        line_number = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    records.append(parse_batch_line(line, line_number, noun))
+            if len(records) > max_records:
+                raise HTTPException(status_code=413, detail=f"At most {max_records} records per batch")
+        if buffer.strip():
+            records.append(parse_batch_line(buffer, line_number + 1, noun))
+    else:
+        try:
+            records = json.loads(await request.body())
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if isinstance(records, dict):
+            records = records.get(key)
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise HTTPException(status_code=400, detail=f"Body must be a JSON array of {noun} objects")
+    if len(records) > max_records:
+        raise HTTPException(status_code=413, detail=f"At most {max_records} records per batch")
+    return records
+
+def parse_batch_line(line: bytes, line_number: int, noun: str = "attack") -> Dict[str, Any]:
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON on line {line_number}: {e}")
+    if not isinstance(record, dict):
+        raise HTTPException(status_code=400, detail=f"Line {line_number} is not {'an' if noun[0] in 'aeiou' else 'a'} {noun} object")
+    return record
+
+@app.post("/api/ai/analyze/batch")
+async def analyze_attacks_batch(
+    request: Request,
+    mode: str = "rules",
+    defenses: Optional[str] = None,
+    auth: bool = Depends(verify_api_key)
+):
+    """Analyze many attack records and decide blocking for each
+
+    The body is a JSON array or NDJSON (Content-Type: application/x-ndjson).
+    Records are scored with the vectorized rule-based analysis; with `mode=auto`
+    records of attack types the rules don't know also get an LLM analysis.
+    `defenses` (comma-separated) overrides the currently active defenses.
+    """
+    if mode not in ("rules", "auto"):
+        raise HTTPException(status_code=400, detail="mode must be 'rules' or 'auto'")
+    llm_endpoint.set("/api/ai/analyze/batch")
+    records = await read_batch_records(request)
+    active_defenses = (
+        [name for name in defenses.split(",") if name] if defenses is not None
+        else defense_status.get("active_defenses", [])
+    )
+    
+    try:
+        # Scoring 100k+ records takes a while: keep the event loop serving other requests
+        results = await asyncio.to_thread(score_records, records, active_defenses)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    ai_indexes = []
+    if mode == "auto" and ai_analyzer.api_key:
+        ai_indexes = [
+            index for index, record in enumerate(records) if not is_known_type(record.get("attack_type"))
+        ][:BATCH_ANALYSIS_MAX_AI_RECORDS]
+    if ai_indexes:
+        analyses = await asyncio.gather(*(ai_analyzer.analyze_attack_pattern(records[index]) for index in ai_indexes))
+        for index, analysis in zip(ai_indexes, analyses):
+            decision = await ai_analyzer.should_block_attack(records[index], active_defenses, analysis=analysis)
+            decision.pop("analysis", None)
+            results[index].update(source="ai", analysis=analysis, block_decision=decision)
+    
+    body = {
+        "count": len(results),
+        "blocked": sum(1 for result in results if result["block_decision"]["should_block"]),
+        "ai_analyzed": len(ai_indexes),
+        "results": results
+    }
+    # Serialized directly: the response model encoder is too slow for 100k+ items
+    return Response(content=json.dumps(body, default=str), media_type="application/json")
+
 @app.post("/api/ai/recommendations")
 async def get_ai_recommendations(
     auth: bool = Depends(verify_api_key)
 ):
     """Get AI-powered defense recommendations"""
+    llm_endpoint.set("/api/ai/recommendations")
     try:
-        # Get recent attack history
-        recent_attacks = list(attacks_db.values())[-20:]  # Last 20 attacks
-        recommendations = await ai_analyzer.generate_defense_recommendations(recent_attacks)
+        recommendations = await ai_analyzer.generate_defense_recommendations(
+            attack_summary.snapshot(),
+            defense_status.get("active_defenses", []),
+            signature=attack_summary.signature()
+        )
         return recommendations
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate recommendations: {str(e)}")
 
+@app.get("/api/ai/recommendations/stream")
+async def stream_ai_recommendations(
+    auth: bool = Depends(verify_api_key)
+):
+    """Stream AI defense recommendations via Server-Sent Events
+
+    Emits a `recommendation` event per item as soon as the model has finished it,
+    then a `result` event with the complete validated object.
+    """
+    summary = attack_summary.snapshot()
+    signature = attack_summary.signature()
+    active_defenses = list(defense_status.get("active_defenses", []))
+    
+    async def event_stream():
+        llm_endpoint.set("/api/ai/recommendations/stream")
+        async for event, data in ai_analyzer.stream_defense_recommendations(summary, active_defenses, signature):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/ai/usage")
+async def get_ai_usage(auth: bool = Depends(verify_api_key)):
+    """Get LLM call accounting: tokens, cost, latency, cache hits, fallbacks and budget state"""
+    return ai_analyzer.accounting.stats()
+
+@app.get("/api/ai/summary")
+async def get_attack_summary(auth: bool = Depends(verify_api_key)):
+    """Get the running attack summary that recommendation prompts are built from"""
+    return attack_summary.snapshot()
+
+@app.get("/api/ai/cache")
+async def get_ai_cache_stats(auth: bool = Depends(verify_api_key)):
+    """Get analysis cache hit/miss/eviction counters"""
+    stats = ai_analyzer.cache.stats()
+    stats["coalesced_requests"] = ai_analyzer.coalesced_requests
+    stats["batching"] = ai_analyzer.batcher.stats() if ai_analyzer.batcher else None
+    return stats
+
+@app.get("/api/ai/breaker")
+async def get_ai_breaker_stats(auth: bool = Depends(verify_api_key)):
+    """Get LLM circuit breaker state, trip counts and decision budget fallbacks"""
+    return ai_analyzer.breaker_stats()
+
+@app.get("/api/ai/limiter")
+async def get_ai_limiter_stats(auth: bool = Depends(verify_api_key)):
+    """Get provider limiter queue depth, quota, throttling and retry counters"""
+    stats = ai_analyzer.limiter.stats()
+    stats["retries"] = ai_analyzer.retries
+    return stats
+
+@app.delete("/api/ai/cache")
+async def invalidate_ai_cache(auth: bool = Depends(verify_api_key)):
+    """Drop all cached AI analyses"""
+    await ai_analyzer.invalidate_cache()
+    return {"message": "AI analysis cache invalidated", "status": "success"}
+
 # Port Scanner endpoint
 class PortScanRequest(BaseModel):
     target_url: str
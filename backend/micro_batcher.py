@@ -0,0 +1,91 @@
+"""
+Micro Batcher Module
+Collects concurrent requests for a short window and sends them as one batch
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """Groups items submitted within `window` seconds (or up to `max_items`) into one call
+
+    `send_batch` receives the list of items and returns one result per item, in order.
+    If it raises, or returns the wrong number of results, every caller in that
+    batch gets the exception; if the send is cancelled, so are the callers.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        window: float = 0.05,
+        max_items: int = 8
+    ):
+        self.send_batch = send_batch
+        self.window = window
+        self.max_items = max_items
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send(batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.send_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"send_batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        except BaseException:
+            # Cancelled (or shutting down): never leave a caller waiting forever
+            self._fail(batch, None)
+            raise
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[Any, asyncio.Future]], error: Optional[BaseException]):
+        """Set `error` on the callers still waiting, or cancel them when it is None"""
+        for _, future in batch:
+            if future.done():
+                continue
+            if error is None:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+    def stats(self):
+        return {
+            "window": self.window,
+            "max_items": self.max_items,
+            "batches": self.batches,
+            "items": self.items,
+            "average_batch_size": self.items / self.batches if self.batches else 0.0
+        }
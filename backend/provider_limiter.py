@@ -0,0 +1,174 @@
+"""
+Provider Limiter Module
+Requests/min + tokens/min token buckets and a concurrency cap for an LLM provider
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+# Queue priorities, lowest first
+PRIORITY_DECISION = 0
+PRIORITY_RECOMMENDATION = 1
+
+# Buckets hold this many seconds of quota, so short bursts go out at once
+BURST_SECONDS = 10
+
+
+class TokenBucket:
+    """Continuous-refill token bucket; may go negative when actual usage exceeds the estimate"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if now)"""
+        self._refill(now)
+        # Requests larger than the bucket only need a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ProviderLimiter:
+    """Priority queue in front of rpm/tpm buckets and a concurrency semaphore
+
+    Waiters are served strictly by (priority, arrival); the head of the queue
+    waits for quota rather than being overtaken, so lower priorities never
+    starve higher ones.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int
+    ):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._queue: List[Tuple[int, int, asyncio.Future, float]] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._paused_until = 0.0
+        self.acquired = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self, priority: int, tokens: float, deadline: float):
+        """Wait for a slot and quota; raises asyncio.TimeoutError at `deadline` (monotonic)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        started = time.monotonic()
+        heapq.heappush(self._queue, (priority, next(self._counter), future, tokens))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - started))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            # Granted just before the cancel: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        self.acquired += 1
+        self.wait_seconds += time.monotonic() - started
+
+    def release(self, actual_tokens: Optional[float] = None, estimated_tokens: float = 0.0):
+        """Free the concurrency slot and correct the token bucket with the real usage"""
+        self.in_flight -= 1
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.take(actual_tokens - estimated_tokens)
+        self._dispatch()
+
+    def pause(self, seconds: float):
+        """Hold all requests (e.g. on 429 with Retry-After)"""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queue = self._queue
+        while queue and self.in_flight < self.max_concurrency:
+            _, _, future, tokens = queue[0]
+            if future.done():
+                # Timed out or cancelled while queued
+                heapq.heappop(queue)
+                continue
+            now = time.monotonic()
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, now) if self.requests else 0.0,
+                self.tokens.wait_time(tokens, now) if self.tokens else 0.0
+            )
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(queue)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "queued": sum(1 for _, _, future, _ in self._queue if not future.done()),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests.rate * 60 if self.requests else None,
+            "tokens_per_minute": self.tokens.rate * 60 if self.tokens else None,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "throttled": self.throttled,
+            "average_wait": self.wait_seconds / self.acquired if self.acquired else 0.0
+        }
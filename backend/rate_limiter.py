@@ -0,0 +1,186 @@
+"""
+Rate Limiter Module
+Per-client token buckets enforced on incoming requests by an ASGI middleware
+"""
+
+import heapq
+import json
+import math
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+
+def parse_rate_limit_settings(settings: Dict[str, Any]) -> Tuple[float, bool, frozenset]:
+    """(requests_per_minute, adaptive, whitelist) from the mechanism settings; raises ValueError"""
+    try:
+        requests_per_minute = float(settings.get("requests_per_minute", 100))
+    except (TypeError, ValueError):
+        raise ValueError("requests_per_minute must be a number")
+    if requests_per_minute <= 0:
+        raise ValueError("requests_per_minute must be positive")
+    whitelist = settings.get("ip_whitelist") or []
+    if not isinstance(whitelist, list) or not all(isinstance(ip, str) for ip in whitelist):
+        raise ValueError("ip_whitelist must be a list of IP addresses")
+    return requests_per_minute, bool(settings.get("adaptive_threshold", False)), frozenset(ip.strip() for ip in whitelist)
+
+
+class RateLimiter:
+    """Token bucket per client IP, refilled at requests_per_minute with a minute's burst
+
+    Buckets live in `shards` dicts of [tokens, updated] pairs, at most
+    `max_clients` in total. A bucket that has been idle long enough to refill
+    completely is the same as a new one, so it is dropped when its shard is
+    swept: one shard every SWEEP_EVERY checks, and any shard that fills up.
+    A full shard with nothing idle drops the buckets closest to full.
+
+    With `adaptive` on, requests refused while a client is throttled push its
+    bucket into debt (down to minus one burst), so a client that keeps
+    hammering stays blocked until it backs off.
+    """
+
+    SWEEP_EVERY = 1024
+    # Share of a full shard dropped when nothing in it is idle
+    EVICT_FRACTION = 0.125
+
+    def __init__(self, shards: int = 64, max_clients: int = 100000):
+        # Power of two, so the shard is picked with a mask
+        self.shard_count = 1 << max(0, (shards - 1).bit_length())
+        self._mask = self.shard_count - 1
+        self.shard_capacity = max(1, max_clients // self.shard_count)
+        self._shards: List[Dict[str, List[float]]] = [{} for _ in range(self.shard_count)]
+        self._checks = 0
+        self._next_sweep = 0
+        self.configure(False, 100)
+        self.on_block: Optional[Callable[[str], None]] = None
+        # Called once when an adaptive bucket bottoms out: the client kept sending a whole burst while blocked
+        self.on_saturated: Optional[Callable[[str], None]] = None
+        self.allowed = 0
+        self.blocked = 0
+        self.whitelisted = 0
+        self.evicted = 0
+
+    def configure(self, enabled: bool, requests_per_minute: float, adaptive: bool = False, whitelist: frozenset = frozenset()):
+        self.enabled = enabled
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, requests_per_minute)
+        self.adaptive = adaptive
+        self.whitelist = whitelist
+        # Idle long enough to climb back from the deepest debt to a full bucket
+        self.idle_seconds = 2 * self.capacity / self.rate
+
+    def check(self, client: str) -> float:
+        """0 if the request may proceed, else seconds until it would be allowed"""
+        if client in self.whitelist:
+            self.whitelisted += 1
+            return 0.0
+        now = time.monotonic()
+        self._checks += 1
+        if self._checks % self.SWEEP_EVERY == 0:
+            self._sweep(self._next_sweep, now)
+            self._next_sweep = (self._next_sweep + 1) & self._mask
+
+        index = hash(client) & self._mask
+        shard = self._shards[index]
+        bucket = shard.get(client)
+        if bucket is None:
+            if len(shard) >= self.shard_capacity:
+                self._make_room(index, now)
+            shard[client] = [self.capacity - 1, now]
+            self.allowed += 1
+            return 0.0
+
+        tokens = bucket[0] + (now - bucket[1]) * self.rate
+        if tokens > self.capacity:
+            tokens = self.capacity
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            self.allowed += 1
+            return 0.0
+
+        if self.adaptive and tokens > -self.capacity:
+            tokens -= 1
+            if tokens <= -self.capacity and self.on_saturated is not None:
+                self.on_saturated(client)
+        bucket[0] = tokens
+        self.blocked += 1
+        if self.on_block is not None:
+            self.on_block(client)
+        return (1 - tokens) / self.rate
+
+    def _sweep(self, index: int, now: float) -> int:
+        shard = self._shards[index]
+        cutoff = now - self.idle_seconds
+        idle = [client for client, bucket in shard.items() if bucket[1] < cutoff]
+        for client in idle:
+            del shard[client]
+        self.evicted += len(idle)
+        return len(idle)
+
+    def _make_room(self, index: int, now: float):
+        if self._sweep(index, now):
+            return
+        shard = self._shards[index]
+        # Nothing idle: drop the buckets with the most tokens, the least to lose
+        count = max(1, int(len(shard) * self.EVICT_FRACTION))
+        fullest = heapq.nlargest(
+            count, shard.items(), key=lambda item: item[1][0] + (now - item[1][1]) * self.rate
+        )
+        for client, _ in fullest:
+            del shard[client]
+        self.evicted += count
+
+    def clients(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "requests_per_minute": self.requests_per_minute,
+            "adaptive": self.adaptive,
+            "whitelist_size": len(self.whitelist),
+            "clients": self.clients(),
+            "max_clients": self.shard_capacity * self.shard_count,
+            "shards": self.shard_count,
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "whitelisted": self.whitelisted,
+            "evicted": self.evicted
+        }
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware: answers 429 with Retry-After when the client is over its limit
+
+    Requests under `exempt_prefixes` (the dashboard's own control plane) are never limited.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, exempt_prefixes: Tuple[str, ...] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.exempt_prefixes = tuple(exempt_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http" or not self.limiter.enabled
+            or scope.get("path", "").startswith(self.exempt_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        retry_after = self.limiter.check(client[0] if client else "")
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+        body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,151 @@
+"""
+Rollups Module
+Pre-aggregated attack time series at several resolutions in fixed memory
+"""
+
+import re
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+# (name, bucket size in seconds, number of buckets kept)
+DEFAULT_RESOLUTIONS = (
+    ("1s", 1, 3600),       # last hour
+    ("1m", 60, 1440),      # last day
+    ("1h", 3600, 720),     # last 30 days
+    ("1d", 86400, 365),    # last year
+)
+
+TIME_RANGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_time_range(time_range: str) -> int:
+    """Parse a range like '15m', '24h' or '7d' into seconds"""
+    match = re.fullmatch(r"\s*(\d+)\s*([smhdw])\s*", time_range or "")
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid time range: {time_range}")
+    return int(match.group(1)) * TIME_RANGE_UNITS[match.group(2)]
+
+
+class RollupSeries:
+    """Circular buffer of per-bucket counters at one resolution"""
+
+    def __init__(self, name: str, resolution: int, slots: int):
+        self.name = name
+        self.resolution = resolution
+        self.slots = slots
+        # Absolute bucket number held by each slot (-1 when unused)
+        self.bucket_ids = array("q", [-1]) * slots
+        self.attacks = array("q", [0]) * slots
+        self.blocked = array("q", [0]) * slots
+        self.latency_sum = array("d", [0.0]) * slots
+        self.latency_min = array("d", [0.0]) * slots
+        self.latency_max = array("d", [0.0]) * slots
+
+    @property
+    def span(self) -> int:
+        return self.resolution * self.slots
+
+    def record(self, timestamp: float, blocked: bool, latency: float) -> int:
+        """Add one attack to its bucket in O(1). Returns the bucket number."""
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.slots
+        if self.bucket_ids[slot] != bucket:
+            # Slot still holds an expired bucket: reuse it
+            self.bucket_ids[slot] = bucket
+            self.attacks[slot] = 0
+            self.blocked[slot] = 0
+            self.latency_sum[slot] = 0.0
+            self.latency_min[slot] = latency
+            self.latency_max[slot] = latency
+        self.attacks[slot] += 1
+        if blocked:
+            self.blocked[slot] += 1
+        self.latency_sum[slot] += latency
+        if latency < self.latency_min[slot]:
+            self.latency_min[slot] = latency
+        if latency > self.latency_max[slot]:
+            self.latency_max[slot] = latency
+        return bucket
+
+    def point(self, bucket: int) -> Dict[str, Any]:
+        slot = bucket % self.slots
+        point = {
+            "timestamp": datetime.fromtimestamp(bucket * self.resolution).isoformat(),
+            "attacks": 0,
+            "blocked": 0,
+            "latency": 0.0,
+            "latency_min": 0.0,
+            "latency_max": 0.0
+        }
+        if self.bucket_ids[slot] == bucket:
+            attacks = self.attacks[slot]
+            point["attacks"] = attacks
+            point["blocked"] = self.blocked[slot]
+            point["latency"] = self.latency_sum[slot] / attacks if attacks else 0.0
+            point["latency_min"] = self.latency_min[slot]
+            point["latency_max"] = self.latency_max[slot]
+        return point
+
+    def points(self, seconds: int, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """One point per bucket covering the last `seconds`, oldest first"""
+        now = time.time() if now is None else now
+        last = int(now // self.resolution)
+        count = min(max(1, -(-seconds // self.resolution)), self.slots)
+        return [self.point(bucket) for bucket in range(last - count + 1, last + 1)]
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "resolution": self.resolution,
+            "slots": self.slots,
+            "bucket_ids": self.bucket_ids.tolist(),
+            "attacks": self.attacks.tolist(),
+            "blocked": self.blocked.tolist(),
+            "latency_sum": self.latency_sum.tolist(),
+            "latency_min": self.latency_min.tolist(),
+            "latency_max": self.latency_max.tolist()
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        if state.get("resolution") != self.resolution or state.get("slots") != self.slots:
+            return
+        for field in ("bucket_ids", "attacks", "blocked", "latency_sum", "latency_min", "latency_max"):
+            getattr(self, field)[:] = array(getattr(self, field).typecode, state[field])
+
+
+class StatisticsRollups:
+    """Attack counters and latency rolled up at 1s/1m/1h/1d resolution"""
+
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS, max_points: int = 300):
+        self.series = [RollupSeries(name, resolution, slots) for name, resolution, slots in resolutions]
+        self.max_points = max_points
+
+    def record(self, blocked: bool, latency: float, timestamp: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Record one attack at every resolution; returns the updated bucket per resolution"""
+        timestamp = time.time() if timestamp is None else timestamp
+        return {
+            series.name: series.point(series.record(timestamp, blocked, latency))
+            for series in self.series
+        }
+
+    def select(self, seconds: int) -> RollupSeries:
+        """Finest resolution that covers the range within the point budget"""
+        for series in self.series:
+            if seconds <= series.span and seconds / series.resolution <= self.max_points:
+                return series
+        return self.series[-1]
+
+    def query(self, time_range: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Time series for a range like '24h'. Returns (resolution name, points)."""
+        seconds = parse_time_range(time_range)
+        series = self.select(seconds)
+        return series.name, series.points(seconds)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {series.name: series.to_state() for series in self.series}
+
+    def load_state(self, state: Dict[str, Any]):
+        for series in self.series:
+            if series.name in state:
+                series.load_state(state[series.name])
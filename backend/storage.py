@@ -0,0 +1,422 @@
+"""
+Storage Module
+Pluggable persistence for attacks, logs, statistics and defense configuration
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """Base storage backend; the default implementation keeps nothing beyond memory"""
+
+    durable = False
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write_batch(self, attacks: List[Dict[str, Any]], logs: List[Dict[str, Any]], state: Dict[str, str]):
+        """Persist one group of changes in a single transaction"""
+        pass
+
+    def load_state(self) -> Dict[str, Any]:
+        return {}
+
+    def recent_attacks(self, limit: int) -> List[Dict[str, Any]]:
+        """Most recent attacks, oldest first"""
+        return []
+
+    def recent_logs(self, limit: int) -> List[Dict[str, Any]]:
+        """Most recent logs, oldest first"""
+        return []
+
+    def get_attack(self, attack_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def attack_page(
+        self,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        attack_type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest-first page of attacks relative to an attack_id cursor"""
+        return []
+
+    def log_page(
+        self,
+        limit: int,
+        before: Optional[str] = None,
+        level: Optional[str] = None,
+        category: Optional[str] = None,
+        attack_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest-first page of logs older than a log_id cursor"""
+        return []
+
+    def prune(self, older_than: str):
+        """Delete attacks and logs with a timestamp before `older_than`"""
+        pass
+
+
+class MemoryStorage(StorageBackend):
+    """In-memory backend: state lives only in the bounded in-process indexes"""
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite backend in WAL mode with indexed history and log queries"""
+
+    durable = True
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS attacks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    attack_id TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    attack_type TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attacks_type ON attacks (attack_type, seq);
+CREATE INDEX IF NOT EXISTS idx_attacks_status ON attacks (status, seq);
+CREATE INDEX IF NOT EXISTS idx_attacks_timestamp ON attacks (timestamp);
+
+CREATE TABLE IF NOT EXISTS logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_id TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    level TEXT NOT NULL,
+    category TEXT NOT NULL,
+    attack_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_level ON logs (level, seq);
+CREATE INDEX IF NOT EXISTS idx_logs_category ON logs (category, seq);
+CREATE INDEX IF NOT EXISTS idx_logs_attack ON logs (attack_id, seq);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        # The reader connection is shared by worker threads
+        self._read_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(self.SCHEMA)
+        self._reader = self._connect()
+
+    def close(self):
+        for connection in (self._writer, self._reader):
+            if connection is not None:
+                connection.close()
+        self._writer = self._reader = None
+
+    def write_batch(self, attacks: List[Dict[str, Any]], logs: List[Dict[str, Any]], state: Dict[str, str]):
+        with self._writer:
+            if attacks:
+                self._writer.executemany(
+                    """INSERT INTO attacks (attack_id, timestamp, attack_type, status, data)
+                       VALUES (:attack_id, :timestamp, :attack_type, :status, :data)
+                       ON CONFLICT(attack_id) DO UPDATE SET status = excluded.status, data = excluded.data""",
+                    attacks
+                )
+            if logs:
+                self._writer.executemany(
+                    """INSERT OR IGNORE INTO logs (log_id, timestamp, level, category, attack_id, data)
+                       VALUES (:log_id, :timestamp, :level, :category, :attack_id, :data)""",
+                    logs
+                )
+            if state:
+                self._writer.executemany(
+                    "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    state.items()
+                )
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def load_state(self) -> Dict[str, Any]:
+        return {key: json.loads(value) for key, value in self._query("SELECT key, value FROM state")}
+
+    def recent_attacks(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._query("SELECT data FROM attacks ORDER BY seq DESC LIMIT ?", (limit,))
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def recent_logs(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._query("SELECT data FROM logs ORDER BY seq DESC LIMIT ?", (limit,))
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def get_attack(self, attack_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT data FROM attacks WHERE attack_id = ?", (attack_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def attack_page(
+        self,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        attack_type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("seq < (SELECT seq FROM attacks WHERE attack_id = ?)")
+            params.append(before)
+        if after is not None:
+            clauses.append("seq > (SELECT seq FROM attacks WHERE attack_id = ?)")
+            params.append(after)
+        if attack_type:
+            clauses.append("attack_type = ?")
+            params.append(attack_type)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # `after` pages are the records right after the cursor, still returned newest-first
+        order = "ASC" if after is not None else "DESC"
+        rows = self._query(f"SELECT data FROM attacks {where} ORDER BY seq {order} LIMIT ?", (*params, limit))
+        items = [json.loads(data) for (data,) in rows]
+        if after is not None:
+            items.reverse()
+        return items
+
+    def log_page(
+        self,
+        limit: int,
+        before: Optional[str] = None,
+        level: Optional[str] = None,
+        category: Optional[str] = None,
+        attack_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("seq < (SELECT seq FROM logs WHERE log_id = ?)")
+            params.append(before)
+        for column, value in (("level", level), ("category", category), ("attack_id", attack_id)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(f"SELECT data FROM logs {where} ORDER BY seq DESC LIMIT ?", (*params, limit))
+        return [json.loads(data) for (data,) in rows]
+
+    def prune(self, older_than: str):
+        with self._writer:
+            self._writer.execute("DELETE FROM attacks WHERE timestamp < ?", (older_than,))
+            self._writer.execute("DELETE FROM logs WHERE timestamp < ?", (older_than,))
+
+
+class GroupCommitWriter:
+    """Buffers writes on the event loop and commits them in batches off-loop
+
+    Attack and state writes are coalesced by key, so only the latest version of
+    a record is written per batch; logs are appended in order.
+
+    A failed batch is put back and retried with exponential backoff. While the
+    backend is down at most `max_pending_logs` logs are buffered; the oldest
+    are dropped beyond that and counted in `dropped_logs`.
+    """
+
+    MAX_RETRY_DELAY = 30.0
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        flush_interval: float = 0.05,
+        retention_days: Optional[float] = None,
+        max_pending_logs: int = 10000
+    ):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.max_pending_logs = max(1, max_pending_logs)
+        self._attacks: Dict[str, Dict[str, Any]] = {}
+        self._logs: List[Dict[str, Any]] = []
+        self._state: Dict[str, Any] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stop_requested: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_prune: Optional[float] = None
+        # Seconds to wait before retrying a failed batch; 0 while writes succeed
+        self.retry_delay = 0.0
+        self.batches = 0
+        self.errors = 0
+        self.dropped_logs = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._attacks) + len(self._logs) + len(self._state)
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def put_attack(self, record: Dict[str, Any]):
+        if self.backend.durable:
+            self._attacks[record["attack_id"]] = record
+            self._notify()
+
+    def put_log(self, entry: Dict[str, Any]):
+        if self.backend.durable:
+            self._logs.append(entry)
+            self._trim_logs()
+            self._notify()
+
+    def put_state(self, key: str, value: Any):
+        if self.backend.durable:
+            self._state[key] = value
+            self._notify()
+
+    def start(self):
+        if self.backend.durable and self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._wakeup.set()
+            self._stop_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Cancelling would not stop a write already running in its thread, and the
+            # backend may be closed right after this: let the loop finish its flush and exit
+            self._stopping = True
+            self._stop_requested.set()
+            self._notify()
+            await self._task
+            self._task = None
+        # Final flush of anything still buffered
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping:
+            await self._wakeup.wait()
+            if not self._stopping:
+                # Let concurrent writes pile up into one transaction, or back off after a failure
+                await self._pause(self.retry_delay or self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+            if not self._stopping:
+                await self._maybe_prune()
+
+    async def _pause(self, seconds: float):
+        """Sleep for `seconds`, returning early when stop() is called"""
+        try:
+            await asyncio.wait_for(self._stop_requested.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def _trim_logs(self):
+        excess = len(self._logs) - self.max_pending_logs
+        if excess > 0:
+            del self._logs[:excess]
+            self.dropped_logs += excess
+
+    def _take_batch(self):
+        # Encode on the loop thread: records may still be mutated after this point
+        attacks = [
+            {
+                "attack_id": record["attack_id"],
+                "timestamp": record.get("timestamp", ""),
+                "attack_type": record.get("attack_type"),
+                "status": record.get("status"),
+                "data": json.dumps(record, default=str)
+            }
+            for record in self._attacks.values()
+        ]
+        logs = [
+            {
+                "log_id": entry["log_id"],
+                "timestamp": entry["timestamp"],
+                "level": entry["level"],
+                "category": entry["category"],
+                "attack_id": (entry.get("metadata") or {}).get("attack_id"),
+                "data": json.dumps(entry, default=str)
+            }
+            for entry in self._logs
+        ]
+        state = {key: json.dumps(value, default=str) for key, value in self._state.items()}
+        self._attacks, self._logs, self._state = {}, [], {}
+        return attacks, logs, state
+
+    def _requeue(self, attacks: Dict[str, Dict[str, Any]], logs: List[Dict[str, Any]], state: Dict[str, Any]):
+        """Put a failed batch back in front of what was buffered since, without overwriting newer entries"""
+        for attack_id, record in attacks.items():
+            self._attacks.setdefault(attack_id, record)
+        self._logs = logs + self._logs
+        self._trim_logs()
+        for key, value in state.items():
+            self._state.setdefault(key, value)
+        self._notify()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        taken = (self._attacks, self._logs, self._state)
+        attacks, logs, state = self._take_batch()
+        try:
+            await asyncio.to_thread(self.backend.write_batch, attacks, logs, state)
+            self.batches += 1
+            self.retry_delay = 0.0
+        except Exception as e:
+            self.errors += 1
+            self.retry_delay = min(self.MAX_RETRY_DELAY, max(2 * self.retry_delay, self.flush_interval, 0.1))
+            logger.warning(
+                "Storage write error, retrying in %.1fs (%d logs dropped so far): %s",
+                self.retry_delay, self.dropped_logs, e
+            )
+            self._requeue(*taken)
+
+    async def _maybe_prune(self):
+        if not self.retention_days:
+            return
+        now = asyncio.get_running_loop().time()
+        if self._last_prune is not None and now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        try:
+            await asyncio.to_thread(self.backend.prune, cutoff)
+        except Exception as e:
+            logger.warning("Storage prune error: %s", e)
+
+
+def create_storage() -> StorageBackend:
+    """Create the storage backend selected by STORAGE_BACKEND (memory or sqlite)"""
+    backend = os.getenv("STORAGE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv("SQLITE_PATH", "data/attack_defense.db"))
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+
+def from_address(app, ip: str):
+    """The ASGI app as seen from a client at `ip` (TestClient always reports "testclient")"""
+    async def wrapped(scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            scope = dict(scope, client=(ip, 50000))
+        await app(scope, receive, send)
+    return wrapped
+
+
+@pytest.fixture
+def main_app():
+    """The application module with its enforcement state reset afterwards"""
+    import main
+    from firewall import RuleTable
+    yield main
+    for handle in main._stats_publish_pending.values():
+        handle.cancel()
+    main._stats_publish_pending.clear()
+    main.firewall.replace_rules(RuleTable())
+    for mechanism_id in ("rate_limiting", "firewall", "ids"):
+        main.apply_mechanism(mechanism_id)
@@ -0,0 +1,82 @@
+import asyncio
+
+from ai_analyzer import AIAnalyzer
+from analysis_cache import AnalysisCache, attack_fingerprint
+
+
+def test_fingerprint_ignores_values_within_a_band():
+    base = {"attack_type": "xss", "intensity": 5, "duration": 30, "target_url": "http://Example.com/a?q=1",
+            "parameters": {"payload": "<b>"}}
+    same = dict(base, attack_type=" XSS ", intensity=6, duration=45, target_url="example.com/b",
+                parameters={"payload": "<i>"})
+    assert attack_fingerprint(base) == attack_fingerprint(same)
+    assert attack_fingerprint(base) != attack_fingerprint(dict(base, intensity=9))
+    assert attack_fingerprint(base) != attack_fingerprint(dict(base, parameters={"payload": 1}))
+
+
+def test_lru_eviction_and_copies():
+    async def scenario():
+        cache = AnalysisCache(max_entries=2)
+        for key in ("a", "b"):
+            await cache.set(key, {"key": key})
+        (await cache.get("a"))["key"] = "mutated"
+        await cache.set("c", {"key": "c"})
+        return cache, await cache.get("a"), await cache.get("b")
+
+    cache, a, b = asyncio.run(scenario())
+    assert a == {"key": "a"} and b is None
+    assert cache.evictions == 1
+
+
+def test_writes_from_before_an_invalidation_are_dropped(tmp_path):
+    async def scenario():
+        cache = AnalysisCache(disk_path=str(tmp_path / "cache.db"))
+        cache.open()
+        generation = cache.generation
+        await cache.invalidate()
+        await cache.set("key", {"stale": True}, generation)
+        await cache.set("other", {"fresh": True}, cache.generation)
+        cache._entries.clear()
+        return cache, await cache.get("key"), await cache.get("other")
+
+    cache, stale, fresh = asyncio.run(scenario())
+    assert stale is None and fresh == {"fresh": True}
+    assert cache.stale_writes == 1 and cache.disk_hits == 1
+    cache.close()
+
+
+def test_invalidation_discards_an_in_flight_analysis(monkeypatch):
+    analyzer = AIAnalyzer()
+    analyzer.api_key = "test"
+    analyzer.batcher = None
+    calls = []
+
+    async def request_analysis(attack_data):
+        release = asyncio.Event()
+        calls.append(release)
+        call = len(calls)
+        await release.wait()
+        return {"threat_level": "High", "call": call}
+
+    monkeypatch.setattr(analyzer, "_request_analysis", request_analysis)
+    attack = {"attack_type": "new_kind", "intensity": 5}
+
+    async def scenario():
+        first = asyncio.ensure_future(analyzer.analyze_attack_pattern(attack))
+        while len(calls) < 1:
+            await asyncio.sleep(0)
+        await analyzer.invalidate_cache()
+        # A request after the invalidation starts its own call instead of joining the old one
+        second = asyncio.ensure_future(analyzer.analyze_attack_pattern(attack))
+        while len(calls) < 2:
+            await asyncio.sleep(0)
+        for release in calls:
+            release.set()
+        results = await asyncio.gather(first, second)
+        return results, await analyzer.cache.get(attack_fingerprint(attack))
+
+    (first, second), cached = asyncio.run(asyncio.wait_for(scenario(), 2))
+    assert (first["call"], second["call"]) == (1, 2)
+    assert cached["call"] == 2
+    assert analyzer.cache.stale_writes == 1
+    assert analyzer._inflight == {}
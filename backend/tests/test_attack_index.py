@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from attack_index import AttackIndex
+from storage import GroupCommitWriter, SQLiteStorage
+
+TYPES = ("ddos", "xss", "sql_injection")
+
+
+def record(number: int) -> dict:
+    return {
+        "attack_id": f"a{number:04d}",
+        "attack_type": TYPES[number % 3],
+        "status": "completed" if number % 2 else "failed",
+        "timestamp": f"2026-01-01T00:00:{number % 60:02d}",
+    }
+
+
+def index_of(count: int, **kwargs) -> AttackIndex:
+    index = AttackIndex(**kwargs)
+    for number in range(count):
+        index.add(record(number))
+    return index
+
+
+def ids(items):
+    return [item["attack_id"] for item in items]
+
+
+def walk(index: AttackIndex, limit: int, **filters):
+    """Every page from newest to oldest by following the older cursor"""
+    pages, cursor = [], None
+    while True:
+        items, older, _ = index.page(limit, before=cursor, **filters)
+        pages.append(ids(items))
+        if older is None:
+            return pages
+        cursor = older
+
+
+def test_pages_cover_every_record_newest_first():
+    index = index_of(10)
+    assert walk(index, 4) == [
+        ["a0009", "a0008", "a0007", "a0006"],
+        ["a0005", "a0004", "a0003", "a0002"],
+        ["a0001", "a0000"],
+    ]
+
+
+def test_after_cursor_returns_the_next_newer_page():
+    index = index_of(10)
+    items, older, newer = index.page(3, after="a0002")
+    assert ids(items) == ["a0005", "a0004", "a0003"]
+    assert (older, newer) == ("a0003", "a0005")
+    items, older, newer = index.page(3, after="a0008")
+    assert ids(items) == ["a0009"] and newer is None
+    assert index.page(3, after="a0009") == ([], None, None)
+
+
+def test_filters_use_the_secondary_indexes():
+    index = index_of(20)
+    assert walk(index, 3, attack_type="xss") == [["a0019", "a0016", "a0013"], ["a0010", "a0007", "a0004"], ["a0001"]]
+    items, older, newer = index.page(10, attack_type="ddos", status="failed")
+    assert ids(items) == ["a0018", "a0012", "a0006", "a0000"]
+    assert older is None and newer is None
+    # A cursor that does not match the filter still positions the page
+    items, _, _ = index.page(2, before="a0010", attack_type="ddos")
+    assert ids(items) == ["a0009", "a0006"]
+
+
+def test_status_updates_move_records_between_indexes():
+    index = index_of(6)
+    index.update("a0000", {"status": "completed", "message": "done"})
+    assert ids(index.page(10, status="failed")[0]) == ["a0004", "a0002"]
+    assert ids(index.page(10, status="completed")[0]) == ["a0005", "a0003", "a0001", "a0000"]
+    assert index["a0000"]["message"] == "done"
+
+
+def test_eviction_keeps_the_newest_records():
+    index = index_of(3000, capacity=5)
+    assert len(index) == 5 and index.evicted == 2995
+    assert index.oldest_id() == "a2995"
+    assert walk(index, 2) == [["a2999", "a2998"], ["a2997", "a2996"], ["a2995"]]
+    # Compaction dropped evicted positions from the secondary indexes
+    assert ids(index.page(10, attack_type="xss")[0]) == ["a2998", "a2995"]
+    assert len(index._order) < 3000
+
+
+def test_cursor_past_eviction_raises_key_error():
+    index = index_of(10, capacity=4)
+    with pytest.raises(KeyError):
+        index.page(3, before="a0002")
+    with pytest.raises(KeyError):
+        index.page(3, after="a0005")
+    # The oldest held record is the cursor for paging on in storage
+    items, older, _ = index.page(4)
+    assert older is None and items[-1]["attack_id"] == index.oldest_id() == "a0006"
+
+
+def test_storage_pages_continue_past_the_memory_set(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "store.db"))
+    storage.open()
+    writer = GroupCommitWriter(storage)
+    index = AttackIndex(capacity=4)
+    for number in range(10):
+        index.add(record(number))
+        writer.put_attack(record(number))
+    asyncio.run(writer.flush())
+    cursor = index.oldest_id()
+    assert ids(storage.attack_page(3, before=cursor)) == ["a0005", "a0004", "a0003"]
+    assert ids(storage.attack_page(3, before="a0003")) == ["a0002", "a0001", "a0000"]
+    assert ids(storage.attack_page(2, after="a0001")) == ["a0003", "a0002"]
+    assert ids(storage.attack_page(5, before=cursor, attack_type="ddos")) == ["a0003", "a0000"]
+    storage.close()
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ai_analyzer import AIAnalyzer
+from batch_scoring import score_records
+
+DEFENSES = ["Firewall", "IDS", "Rate Limiting"]
+RECORDS = [
+    {"attack_type": "ddos", "intensity": 9},
+    {"attack_type": "ddos", "intensity": 3},
+    {"attack_type": "sql_injection"},
+    {"attack_type": "xss", "intensity": 6.5},
+    {"attack_type": "something_new", "intensity": 5},
+]
+
+
+def test_scores_match_the_single_record_rules():
+    analyzer = AIAnalyzer()
+    for record, result in zip(RECORDS, score_records(RECORDS, DEFENSES)):
+        expected = analyzer._rule_based_analysis(record)
+        analysis = json.loads(json.dumps(result["analysis"]))
+        assert analysis["threat_level"] == expected["threat_level"]
+        assert analysis["recommended_defenses"] == expected["recommended_defenses"]
+        assert analysis["characteristics"]["sophistication"] == expected["characteristics"]["sophistication"]
+
+
+@pytest.mark.parametrize("intensity", ["high", None, [5], float("nan"), "inf"])
+def test_non_numeric_intensity_is_rejected(intensity):
+    with pytest.raises(ValueError, match="Record 1: intensity"):
+        score_records([{"attack_type": "xss"}, {"attack_type": "xss", "intensity": intensity}], DEFENSES)
+
+
+def test_batch_endpoint_rejects_invalid_records(main_app):
+    client = TestClient(main_app.app)
+    response = client.post("/api/ai/analyze/batch", json=[{"attack_type": "xss", "intensity": "high"}])
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Record 0: intensity must be a number"}
+    response = client.post("/api/ai/analyze/batch", json=RECORDS)
+    assert response.status_code == 200
+    assert response.json()["count"] == len(RECORDS)
@@ -0,0 +1,112 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from behavior_engine import BehaviorEngine, BehaviorMiddleware, parse_behavior_settings
+from conftest import from_address
+
+
+def engine_with(memory_bytes: int = 32 * 1024 * 1024, **kwargs) -> BehaviorEngine:
+    engine = BehaviorEngine(memory_bytes=memory_bytes)
+    settings = dict(baseline_period=7, anomaly_threshold=0.75, track_user_patterns=True, alert_on_deviation=True)
+    settings.update(kwargs)
+    engine.configure(True, **settings)
+    return engine
+
+
+def warm_baseline(engine: BehaviorEngine, now: float, clients: int = 70, events: int = 256):
+    """Normal clients: a request every few seconds with some jitter, spread over many paths"""
+    for client in range(clients):
+        for event in range(events):
+            engine.observe(f"10.0.{client}.1", f"/page/{event % 12}", 200, now + event * (3 + (event * 7 % 5)))
+    return now + events * 8
+
+
+def test_features_of_a_regular_client():
+    engine = engine_with()
+    for event in range(64):
+        engine.observe("a", f"/p{event}", 404 if event % 2 else 200, 1000.0 + event)
+        engine.observe("b", "/", 200, 1000.0 + event + (event % 3) * 0.9)
+    result = engine.score("a", now=1063.0)
+    assert result["events"] == 64
+    features = result["features"]
+    # Regular timing varies less than jittery timing; paths are spread out
+    assert features["interarrival_cv"] < engine.score("b", now=1063.0)["features"]["interarrival_cv"]
+    assert engine.score("b", now=1063.0)["features"]["path_entropy"] == 0.0
+    assert 0.5 < features["path_entropy"] <= 1.0
+    assert 0.3 < features["error_ratio"] < 0.7
+    assert result["score"] == 0.0  # no baseline yet
+    assert engine.score("unknown") is None
+
+
+def test_flooding_client_is_anomalous():
+    engine = engine_with()
+    alerts = []
+    engine.on_anomaly = lambda client, score, features: alerts.append(client)
+    now = warm_baseline(engine, 1_000_000.0)
+    assert engine.baseline()["samples"] >= BehaviorEngine.MIN_BASELINE
+    for event in range(160):
+        engine.observe("93.184.216.9", "/login", 401, now + event * 0.01)
+    result = engine.score("93.184.216.9", now=now + 1.6)
+    assert result["anomalous"] and result["score"] >= 0.75
+    assert alerts == ["93.184.216.9"]
+    assert engine.top(1, now=now + 1.6)[0]["client"] == "93.184.216.9"
+
+
+def test_least_recently_seen_clients_are_evicted():
+    engine = BehaviorEngine(memory_bytes=1)
+    engine.configure(True, 7, 0.75, True, True)
+    engine.max_clients = 2
+    for client in ("a", "b", "a", "c"):
+        engine.observe(client, "/", 200, 1000.0)
+    assert engine.score("b") is None
+    assert engine.score("a") is not None and engine.score("c") is not None
+    assert engine.evicted == 1
+
+
+def test_source_is_scored_across_its_credential_keys():
+    engine = engine_with()
+    engine.max_clients = 3
+    for event in range(32):
+        engine.observe("93.184.216.9|0000beef", "/", 200, 1000.0 + event)
+    assert engine.score("93.184.216.9") is None
+    assert engine.score_source("93.184.216.9")["client"] == "93.184.216.9|0000beef"
+    for client in ("b", "c", "d"):
+        engine.observe(client, "/", 200, 1100.0)
+    # Evicted keys are no longer listed for their address
+    assert engine.score_source("93.184.216.9") is None
+    assert engine._credential_keys == {}
+
+
+@pytest.mark.parametrize("settings", [{"baseline_period": 0}, {"anomaly_threshold": 1.5}, {"anomaly_threshold": "x"}])
+def test_parse_settings_rejects_invalid(settings):
+    with pytest.raises(ValueError):
+        parse_behavior_settings(settings)
+
+
+def test_middleware_keys_credentialed_clients_separately():
+    engine = engine_with()
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    client = TestClient(from_address(BehaviorMiddleware(app, engine), "93.184.216.9"))
+    client.get("/")
+    client.get("/", headers={"x-api-key": "key-1"})
+    keys = list(engine._records)
+    assert keys[0] == "93.184.216.9" and keys[1].startswith("93.184.216.9|")
+
+
+def test_middleware_survives_an_observe_failure():
+    engine = engine_with()
+
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    engine.observe = broken
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    assert TestClient(BehaviorMiddleware(app, engine)).get("/").status_code == 204
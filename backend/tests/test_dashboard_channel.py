@@ -0,0 +1,14 @@
+from fastapi.testclient import TestClient
+
+
+def test_malformed_commands_get_an_error_and_keep_the_channel_open(main_app):
+    client = TestClient(main_app.app)
+    with client.websocket_connect("/ws/dashboard?topics=defense") as websocket:
+        assert websocket.receive_json()["topic"] == "defense"
+        for command in ("[1, 2]", '"subscribe"', "null", "{not json"):
+            websocket.send_text(command)
+            assert websocket.receive_json() == {"type": "error", "detail": "Commands must be JSON objects"}
+        websocket.send_json({"action": "dance", "topics": ["defense"]})
+        assert websocket.receive_json() == {"type": "error", "detail": "Unknown action: dance"}
+        websocket.send_json({"action": "resync", "topics": ["defense"]})
+        assert websocket.receive_json()["topic"] == "defense"
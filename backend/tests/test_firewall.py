@@ -0,0 +1,181 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import from_address
+from firewall import ALLOW, DENY, Firewall, RuleTable, is_learnable, parse_cidr
+
+PUBLIC_V4 = "93.184.216.34"
+PUBLIC_V6 = "2606:2800:220:1:248:1893:25c8:1946"
+
+
+def firewall_with(rules, strict_mode=False, **kwargs) -> Firewall:
+    firewall = Firewall(**kwargs)
+    firewall.configure(True, 0, strict_mode, True, 0.8)
+    firewall.replace_rules(RuleTable.build(rules))
+    return firewall
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10.1.2.3/8", "10.0.0.0/8"),
+    ("192.168.1.77", "192.168.1.77/32"),
+    ("0.0.0.0/0", "0.0.0.0/0"),
+    ("2001:db8::1/32", "2001:db8::/32"),
+    ("2001:DB8:0:0:0:0:0:1", "2001:db8::1/128"),
+    ("::/0", "::/0"),
+])
+def test_parse_cidr_normalizes(text, expected):
+    assert parse_cidr(text)[0] == expected
+
+
+@pytest.mark.parametrize("text", ["10.0.0.0/33", "1.2.3/24", "::1/129", "10.0.0.0/-1", "host", "", "10.0.0.0/x"])
+def test_parse_cidr_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_cidr(text)
+
+
+def test_longest_prefix_wins():
+    firewall = firewall_with([
+        {"cidr": "10.0.0.0/8", "action": "deny"},
+        {"cidr": "10.1.0.0/16", "action": "allow"},
+        {"cidr": "10.1.2.0/24", "action": "deny"},
+        {"cidr": "10.1.2.3/32", "action": "allow"},
+    ])
+    assert firewall.decide("10.9.9.9") == DENY
+    assert firewall.decide("10.1.9.9") == ALLOW
+    assert firewall.decide("10.1.2.4") == DENY
+    assert firewall.decide("10.1.2.3") == ALLOW
+    assert firewall.decide("11.0.0.1") == ALLOW
+
+
+def test_prefix_boundaries():
+    firewall = firewall_with([{"cidr": "172.16.0.0/12", "action": "deny"}])
+    assert firewall.decide("172.16.0.0") == DENY
+    assert firewall.decide("172.31.255.255") == DENY
+    assert firewall.decide("172.15.255.255") == ALLOW
+    assert firewall.decide("172.32.0.0") == ALLOW
+
+
+def test_default_route_and_strict_mode():
+    assert firewall_with([{"cidr": "0.0.0.0/0", "action": "deny"}]).decide("8.8.8.8") == DENY
+    strict = firewall_with([{"cidr": "8.8.8.0/24", "action": "allow"}], strict_mode=True)
+    assert strict.decide("8.8.8.8") == ALLOW
+    assert strict.decide("8.8.4.4") == DENY
+    assert strict.decide("not-an-ip") == DENY
+
+
+def test_ipv6_rules_are_separate_from_ipv4():
+    firewall = firewall_with([
+        {"cidr": "2001:db8::/32", "action": "deny"},
+        {"cidr": "2001:db8:1::/48", "action": "allow"},
+        {"cidr": "::/0", "action": "deny"},
+    ])
+    assert firewall.decide("2001:db8:2::1") == DENY
+    assert firewall.decide("2001:db8:1:ffff::1") == ALLOW
+    assert firewall.decide("2001:db9::1") == DENY
+    # ::/0 covers IPv6 only
+    assert firewall.decide("1.2.3.4") == ALLOW
+
+
+def test_removing_a_rule_falls_back_to_the_shorter_prefix():
+    firewall = firewall_with([
+        {"cidr": "10.0.0.0/8", "action": "deny"},
+        {"cidr": "10.1.0.0/16", "action": "allow"},
+    ])
+    assert firewall.decide("10.1.0.1") == ALLOW
+    assert firewall.remove_rule("10.1.0.0/16")
+    assert firewall.decide("10.1.0.1") == DENY
+    assert not firewall.remove_rule("10.1.0.0/16")
+
+
+@pytest.mark.parametrize("ip", [
+    "127.0.0.1", "10.0.0.5", "172.16.3.4", "192.168.1.10", "169.254.1.1", "0.0.0.0",
+    "::1", "fe80::1", "fd00::1", "::ffff:127.0.0.1", "::ffff:10.0.0.1", "224.0.0.1", "testclient", ""
+])
+def test_non_public_sources_are_never_learned(ip):
+    assert not is_learnable(ip)
+    assert firewall_with([]).learn(ip) is None
+
+
+def test_learned_rules_expire():
+    firewall = firewall_with([], learn_ttl=60)
+    rule = firewall.learn(PUBLIC_V4)
+    assert rule["source"] == "auto_learn" and rule["cidr"] == f"{PUBLIC_V4}/32"
+    assert firewall.decide(PUBLIC_V4) == DENY
+    assert firewall.expire(time.time() + 30) == 0
+    assert firewall.expire(time.time() + 61) == 1
+    assert firewall.decide(PUBLIC_V4) == ALLOW
+    assert firewall.rules() == []
+
+
+def test_learned_rules_skip_management_requests_and_lose_to_allow_rules():
+    firewall = firewall_with([])
+    assert firewall.learn(PUBLIC_V6) is not None
+    assert firewall.admit(PUBLIC_V6) == "denied"
+    assert firewall.admit(PUBLIC_V6, management=True) is None
+    firewall.add_rule({"cidr": "2606:2800::/32", "action": "allow"})
+    assert firewall.decide(PUBLIC_V6) == ALLOW
+
+
+def test_manual_deny_rules_still_apply_to_management_requests():
+    firewall = firewall_with([{"cidr": "93.184.216.0/24", "action": "deny"}])
+    assert firewall.admit(PUBLIC_V4, management=True) == "denied"
+
+
+def test_learned_rules_survive_a_reload_with_their_expiry():
+    firewall = firewall_with([{"cidr": "10.0.0.0/8", "action": "deny"}], learn_ttl=60)
+    learned = firewall.learn(PUBLIC_V4)
+    restored = firewall_with(firewall.rules(), learn_ttl=3600)
+    assert {rule["cidr"] for rule in restored.rules()} == {"10.0.0.0/8", f"{PUBLIC_V4}/32"}
+    assert restored.rules()[-1]["expires"] == learned["expires"]
+    assert restored.expire(time.time() + 61) == 1
+
+
+def test_expired_learned_rules_are_dropped_on_load():
+    stale = {"cidr": PUBLIC_V4, "action": "deny", "source": "auto_learn", "expires": "2000-01-01T00:00:00"}
+    assert firewall_with([stale]).rules() == []
+
+
+def test_learned_rules_are_capped_oldest_first():
+    firewall = firewall_with([], max_learned=2)
+    for ip in ("93.184.216.1", "93.184.216.2", "93.184.216.3"):
+        firewall.learn(ip)
+    assert [rule["cidr"] for rule in firewall.rules()] == ["93.184.216.2/32", "93.184.216.3/32"]
+    assert firewall.decide("93.184.216.1") == ALLOW
+
+
+def flood(client: TestClient, path: str, count: int):
+    return [client.get(path).status_code for _ in range(count)]
+
+
+def test_rate_limited_loopback_client_is_never_locked_out(main_app):
+    main_app.rate_limiter.configure(True, 5, adaptive=True)
+    client = TestClient(from_address(main_app.app, "127.0.0.1"))
+    statuses = flood(client, "/", 30)
+    assert 429 in statuses and 403 not in statuses
+    assert main_app.firewall.rules() == []
+
+
+def test_rate_limited_public_client_is_learned_but_keeps_management_access(main_app):
+    main_app.rate_limiter.configure(True, 5, adaptive=True)
+    client = TestClient(from_address(main_app.app, "93.184.216.99"))
+    statuses = flood(client, "/", 30)
+    assert 403 in statuses
+    assert [rule["cidr"] for rule in main_app.firewall.rules()] == ["93.184.216.99/32"]
+    assert client.get("/api/defense/firewall/rules").status_code != 403
+
+
+def test_whitelisted_client_is_never_learned(main_app):
+    main_app.rate_limiter.configure(True, 5, adaptive=True, whitelist=frozenset({"93.184.216.98"}))
+    main_app.learn_source("93.184.216.98", 1.0, "test")
+    assert main_app.firewall.rules() == []
+
+
+def test_denied_source_is_refused_by_the_middleware(main_app):
+    main_app.firewall.add_rule({"cidr": "93.184.216.0/24", "action": "deny"})
+    client = TestClient(from_address(main_app.app, "93.184.216.20"))
+    response = client.get("/")
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Blocked by firewall"}
+    assert TestClient(from_address(main_app.app, "93.184.217.20")).get("/").status_code == 200
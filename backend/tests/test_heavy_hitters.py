@@ -0,0 +1,144 @@
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+import heavy_hitters
+from conftest import from_address
+from heavy_hitters import CountMinSketch, SpaceSaving, TopTalkers
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1_000_000.0)
+    monkeypatch.setattr(heavy_hitters.time, "time", clock)
+    return clock
+
+
+def zipf_stream(keys: int, length: int, seed: int = 7):
+    generator = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    return generator.choices([f"key-{rank}" for rank in range(keys)], weights, k=length)
+
+
+def test_count_min_sketch_never_undercounts():
+    stream = zipf_stream(2000, 20000)
+    sketch = CountMinSketch(width=512, depth=4)
+    for key in stream:
+        sketch.add(key)
+    truth = Counter(stream)
+    errors = [sketch.estimate(key) - count for key, count in truth.items()]
+    assert min(errors) >= 0
+    # Conservative update keeps the average overestimate well under N / width
+    assert sum(errors) / len(errors) < len(stream) / sketch.width
+    assert sketch.estimate("never-seen") <= len(stream) / sketch.width * 4
+
+
+def test_count_min_sketch_width_is_a_power_of_two_and_clear_resets():
+    sketch = CountMinSketch(width=1000, depth=3)
+    assert sketch.width == 1024
+    sketch.add("a")
+    sketch.clear()
+    assert sketch.estimate("a") == 0
+
+
+def test_space_saving_evicts_the_lowest_count():
+    top = SpaceSaving(capacity=3)
+    for key in "aaabbc":
+        top.add(key)
+    top.add("d")
+    # "c" (count 1) is replaced; "d" takes over its count plus one, recorded as its error
+    assert top.counts == {"a": 3, "b": 2, "d": 2}
+    assert top.errors["d"] == 1
+    assert top.min_count == 2
+    # Ties in the lowest bucket go to the key that reached it first
+    top.add("e")
+    assert top.counts == {"a": 3, "d": 2, "e": 3}
+    assert top.errors["e"] == 2
+    assert sum(top.counts.values()) == 8
+
+
+def test_space_saving_error_bounds():
+    stream = zipf_stream(500, 10000)
+    capacity = 50
+    top = SpaceSaving(capacity)
+    for key in stream:
+        top.add(key)
+    truth = Counter(stream)
+    assert len(top.counts) == capacity
+    assert sum(top.counts.values()) == len(stream)
+    for key, count in top.counts.items():
+        assert count - top.errors[key] <= truth[key] <= count
+        assert top.errors[key] <= len(stream) // capacity
+    # Every key more frequent than N / capacity is kept
+    for key, count in truth.items():
+        if count > len(stream) / capacity:
+            assert key in top.counts
+    assert top.min_count == min(top.counts.values())
+
+
+def test_window_rotation_drops_old_slices(clock):
+    tracker = TopTalkers(window_seconds=60, slices=6, width=256, depth=3, capacity=8)
+    rotations = []
+    tracker.on_rotate = lambda: rotations.append(clock.now)
+    for _ in range(5):
+        tracker.record("ips", "93.184.216.1", clock.now)
+    clock.now += 10
+    tracker.record("ips", "93.184.216.2", clock.now)
+    assert len(rotations) == 1
+    assert tracker.estimate("ips", "93.184.216.1") == 5
+    assert tracker.estimate("ips", "93.184.216.1", window=10) == 0
+    result = tracker.top("ips")
+    assert result["total"] == 6
+    assert [entry["key"] for entry in result["top"]] == ["93.184.216.1", "93.184.216.2"]
+    # Past the window every slice has been cleared
+    clock.now += 60
+    assert tracker.estimate("ips", "93.184.216.1") == 0
+    assert tracker.top("ips") == {"dimension": "ips", "window": 60.0, "total": 0, "top": []}
+    assert len(rotations) == 2
+
+
+def test_window_query_sums_slices(clock):
+    tracker = TopTalkers(window_seconds=30, slices=3, width=256, depth=3, capacity=8)
+    for step in range(3):
+        tracker.record("paths", "/api/logs", clock.now)
+        tracker.record("paths", "/api/logs", clock.now)
+        tracker.record("paths", f"/other/{step}", clock.now)
+        clock.now += 10
+    clock.now -= 10
+    assert tracker.top("paths", limit=1)["top"] == [{"key": "/api/logs", "count": 6, "share": round(6 / 9, 4)}]
+    assert tracker.top("paths", limit=1, window=10)["top"][0]["count"] == 2
+
+
+def test_middleware_counts_clients_and_paths(main_app):
+    client = TestClient(from_address(main_app.app, "93.184.216.55"))
+    for _ in range(3):
+        client.get("/api/defense/firewall")
+    assert main_app.top_talkers.estimate("ips", "93.184.216.55") >= 3
+    assert main_app.top_talkers.estimate("paths", "/api/defense/firewall") >= 3
+
+
+def test_top_talker_learning_skips_non_public_sources(main_app, monkeypatch):
+    monkeypatch.setattr(main_app, "TOP_TALKER_LEARN_THRESHOLD", 5)
+    for ip in ("127.0.0.1", "10.0.0.8", "93.184.216.56"):
+        for _ in range(10):
+            main_app.top_talkers.record("ips", ip)
+
+    async def rotate():
+        # Runs on the loop in the app: learned rules are counted with loop timers
+        main_app.learn_top_talkers()
+
+    asyncio.run(rotate())
+    learned = {rule["cidr"] for rule in main_app.firewall.rules()}
+    assert "93.184.216.56/32" in learned
+    assert not learned & {"127.0.0.1/32", "10.0.0.8/32"}
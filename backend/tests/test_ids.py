@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import from_address
+from ids import PercentDecoder, compile_signatures
+
+
+def matcher_for(*patterns, **fields):
+    return compile_signatures([dict(fields, id=pattern, pattern=pattern) for pattern in patterns])
+
+
+def matches(matcher, *chunks) -> set:
+    """Signature ids matched in one field fed as `chunks`"""
+    matched = set()
+    state = matcher.start
+    for chunk in chunks:
+        state = matcher.scan(chunk, state, matched)
+    matcher.end(state, matched)
+    return {matcher.signatures[index]["id"] for index in matched}
+
+
+def test_overlapping_and_nested_matches():
+    matcher = matcher_for("he", "she", "his", "hers", word_boundary=False)
+    assert matches(matcher, b"ushers") == {"he", "she", "hers"}
+    matcher = matcher_for("abcd", "bcd", "cd", "bc", word_boundary=False)
+    assert matches(matcher, b"xabcdx") == {"abcd", "bcd", "cd", "bc"}
+
+
+def test_matching_is_case_insensitive():
+    matcher = matcher_for("<script>", "Union Select")
+    assert matches(matcher, b"a<ScRiPt>b") == {"<script>"}
+    assert matches(matcher, b"1 UNION SELECT 2") == {"Union Select"}
+    assert matches(matcher, b"1 union  select 2") == set()
+
+
+def test_matches_span_chunks():
+    matcher = matcher_for("' or '1'='1")
+    assert matches(matcher, b"x' OR", b" '1", b"'='1") == {"' or '1'='1"}
+
+
+def test_short_patterns_match_whole_words_only():
+    matcher = matcher_for("ORA-", "union")
+    assert matches(matcher, b"category=explora-x") == set()
+    assert matches(matcher, b"ORA-00933: SQL command not properly ended") == {"ORA-"}
+    assert matches(matcher, b"error: ora-01756") == {"ORA-"}
+    assert matches(matcher, b"reunions") == set()
+    assert matches(matcher, b"1 union select") == {"union"}
+    # Field edges count as boundaries, also across chunks
+    assert matches(matcher, b"uni", b"on") == {"union"}
+    assert matches(matcher, b"uni", b"ons") == set()
+
+
+def test_word_boundary_can_be_turned_off():
+    matcher = matcher_for("ORA-", word_boundary=False)
+    assert matches(matcher, b"explora-x") == {"ORA-"}
+    long_pattern = compile_signatures([{"id": "long", "pattern": "onerror="}])
+    assert long_pattern.signatures[0]["word_boundary"] is False
+    assert matches(long_pattern, b"img.onerror=x") == {"long"}
+
+
+def test_percent_decoder_holds_back_split_escapes():
+    decoder = PercentDecoder()
+    assert decoder.decode(b"%27%2") == b"'"
+    assert decoder.decode(b"0OR+1") == b" OR 1"
+
+
+@pytest.fixture
+def ids_client(main_app):
+    return TestClient(from_address(main_app.app, "93.184.216.77"))
+
+
+def test_benign_requests_are_not_blocked(main_app, ids_client):
+    blocked = main_app.ids.blocked
+    ndjson = json.dumps({"client": "93.184.216.10", "path": "/login?u=admin' --", "status": 401}) + "\n"
+    responses = [
+        ids_client.post("/api/ai/analyze", json={
+            "attack_type": "sql_injection", "target_url": "http://postgresql.example.com"
+        }),
+        ids_client.get("/api/logs", params={"category": "explora-x"}),
+        ids_client.post("/api/ai/analyze/batch", json=[{"attack_type": "sql_injection", "payload": "' OR '1'='1"}]),
+        ids_client.post(
+            "/api/defense/behavior/events", content=ndjson, headers={"content-type": "application/x-ndjson"}
+        ),
+    ]
+    for response in responses:
+        assert response.status_code != 403, response.request.url
+    assert main_app.ids.blocked == blocked
+
+
+def test_dashboard_api_is_not_scanned(main_app, ids_client):
+    """The dashboard searches and submits the payloads this tool generates"""
+    blocked = main_app.ids.blocked
+    assert ids_client.get("/api/logs", params={"search": "' OR '1'='1"}).status_code != 403
+    assert ids_client.get("/api/attacks/history", params={"attack_type": "<script>alert('XSS')</script>"}).status_code != 403
+    for path in ("/api/attacks/simulate", "/api/logs/stream", "/api/statistics/top", "/api/ai/recommendations"):
+        assert main_app.ids.start({"type": "http", "path": path, "query_string": b"q=%27+OR+%271%27%3D%271"}) is None
+    assert main_app.ids.blocked == blocked
+
+
+def test_attack_in_query_is_still_blocked(main_app, ids_client):
+    response = ids_client.get("/api/defense/status", params={"q": "' OR '1'='1"})
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Blocked by intrusion detection"}
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from job_scheduler import JobScheduler, SchedulerFull
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 2))
+
+
+def test_priority_order_and_type_caps():
+    async def scenario():
+        scheduler = JobScheduler(workers=1, type_limits={"ddos": 1})
+        started = []
+        release = asyncio.Event()
+
+        def job(name):
+            async def body():
+                started.append(name)
+                await release.wait()
+            return body
+
+        scheduler.submit("first", "scan", job("first"))
+        scheduler.submit("low", "scan", job("low"), priority=0)
+        scheduler.submit("high", "scan", job("high"), priority=5)
+        assert scheduler.queue_position("high") == 1 and scheduler.queue_position("low") == 2
+        release.set()
+        while scheduler.running or scheduler.queued:
+            await asyncio.sleep(0.001)
+        return started, scheduler.stats()
+
+    started, stats = run(scenario())
+    assert started == ["first", "high", "low"]
+    assert stats["completed"] == 3 and stats["failed"] == 0
+
+
+def test_busy_type_does_not_stall_others():
+    async def scenario():
+        scheduler = JobScheduler(workers=2, type_limits={"ddos": 1})
+        blocker = asyncio.Event()
+        scheduler.submit("ddos-1", "ddos", blocker.wait)
+        scheduler.submit("ddos-2", "ddos", blocker.wait)
+        scheduler.submit("xss-1", "xss", blocker.wait)
+        await asyncio.sleep(0)
+        running = sorted(job_id for job_id, job in scheduler.jobs.items() if job.state == "running")
+        await scheduler.stop()
+        return running
+
+    assert run(scenario()) == ["ddos-1", "xss-1"]
+
+
+def test_full_queue_rejects():
+    async def scenario():
+        scheduler = JobScheduler(workers=0, max_queue=1)
+        scheduler.submit("a", "x", asyncio.sleep)
+        with pytest.raises(SchedulerFull):
+            scheduler.submit("b", "x", asyncio.sleep)
+        return scheduler.rejected
+
+    assert run(scenario()) == 1
+
+
+def test_failures_and_timeouts_are_reported():
+    async def scenario():
+        scheduler = JobScheduler()
+        reported = []
+        scheduler.on_error = lambda job, message: reported.append((job.job_id, message))
+
+        async def broken():
+            raise RuntimeError("target unreachable")
+
+        scheduler.submit("broken", "x", broken)
+        scheduler.submit("slow", "x", lambda: asyncio.sleep(10), timeout=0.01)
+        while scheduler.running:
+            await asyncio.sleep(0.005)
+        return reported, scheduler.stats()
+
+    reported, stats = run(scenario())
+    assert reported == [
+        ("broken", "Job broken failed: target unreachable"),
+        ("slow", "Job slow exceeded its deadline (0.01s); cancelling"),
+    ]
+    assert stats["failed"] == 2 and stats["timed_out"] == 1
+
+
+def test_cleared_deadline_lets_the_job_finish():
+    async def scenario():
+        scheduler = JobScheduler()
+
+        async def attack():
+            await asyncio.sleep(0.01)
+            # Execution is over: the analysis that follows is not bounded by the job deadline
+            scheduler.clear_deadline("attack")
+            scheduler.cancel("attack", grace=0.001)
+            await asyncio.sleep(0.05)
+            return "analyzed"
+
+        job = scheduler.submit("attack", "x", attack, timeout=0.03)
+        return await job.task, scheduler.stats()
+
+    result, stats = run(scenario())
+    assert result == "analyzed"
+    assert stats["timed_out"] == 0 and stats["completed"] == 1
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from json_stream import JSONStreamParser, extract_json
+
+ANSWER = {
+    "recommendations": ["Enable WAF rules", "Rate limit /login, \"strictly\"", {"step": [1, 2]}, 42, True],
+    "priority": "High",
+    "mechanisms_to_enable": ["ids"],
+}
+COMPLETION = "Here is my answer:\n```json\n" + json.dumps(ANSWER, indent=2) + "\n```\nHope that helps [1]."
+
+
+def feed_in_chunks(text: str, size: int):
+    parser = JSONStreamParser("recommendations")
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return parser, items
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10000])
+def test_items_are_emitted_whatever_the_chunk_boundaries(size):
+    parser, items = feed_in_chunks(COMPLETION, size)
+    assert items == ANSWER["recommendations"]
+    assert parser.done
+    assert parser.result() == ANSWER
+
+
+def test_each_item_is_emitted_as_soon_as_it_is_complete():
+    parser = JSONStreamParser("recommendations")
+    assert parser.feed('{"priority": "Low", "recommendations": ["a", "b') == ["a"]
+    assert parser.feed('"') == ["b"]
+    assert parser.feed(', 1') == []
+    assert parser.feed('2]') == [12]
+    assert parser.feed(', "other": ["x"]}') == []
+    assert parser.result() == {"priority": "Low", "recommendations": ["a", "b", 12], "other": ["x"]}
+
+
+def test_only_the_top_level_key_is_tracked():
+    parser = JSONStreamParser("recommendations")
+    text = '{"nested": {"recommendations": ["no"]}, "notes": "recommendations", "recommendations": ["yes"]}'
+    assert parser.feed(text) == ["yes"]
+
+
+def test_incomplete_value_raises():
+    parser, items = feed_in_chunks('{"recommendations": ["a", "b"', 5)
+    assert items == ["a", "b"] and not parser.done
+    with pytest.raises(json.JSONDecodeError):
+        parser.result()
+    with pytest.raises(json.JSONDecodeError):
+        JSONStreamParser().result()
+
+
+def test_text_after_the_value_is_ignored():
+    parser = JSONStreamParser()
+    parser.feed('[1, 2] and then {"more": true}')
+    assert parser.result() == [1, 2]
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('Sure! {"a": [1, {"b": "}"}]} trailing', {"a": [1, {"b": "}"}]}),
+    ('See [1] below.\n```json\n{"a": 1}\n```', {"a": 1}),
+    ('Notes {x}\n```\n[{"a": 1}]\n```\nmore', [{"a": 1}]),
+])
+def test_extract_json(content, expected):
+    assert extract_json(content) == expected
+
+
+def test_extract_json_without_a_value_raises():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json("no json here")
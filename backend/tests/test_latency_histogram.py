@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from latency_histogram import (
+    BUCKET_COUNT, LatencyHistogram, LatencyTracker, WindowedHistogram, bucket_index, bucket_upper_bound
+)
+
+
+def test_every_value_falls_below_its_bucket_upper_bound():
+    generator = random.Random(3)
+    values = [generator.lognormvariate(3, 3) for _ in range(5000)] + [0.002, 1.0, 1.5, 1000.0]
+    for value in (value for value in values if 0.002 <= value <= 1e6):
+        index = bucket_index(value)
+        assert 0 < index < BUCKET_COUNT - 1
+        assert bucket_upper_bound(index - 1) <= value < bucket_upper_bound(index)
+        # Buckets are at most ~1/16 of their value wide
+        assert bucket_upper_bound(index) - bucket_upper_bound(index - 1) <= value / 16 + 1e-12
+
+
+def test_bucket_edges_belong_to_the_next_bucket():
+    for index in (100, 160, 161, 175, 176, 300):
+        edge = bucket_upper_bound(index)
+        assert bucket_index(edge) == index + 1
+        assert bucket_index(edge * (1 - 1e-12)) == index
+
+
+def test_out_of_range_values_are_clamped():
+    assert bucket_index(0) == bucket_index(-5) == bucket_index(1e-9) == 0
+    assert bucket_index(1e12) == BUCKET_COUNT - 1
+
+
+def test_percentiles_are_upper_bounds_capped_at_the_max():
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(float(value))
+    result = histogram.percentiles()
+    assert result["count"] == 100 and result["max"] == 100.0
+    for name, exact in (("p50", 50), ("p95", 95), ("p99", 99)):
+        assert exact <= result[name] <= exact * 1.0625
+    single = LatencyHistogram()
+    single.record(7.0)
+    assert single.percentiles() == {"p50": 7.0, "p95": 7.0, "p99": 7.0, "max": 7.0, "count": 1}
+    assert LatencyHistogram().percentiles() == {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "count": 0}
+
+
+def test_merge_and_state_round_trip():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for value in (1.0, 2.0, 3.0):
+        first.record(value)
+    second.record(500.0)
+    first.merge(second)
+    restored = LatencyHistogram()
+    restored.load_state(first.to_state())
+    assert restored.count == 4 and restored.max == 500.0
+    assert restored.percentiles() == first.percentiles()
+
+
+def test_windows_expire():
+    windowed = WindowedHistogram(window_seconds=10, windows=3)
+    windowed.record(5.0, now=100.0)
+    windowed.record(50.0, now=125.0)
+    assert windowed.merged(now=125.0).count == 2
+    # 100 is in window 10; at 130 the live windows are 11..13
+    assert windowed.merged(now=130.0).count == 1
+    windowed.record(1.0, now=130.0)
+    assert windowed.merged(now=130.0).max == 50.0
+
+
+def test_tracker_bounds_its_keys():
+    tracker = LatencyTracker(max_keys=2)
+    for key in ("ddos", "xss", "made-up-1", "made-up-2"):
+        tracker.record(key, 10.0)
+    assert set(tracker.histograms) == {"ddos", "xss", "other"}
+    assert tracker.percentiles("other")["count"] == 2
+    assert tracker.percentiles("made-up-1") is None
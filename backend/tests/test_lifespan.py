@@ -0,0 +1,31 @@
+import logging
+import warnings
+
+from fastapi.testclient import TestClient
+
+
+def test_lifespan_starts_and_stops_the_app(main_app):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        with TestClient(main_app.app) as client:
+            assert main_app.ai_analyzer._client is not None
+            assert client.get("/").status_code == 200
+    assert main_app.ai_analyzer._client is None
+
+
+def test_invalid_stored_state_is_logged_and_skipped(main_app, monkeypatch, caplog):
+    stored = {
+        "firewall_rules": [{"cidr": "10.0.0.0/33", "action": "deny"}],
+        "defense_mechanisms": {"rate_limiting": {"settings": {"requests_per_minute": -1}}},
+    }
+    monkeypatch.setattr(main_app.storage, "load_state", lambda: stored)
+    monkeypatch.setattr(main_app.storage, "recent_attacks", lambda limit: [])
+    monkeypatch.setattr(main_app.storage, "recent_logs", lambda limit: [])
+    original_settings = dict(main_app.defense_mechanisms_db["rate_limiting"]["settings"])
+    with caplog.at_level(logging.WARNING, logger="main"):
+        with TestClient(main_app.app):
+            pass
+    main_app.defense_mechanisms_db["rate_limiting"]["settings"] = original_settings
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("Invalid stored firewall rules") for message in messages)
+    assert any(message.startswith("Invalid stored settings for rate_limiting") for message in messages)
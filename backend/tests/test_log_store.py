@@ -0,0 +1,74 @@
+import pytest
+
+from log_store import LogStore
+
+LEVELS = ("INFO", "WARNING", "ERROR")
+
+
+def entry(number: int) -> dict:
+    return {
+        "log_id": f"log-{number}",
+        "level": LEVELS[number % 3],
+        "category": "ATTACK" if number % 2 else "DEFENSE",
+        "message": f"message {number}",
+        "metadata": {"attack_id": f"attack-{number % 4}"} if number % 4 else {},
+    }
+
+
+def store_of(count: int, capacity: int) -> LogStore:
+    store = LogStore(capacity)
+    for number in range(count):
+        assert store.append(entry(number)) == number
+    return store
+
+
+def log_ids(entries):
+    return [item["log_id"] for item in entries]
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        LogStore(0)
+
+
+def test_ring_keeps_the_newest_entries():
+    store = store_of(10, capacity=4)
+    assert len(store) == 4
+    assert (store.first_seq, store.last_seq) == (6, 9)
+    assert log_ids(store.newest(10)) == ["log-9", "log-8", "log-7", "log-6"]
+    assert store.get(5) is None and store.get(10) is None
+    assert store.get(6)["log_id"] == "log-6"
+    assert store.seq_of("log-5") is None and store.seq_of("log-7") == 7
+
+
+def test_empty_store():
+    store = LogStore(3)
+    assert (len(store), store.first_seq, store.last_seq) == (0, 0, -1)
+    assert store.newest() == [] and list(store.iter_since(-1)) == []
+
+
+def test_indexes_follow_eviction():
+    store = store_of(20, capacity=6)
+    # Held: 14..19
+    assert log_ids(store.newest(10, level="ERROR")) == ["log-17", "log-14"]
+    assert log_ids(store.newest(10, category="ATTACK")) == ["log-19", "log-17", "log-15"]
+    assert log_ids(store.newest(10, attack_id="attack-1")) == ["log-17"]
+    assert log_ids(store.newest(10, level="WARNING", category="ATTACK")) == ["log-19"]
+    assert store.newest(10, level="DEBUG") == []
+    assert log_ids(store.newest(2, category="DEFENSE")) == ["log-18", "log-16"]
+    # Keys whose entries were all evicted are dropped from the indexes
+    assert set(store._by_attack) == {"attack-1", "attack-2", "attack-3"}
+    assert set(store_of(9, capacity=2)._by_attack) == {"attack-3"}
+    assert set(store_of(9, capacity=2)._by_level) == {"WARNING", "ERROR"}
+
+
+def test_iter_since_resumes_after_a_sequence_number():
+    store = store_of(10, capacity=4)
+    assert log_ids(store.iter_since(7)) == ["log-8", "log-9"]
+    assert list(store.iter_since(9)) == []
+    # A reader that fell behind the ring resumes at the oldest held entry
+    assert log_ids(store.iter_since(2)) == ["log-6", "log-7", "log-8", "log-9"]
+    assert log_ids(store.iter_since(-1)) == ["log-6", "log-7", "log-8", "log-9"]
+    last_seen = store.last_seq
+    store.append(entry(10))
+    assert log_ids(store.iter_since(last_seen)) == ["log-10"]
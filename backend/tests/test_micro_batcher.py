@@ -0,0 +1,60 @@
+import asyncio
+
+from micro_batcher import MicroBatcher
+
+
+def run_batch(send_batch, items, **kwargs):
+    async def run():
+        batcher = MicroBatcher(send_batch, **kwargs)
+        results = await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        return batcher, results
+
+    return asyncio.run(run())
+
+
+def test_concurrent_submits_share_one_batch():
+    sent = []
+
+    async def send_batch(items):
+        sent.append(items)
+        return [item * 2 for item in items]
+
+    batcher, results = run_batch(send_batch, [1, 2, 3, 4, 5], window=0.01, max_items=3)
+    assert results == [2, 4, 6, 8, 10]
+    assert sent == [[1, 2, 3], [4, 5]]
+    assert batcher.stats()["average_batch_size"] == 2.5
+
+
+def test_errors_reach_every_caller():
+    async def send_batch(items):
+        raise RuntimeError("provider down")
+
+    _, results = run_batch(send_batch, [1, 2], window=0.01)
+    assert [str(result) for result in results] == ["provider down", "provider down"]
+
+
+def test_wrong_number_of_results_fails_the_batch():
+    async def send_batch(items):
+        return items[:-1]
+
+    _, results = run_batch(send_batch, [1, 2, 3], window=0.01)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_send_cancels_the_callers():
+    async def run():
+        entered = asyncio.Event()
+
+        async def send_batch(items):
+            entered.set()
+            await asyncio.sleep(10)
+
+        batcher = MicroBatcher(send_batch, window=0.01)
+        callers = [asyncio.ensure_future(batcher.submit(item)) for item in (1, 2)]
+        await entered.wait()
+        for task in batcher._sending:
+            task.cancel()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(asyncio.wait_for(run(), 1))
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from provider_limiter import (
+    PRIORITY_DECISION, PRIORITY_RECOMMENDATION, ProviderLimiter, TokenBucket, backoff_delay, retry_after_seconds
+)
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(per_minute=60)
+    now = bucket.updated
+    assert bucket.capacity == 10
+    assert bucket.wait_time(10, now) == 0
+    bucket.take(10)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    # More than a bucketful only waits for a full bucket
+    assert bucket.wait_time(100, now) == pytest.approx(10.0)
+    assert bucket.wait_time(1, now + 2) == 0
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds("12") == 12.0
+    assert retry_after_seconds("-3") == 0.0
+    assert retry_after_seconds(None) is None and retry_after_seconds("soon") is None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < retry_after_seconds(later) <= 30
+
+
+def test_backoff_is_capped():
+    assert all(0 <= backoff_delay(attempt, 0.5, 4.0) <= 4.0 for attempt in range(10))
+
+
+def test_concurrency_cap_and_priority_order():
+    async def scenario():
+        limiter = ProviderLimiter("test", 0, 0, max_concurrency=1)
+        order = []
+        deadline = time.monotonic() + 1
+
+        async def call(name, priority):
+            await limiter.acquire(priority, 10, deadline)
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release()
+
+        await limiter.acquire(PRIORITY_DECISION, 10, deadline)
+        waiting = [
+            asyncio.ensure_future(call("recommendation", PRIORITY_RECOMMENDATION)),
+            asyncio.ensure_future(call("decision", PRIORITY_DECISION)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 2 and limiter.in_flight == 1
+        limiter.release()
+        await asyncio.gather(*waiting)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["decision", "recommendation"]
+    assert stats["acquired"] == 3 and stats["in_flight"] == 0
+
+
+def test_queued_request_times_out_at_its_deadline():
+    async def scenario():
+        limiter = ProviderLimiter("test", 0, 0, max_concurrency=1)
+        await limiter.acquire(PRIORITY_DECISION, 0, time.monotonic() + 1)
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(PRIORITY_DECISION, 0, time.monotonic() + 0.01)
+        limiter.release()
+        # The expired waiter is skipped and its slot is not lost
+        await limiter.acquire(PRIORITY_DECISION, 0, time.monotonic() + 0.1)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timeouts"] == 1 and stats["in_flight"] == 1
+
+
+def test_pause_holds_requests():
+    async def scenario():
+        limiter = ProviderLimiter("test", 0, 0, max_concurrency=4)
+        limiter.pause(0.05)
+        started = time.monotonic()
+        await limiter.acquire(PRIORITY_DECISION, 0, started + 1)
+        return time.monotonic() - started, limiter.stats()
+
+    waited, stats = asyncio.run(scenario())
+    assert waited >= 0.04
+    assert stats["throttled"] == 1
+
+
+def test_token_quota_delays_the_queue_head():
+    async def scenario():
+        # 600 tokens/min: a 100-token bucket refilled at 10 tokens/s
+        limiter = ProviderLimiter("test", 0, 600, max_concurrency=4)
+        deadline = time.monotonic() + 1
+        await limiter.acquire(PRIORITY_DECISION, 100, deadline)
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(PRIORITY_DECISION, 5, time.monotonic() + 0.05)
+        # Real usage was lower than the estimate: the difference goes back into the bucket
+        limiter.release(actual_tokens=20, estimated_tokens=100)
+        await limiter.acquire(PRIORITY_DECISION, 50, time.monotonic() + 0.05)
+
+    asyncio.run(scenario())
@@ -0,0 +1,141 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import rate_limiter
+from conftest import from_address
+from rate_limiter import RateLimiter, parse_rate_limit_settings
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def limiter_with(requests_per_minute: float, adaptive: bool = False, **kwargs) -> RateLimiter:
+    limiter = RateLimiter(**kwargs)
+    limiter.configure(True, requests_per_minute, adaptive=adaptive)
+    return limiter
+
+
+def test_burst_then_refill(clock):
+    limiter = limiter_with(60)
+    assert all(limiter.check("a") == 0 for _ in range(60))
+    # One token per second at 60 per minute
+    assert limiter.check("a") == pytest.approx(1.0)
+    assert limiter.check("b") == 0
+    clock.now += 1
+    assert limiter.check("a") == 0
+    assert limiter.check("a") > 0
+    assert (limiter.allowed, limiter.blocked) == (62, 2)
+
+
+def test_adaptive_debt_keeps_a_hammering_client_blocked(clock):
+    limiter = limiter_with(60, adaptive=True)
+    saturated = []
+    limiter.on_saturated = saturated.append
+    for _ in range(60):
+        limiter.check("a")
+    retries = [limiter.check("a") for _ in range(80)]
+    # Each refused request adds a second of debt, down to minus one burst
+    assert retries[0] == pytest.approx(2.0)
+    assert retries[-1] == pytest.approx(61.0)
+    assert saturated == ["a"]
+    clock.now += 30
+    assert limiter.check("a") > 0
+    clock.now += 32
+    assert limiter.check("a") == 0
+
+
+def test_without_adaptive_retry_after_does_not_grow(clock):
+    limiter = limiter_with(60)
+    for _ in range(60):
+        limiter.check("a")
+    assert {round(limiter.check("a"), 6) for _ in range(10)} == {1.0}
+
+
+def test_whitelisted_clients_are_not_counted(clock):
+    limiter = RateLimiter()
+    limiter.configure(True, 1, whitelist=frozenset({"127.0.0.1"}))
+    assert all(limiter.check("127.0.0.1") == 0 for _ in range(10))
+    assert limiter.whitelisted == 10 and limiter.clients() == 0
+
+
+def test_shard_count_is_a_power_of_two():
+    limiter = RateLimiter(shards=48, max_clients=1000)
+    assert limiter.shard_count == 64
+    assert limiter.shard_capacity == 15
+    assert limiter.stats()["max_clients"] == 960
+    assert RateLimiter(shards=1, max_clients=0).shard_capacity == 1
+
+
+def test_idle_buckets_are_swept(clock, monkeypatch):
+    monkeypatch.setattr(RateLimiter, "SWEEP_EVERY", 4)
+    limiter = limiter_with(60, shards=1)
+    limiter.check("idle")
+    # Idle for as long as it takes to climb back from the deepest debt
+    clock.now += limiter.idle_seconds + 1
+    for client in ("a", "b", "c"):
+        limiter.check(client)
+    assert limiter.clients() == 3
+    assert limiter.evicted == 1
+
+
+def test_full_shard_drops_the_fullest_buckets(clock):
+    limiter = limiter_with(60, shards=1, max_clients=8)
+    for index in range(8):
+        client = f"client-{index}"
+        # Lower-numbered clients have spent more of their burst
+        for _ in range(8 - index):
+            limiter.check(client)
+    limiter.check("new")
+    # 1/8 of the shard goes: the bucket with the most tokens left
+    assert limiter.evicted == 1
+    assert limiter.clients() == 8
+    assert "client-7" not in limiter._shards[0]
+    assert "client-0" in limiter._shards[0]
+
+
+@pytest.mark.parametrize("settings", [
+    {"requests_per_minute": 0},
+    {"requests_per_minute": "many"},
+    {"ip_whitelist": "127.0.0.1"},
+    {"ip_whitelist": [1]},
+])
+def test_parse_settings_rejects_invalid(settings):
+    with pytest.raises(ValueError):
+        parse_rate_limit_settings(settings)
+
+
+def test_parse_settings():
+    assert parse_rate_limit_settings({
+        "requests_per_minute": "30", "adaptive_threshold": True, "ip_whitelist": [" ::1 "]
+    }) == (30.0, True, frozenset({"::1"}))
+
+
+def test_default_settings_never_limit_the_local_dashboard(main_app):
+    main_app.apply_mechanism("rate_limiting")
+    assert {"127.0.0.1", "::1"} <= main_app.rate_limiter.whitelist
+    main_app.rate_limiter.configure(True, 2, whitelist=main_app.rate_limiter.whitelist)
+    client = TestClient(from_address(main_app.app, "127.0.0.1"))
+    assert {client.get("/").status_code for _ in range(10)} == {200}
+
+
+def test_dashboard_paths_are_exempt(main_app):
+    main_app.rate_limiter.configure(True, 2)
+    client = TestClient(from_address(main_app.app, "93.184.216.120"))
+    for path in ("/api/defense/status", "/api/logs", "/api/attacks/history"):
+        assert 429 not in {client.get(path).status_code for _ in range(5)}, path
+    response = [client.get("/") for _ in range(3)][-1]
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    assert response.json() == {"detail": "Rate limit exceeded"}
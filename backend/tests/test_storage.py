@@ -0,0 +1,145 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from storage import GroupCommitWriter, SQLiteStorage, StorageBackend
+
+
+class RecordingBackend(StorageBackend):
+    durable = True
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.batches = []
+        self.pruned = []
+
+    def write_batch(self, attacks, logs, state):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.batches.append((attacks, logs, state))
+
+    def prune(self, older_than):
+        self.pruned.append(older_than)
+
+
+def log(index: int):
+    return {"log_id": f"log-{index}", "timestamp": f"t{index}", "level": "info", "category": "test"}
+
+
+def written_logs(backend: RecordingBackend):
+    return [row["log_id"] for _, logs, _ in backend.batches for row in logs]
+
+
+def test_writes_are_coalesced_into_one_batch():
+    backend = RecordingBackend()
+    writer = GroupCommitWriter(backend)
+    writer.put_attack({"attack_id": "a1", "status": "running"})
+    writer.put_attack({"attack_id": "a1", "status": "completed"})
+    writer.put_attack({"attack_id": "a2", "status": "running"})
+    writer.put_state("statistics", {"total": 1})
+    writer.put_state("statistics", {"total": 2})
+    for index in range(3):
+        writer.put_log(log(index))
+    asyncio.run(writer.flush())
+    assert len(backend.batches) == 1
+    attacks, logs, state = backend.batches[0]
+    assert [(row["attack_id"], row["status"]) for row in attacks] == [("a1", "completed"), ("a2", "running")]
+    assert [row["log_id"] for row in logs] == ["log-0", "log-1", "log-2"]
+    assert state == {"statistics": json.dumps({"total": 2})}
+    assert writer.pending == 0
+
+
+def test_memory_backend_buffers_nothing():
+    writer = GroupCommitWriter(StorageBackend())
+    writer.put_log(log(0))
+    writer.put_attack({"attack_id": "a1"})
+    assert writer.pending == 0
+
+
+def test_failed_batch_is_retried_ahead_of_newer_writes():
+    backend = RecordingBackend(failures=1)
+    writer = GroupCommitWriter(backend)
+    writer.put_attack({"attack_id": "a1", "status": "running"})
+    writer.put_state("statistics", {"total": 1})
+    writer.put_log(log(0))
+    asyncio.run(writer.flush())
+    assert backend.batches == [] and writer.errors == 1 and writer.retry_delay > 0
+    # Newer versions written meanwhile win over the failed batch
+    writer.put_attack({"attack_id": "a1", "status": "completed"})
+    writer.put_state("statistics", {"total": 2})
+    writer.put_log(log(1))
+    asyncio.run(writer.flush())
+    attacks, logs, state = backend.batches[0]
+    assert [row["status"] for row in attacks] == ["completed"]
+    assert [row["log_id"] for row in logs] == ["log-0", "log-1"]
+    assert state == {"statistics": json.dumps({"total": 2})}
+    assert writer.retry_delay == 0
+
+
+def test_retries_back_off_up_to_a_limit():
+    writer = GroupCommitWriter(RecordingBackend(failures=20), flush_interval=1.0)
+    delays = []
+    for _ in range(8):
+        writer.put_log(log(0))
+        asyncio.run(writer.flush())
+        delays.append(writer.retry_delay)
+    assert delays[:6] == [1.0, 2.0, 4.0, 8.0, 16.0, 30.0]
+    assert delays[-1] == GroupCommitWriter.MAX_RETRY_DELAY
+
+
+def test_oldest_logs_are_dropped_while_storage_is_down():
+    backend = RecordingBackend(failures=3)
+    writer = GroupCommitWriter(backend, max_pending_logs=5)
+    index = 0
+    for _ in range(4):
+        for _ in range(3):
+            writer.put_log(log(index))
+            index += 1
+        asyncio.run(writer.flush())
+    assert written_logs(backend) == [f"log-{index}" for index in range(7, 12)]
+    assert writer.dropped_logs == 7
+
+
+def test_background_task_flushes_and_stops_during_backoff():
+    backend = RecordingBackend(failures=1)
+    writer = GroupCommitWriter(backend, flush_interval=0.01)
+
+    async def run():
+        writer.start()
+        writer.put_log(log(0))
+        await asyncio.sleep(0.05)
+        assert writer.errors == 1 and backend.batches == []
+        # The 0.1s backoff is cut short; the final flush writes the batch
+        await asyncio.wait_for(writer.stop(), 0.05)
+
+    asyncio.run(run())
+    assert written_logs(backend) == ["log-0"]
+
+
+def test_prune_runs_at_most_hourly():
+    backend = RecordingBackend()
+    writer = GroupCommitWriter(backend, retention_days=1)
+
+    async def run():
+        await writer._maybe_prune()
+        await writer._maybe_prune()
+
+    before = (datetime.now() - timedelta(days=1)).isoformat()
+    asyncio.run(run())
+    assert len(backend.pruned) == 1
+    assert before <= backend.pruned[0] <= (datetime.now() - timedelta(days=1)).isoformat()
+
+
+def test_sqlite_prune_drops_old_attacks_and_logs(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "store.db"))
+    storage.open()
+    writer = GroupCommitWriter(storage)
+    for day in ("2020-01-01", "2030-01-01"):
+        writer.put_attack({"attack_id": f"attack-{day}", "timestamp": day})
+        writer.put_log(dict(log(0), log_id=f"log-{day}", timestamp=day))
+    asyncio.run(writer.flush())
+    storage.prune("2025-01-01")
+    assert [attack["attack_id"] for attack in storage.recent_attacks(10)] == ["attack-2030-01-01"]
+    assert [entry["log_id"] for entry in storage.recent_logs(10)] == ["log-2030-01-01"]
+    storage.close()
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { api } from '@/lib/api';
+import { dashboardChannel, mergeDelta } from '@/lib/dashboard';
 import toast from 'react-hot-toast';
 import AttackResults from './AttackResults';
 
@@ -22,14 +23,26 @@ const AttackHistory: React.FC = () => {
   const [attacks, setAttacks] = useState<AttackHistoryItem[]>([]);
   const [loading, setLoading] = useState(true);
   const [selectedAttackId, setSelectedAttackId] = useState<string | null>(null);
-  const [filter, setFilter] = useState<string>('all'); // all, completed, running, failed
+  const [filter, setFilter] = useState<string>('all'); // all, queued, completed, running, failed, cancelled
   const [searchTerm, setSearchTerm] = useState('');
 
   useEffect(() => {
-    fetchAttackHistory();
-    // Auto-refresh every 5 seconds
-    const interval = setInterval(fetchAttackHistory, 5000);
-    return () => clearInterval(interval);
+    // Snapshots arrive on (re)connect, so reload the full page then; deltas are applied in place
+    return dashboardChannel.subscribe('attacks', (message) => {
+      if (message.type === 'snapshot') {
+        fetchAttackHistory();
+        return;
+      }
+      setAttacks((current) => {
+        const index = current.findIndex((attack) => attack.attack_id === message.key);
+        if (index === -1) {
+          return message.data.attack_id ? [message.data, ...current] : current;
+        }
+        const updated = [...current];
+        updated[index] = mergeDelta(updated[index], message.data);
+        return updated;
+      });
+    });
   }, []);
 
   const fetchAttackHistory = async () => {
@@ -49,12 +62,16 @@ const AttackHistory: React.FC = () => {
 
   const getStatusColor = (status: string) => {
     switch (status) {
+      case 'queued':
+        return 'bg-blue-100 text-blue-800 dark:bg-blue-900/20 dark:text-blue-300';
       case 'completed':
         return 'bg-green-100 text-green-800 dark:bg-green-900/20 dark:text-green-300';
       case 'running':
         return 'bg-yellow-100 text-yellow-800 dark:bg-yellow-900/20 dark:text-yellow-300';
       case 'failed':
         return 'bg-red-100 text-red-800 dark:bg-red-900/20 dark:text-red-300';
+      case 'cancelled':
+        return 'bg-orange-100 text-orange-800 dark:bg-orange-900/20 dark:text-orange-300';
       default:
         return 'bg-gray-100 text-gray-800 dark:bg-gray-700 dark:text-gray-300';
     }
@@ -62,12 +79,16 @@ const AttackHistory: React.FC = () => {
 
   const getStatusText = (status: string) => {
     switch (status) {
+      case 'queued':
+        return 'Кезекте';
       case 'completed':
         return 'Аяқталды';
       case 'running':
         return 'Жалғасуда';
       case 'failed':
         return 'Сәтсіз';
+      case 'cancelled':
+        return 'Тоқтатылды';
       default:
         return status;
     }
@@ -132,9 +153,11 @@ const AttackHistory: React.FC = () => {
               className="w-full px-3 py-2 border border-gray-300 rounded-md text-sm focus:outline-none focus:ring-primary-500 focus:border-primary-500 dark:bg-gray-700 dark:border-gray-600 dark:text-white"
             >
               <option value="all">Барлығы</option>
+              <option value="queued">Кезекте</option>
               <option value="completed">Аяқталған</option>
               <option value="running">Жалғасуда</option>
               <option value="failed">Сәтсіз</option>
+              <option value="cancelled">Тоқтатылды</option>
             </select>
           </div>
           <div>
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { api, AttackResponse } from '@/lib/api';
+import { dashboardChannel, mergeDelta } from '@/lib/dashboard';
 import toast from 'react-hot-toast';
 
 interface AttackResultsProps {
@@ -12,6 +13,13 @@ const AttackResults: React.FC<AttackResultsProps> = ({ attackId }) => {
     ai_analysis?: any; 
     block_decision?: any;
     attack_type?: string;
+    progress?: {
+      counters: Record<string, number>;
+      errors: Record<string, number>;
+      elapsed: number;
+      rate: number;
+      current_rate: number;
+    };
   } | null>(null);
   const [loading, setLoading] = useState(true);
 
@@ -30,17 +38,16 @@ const AttackResults: React.FC<AttackResultsProps> = ({ attackId }) => {
 
     if (attackId) {
       fetchAttack();
-      // Auto-refresh every 2 seconds until completed
-      const interval = setInterval(() => {
-        fetchAttack();
-        if (attack?.status === 'completed' || attack?.status === 'failed') {
-          clearInterval(interval);
+      // Receive this attack's status and results as they are pushed
+      return dashboardChannel.subscribe('attacks', (message) => {
+        if (message.type === 'snapshot') {
+          fetchAttack();
+        } else if (message.key === attackId) {
+          setAttack((current) => current && mergeDelta(current, message.data));
         }
-      }, 2000);
-
-      return () => clearInterval(interval);
+      });
     }
-  }, [attackId, attack?.status]);
+  }, [attackId]);
 
   if (loading) {
     return (
@@ -60,14 +67,28 @@ const AttackResults: React.FC<AttackResultsProps> = ({ attackId }) => {
     );
   }
 
+  const handleCancel = async () => {
+    try {
+      const response = await api.cancelAttack(attackId);
+      setAttack((current) => current && { ...current, status: response.status, message: response.message });
+      toast.success('Шабуылды тоқтату сұралды');
+    } catch (error: any) {
+      toast.error(error.response?.data?.detail || 'Шабуылды тоқтату сәтсіз аяқталды');
+    }
+  };
+
   const getStatusColor = (status: string) => {
     switch (status) {
+      case 'queued':
+        return 'bg-blue-100 text-blue-800 dark:bg-blue-900/20 dark:text-blue-300';
       case 'completed':
         return 'bg-green-100 text-green-800 dark:bg-green-900/20 dark:text-green-300';
       case 'running':
         return 'bg-yellow-100 text-yellow-800 dark:bg-yellow-900/20 dark:text-yellow-300';
       case 'failed':
         return 'bg-red-100 text-red-800 dark:bg-red-900/20 dark:text-red-300';
+      case 'cancelled':
+        return 'bg-orange-100 text-orange-800 dark:bg-orange-900/20 dark:text-orange-300';
       default:
         return 'bg-gray-100 text-gray-800 dark:bg-gray-700 dark:text-gray-300';
     }
@@ -75,12 +96,16 @@ const AttackResults: React.FC<AttackResultsProps> = ({ attackId }) => {
 
   const getStatusText = (status: string) => {
     switch (status) {
+      case 'queued':
+        return 'Кезекте';
       case 'completed':
         return 'Аяқталды';
       case 'running':
         return 'Жалғасуда';
       case 'failed':
         return 'Сәтсіз';
+      case 'cancelled':
+        return 'Тоқтатылды';
       default:
         return status;
     }
@@ -431,9 +456,19 @@ const AttackResults: React.FC<AttackResultsProps> = ({ attackId }) => {
         <h3 className="text-xl font-bold text-gray-800 dark:text-white">
           Шабуыл Нәтижелері
         </h3>
-        <span className={`px-3 py-1 rounded-full text-sm font-medium ${getStatusColor(attack.status)}`}>
-          {getStatusText(attack.status)}
-        </span>
+        <div className="flex items-center gap-2">
+          {(attack.status === 'queued' || attack.status === 'running') && (
+            <button
+              onClick={handleCancel}
+              className="px-3 py-1 rounded-lg text-sm font-medium bg-red-500 hover:bg-red-600 text-white"
+            >
+              Тоқтату
+            </button>
+          )}
+          <span className={`px-3 py-1 rounded-full text-sm font-medium ${getStatusColor(attack.status)}`}>
+            {getStatusText(attack.status)}
+          </span>
+        </div>
       </div>
 
       {/* Basic Info */}
@@ -550,11 +585,39 @@ const AttackResults: React.FC<AttackResultsProps> = ({ attackId }) => {
         </div>
       )}
 
+      {attack.status === 'queued' && (
+        <div className="bg-blue-50 dark:bg-blue-900/20 border border-blue-200 dark:border-blue-800 rounded-lg p-4">
+          <p className="text-sm text-blue-800 dark:text-blue-300">
+            🕒 Шабуыл кезекте{attack.queue_position ? ` (${attack.queue_position}-орын)` : ''}. Бос орын шыққанда басталады...
+          </p>
+        </div>
+      )}
+
       {attack.status === 'running' && (
         <div className="bg-yellow-50 dark:bg-yellow-900/20 border border-yellow-200 dark:border-yellow-800 rounded-lg p-4">
           <p className="text-sm text-yellow-800 dark:text-yellow-300">
             ⏳ Шабуыл әлі жалғасуда. Нәтижелер автоматты түрде жаңартылады...
           </p>
+          {attack.progress && (
+            <div className="mt-3 grid grid-cols-2 md:grid-cols-4 gap-2 text-sm text-yellow-900 dark:text-yellow-200">
+              {Object.entries(attack.progress.counters).map(([name, value]) => (
+                <div key={name}>
+                  <span className="opacity-75">{name}:</span> {value}
+                </div>
+              ))}
+              <div>
+                <span className="opacity-75">Уақыт:</span> {attack.progress.elapsed.toFixed(1)}s
+              </div>
+              <div>
+                <span className="opacity-75">Жылдамдық:</span> {attack.progress.current_rate.toFixed(1)}/s
+              </div>
+              {Object.entries(attack.progress.errors).map(([name, value]) => (
+                <div key={name} className="text-red-700 dark:text-red-300">
+                  <span className="opacity-75">{name}:</span> {value}
+                </div>
+              ))}
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -277,6 +277,36 @@ const DefenseControl: React.FC<DefenseControlProps> = ({ onConfigUpdate }) => {
                       </p>
                     </div>
                   </div>
+                  {mechanism.stats.requests_blocked !== undefined && (
+                    <p className="mt-2 text-sm text-gray-600 dark:text-gray-400">
+                      Блокталған сұраулар:{' '}
+                      <span className="font-bold text-red-600 dark:text-red-400">{mechanism.stats.requests_blocked}</span>
+                    </p>
+                  )}
+                  {mechanism.stats.connections_rejected !== undefined && (
+                    <p className="mt-1 text-sm text-gray-600 dark:text-gray-400">
+                      Қабылданбаған қосылымдар:{' '}
+                      <span className="font-bold text-red-600 dark:text-red-400">{mechanism.stats.connections_rejected}</span>
+                    </p>
+                  )}
+                  {mechanism.stats.threats_detected !== undefined && (
+                    <p className="mt-1 text-sm text-gray-600 dark:text-gray-400">
+                      Анықталған қауіптер:{' '}
+                      <span className="font-bold text-orange-600 dark:text-orange-400">{mechanism.stats.threats_detected}</span>
+                    </p>
+                  )}
+                  {mechanism.stats.anomalies_detected !== undefined && (
+                    <p className="mt-1 text-sm text-gray-600 dark:text-gray-400">
+                      Анықталған аномалиялар:{' '}
+                      <span className="font-bold text-orange-600 dark:text-orange-400">{mechanism.stats.anomalies_detected}</span>
+                    </p>
+                  )}
+                  {mechanism.stats.rules_learned !== undefined && (
+                    <p className="mt-1 text-sm text-gray-600 dark:text-gray-400">
+                      Үйренілген ережелер:{' '}
+                      <span className="font-bold text-blue-600 dark:text-blue-400">{mechanism.stats.rules_learned}</span>
+                    </p>
+                  )}
                 </div>
               )}
             </div>
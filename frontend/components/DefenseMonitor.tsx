@@ -1,33 +1,33 @@
 import React, { useState, useEffect } from 'react';
 import { api, DefenseStatus } from '@/lib/api';
+import { dashboardChannel, mergeDelta } from '@/lib/dashboard';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import toast from 'react-hot-toast';
 
-interface DefenseMonitorProps {
-  refreshInterval?: number;
-}
-
-const DefenseMonitor: React.FC<DefenseMonitorProps> = ({ refreshInterval = 5000 }) => {
+const DefenseMonitor: React.FC = () => {
   const [defenseStatus, setDefenseStatus] = useState<DefenseStatus | null>(null);
   const [loading, setLoading] = useState(true);
   const [history, setHistory] = useState<Array<{ timestamp: string; success_rate: number; blocked: number }>>([]);
   const [error, setError] = useState<string | null>(null);
 
+  const applyStatus = (status: DefenseStatus) => {
+    setDefenseStatus(status);
+    
+    // Update history for chart
+    setHistory((prev) => [
+      ...prev.slice(-19), // Keep last 20 points
+      {
+        timestamp: new Date(status.timestamp).toLocaleTimeString(),
+        success_rate: status.success_rate,
+        blocked: status.blocked_attacks,
+      },
+    ]);
+  };
+
   const fetchDefenseStatus = async () => {
     try {
       setError(null);
-      const status = await api.getDefenseStatus();
-      setDefenseStatus(status);
-      
-      // Update history for chart
-      setHistory((prev) => [
-        ...prev.slice(-19), // Keep last 20 points
-        {
-          timestamp: new Date(status.timestamp).toLocaleTimeString(),
-          success_rate: status.success_rate,
-          blocked: status.blocked_attacks,
-        },
-      ]);
+      applyStatus(await api.getDefenseStatus());
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Қорғаныс статусын алу сәтсіз аяқталды');
       toast.error('Қорғаныс статусын жүктеу сәтсіз аяқталды');
@@ -38,9 +38,13 @@ const DefenseMonitor: React.FC<DefenseMonitorProps> = ({ refreshInterval = 5000
 
   useEffect(() => {
     fetchDefenseStatus();
-    const interval = setInterval(fetchDefenseStatus, refreshInterval);
-    return () => clearInterval(interval);
-  }, [refreshInterval]);
+    // Server pushes status changes; nothing is sent while the defense state is idle
+    let current: DefenseStatus | null = null;
+    return dashboardChannel.subscribe('defense', (message) => {
+      current = message.type === 'snapshot' ? message.data : current && mergeDelta(current, message.data);
+      if (current) applyStatus(current);
+    });
+  }, []);
 
   if (loading && !defenseStatus) {
     return (
@@ -4,10 +4,9 @@ import toast from 'react-hot-toast';
 
 interface LogsViewerProps {
   autoRefresh?: boolean;
-  refreshInterval?: number;
 }
 
-const LogsViewer: React.FC<LogsViewerProps> = ({ autoRefresh = true, refreshInterval = 2000 }) => {
+const LogsViewer: React.FC<LogsViewerProps> = ({ autoRefresh = true }) => {
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState<string>('all');
@@ -22,21 +21,41 @@ const LogsViewer: React.FC<LogsViewerProps> = ({ autoRefresh = true, refreshInte
     try {
       const fetchedLogs = await api.getLogs(limit, filter !== 'all' ? filter : undefined);
       setLogs(fetchedLogs);
+      return fetchedLogs;
     } catch (error: any) {
       toast.error('Логтарды алу сәтсіз аяқталды');
       console.error('Logs fetch error:', error);
+      return [];
     } finally {
       setLoading(false);
     }
   };
 
   useEffect(() => {
-    fetchLogs();
-    if (autoRefresh) {
-      const interval = setInterval(fetchLogs, refreshInterval);
-      return () => clearInterval(interval);
-    }
-  }, [filter, limit, autoRefresh, refreshInterval]);
+    let stream: EventSource | null = null;
+    let cancelled = false;
+
+    // Load the initial page once, then receive new entries over the server push stream
+    fetchLogs().then((initialLogs) => {
+      if (cancelled || !autoRefresh) return;
+      stream = api.getLogsStream({
+        level: filter !== 'all' ? filter : undefined,
+        lastId: initialLogs.length > 0 ? initialLogs[0].log_id : undefined,
+      });
+      stream.addEventListener('log', (event) => {
+        const entry: LogEntry = JSON.parse((event as MessageEvent).data);
+        setLogs((current) => [entry, ...current].slice(0, limit));
+      });
+      stream.onerror = (error) => {
+        console.error('Logs stream error:', error);
+      };
+    });
+
+    return () => {
+      cancelled = true;
+      stream?.close();
+    };
+  }, [filter, limit, autoRefresh]);
 
   useEffect(() => {
     scrollToBottom();
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { api, Statistics } from '@/lib/api';
+import { dashboardChannel, mergeDelta } from '@/lib/dashboard';
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import toast from 'react-hot-toast';
 
@@ -29,8 +30,28 @@ const StatisticsChart: React.FC<StatisticsChartProps> = ({ timeRange = '24h' })
     };
 
     fetchStatistics();
-    const interval = setInterval(fetchStatistics, 30000); // Refresh every 30 seconds
-    return () => clearInterval(interval);
+    // Totals are pushed as deltas; the time-range series is reloaded only on (re)connect
+    return dashboardChannel.subscribe('statistics', (message) => {
+      if (message.type === 'snapshot') {
+        fetchStatistics();
+        return;
+      }
+      const { rollup_points, ...delta } = message.data;
+      setStatistics((current) => {
+        if (!current) return current;
+        const merged = mergeDelta(current, delta);
+        // Update the bucket of the resolution this chart was loaded with
+        const point = current.resolution && rollup_points?.[current.resolution];
+        if (point) {
+          const series = current.time_series;
+          const last = series[series.length - 1];
+          merged.time_series = last && last.timestamp === point.timestamp
+            ? [...series.slice(0, -1), point]
+            : [...series.slice(1), point];
+        }
+        return merged;
+      });
+    });
   }, [timeRange]);
 
   if (loading) {
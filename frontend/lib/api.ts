@@ -53,6 +53,7 @@ export interface AttackRequest {
   intensity?: number;
   duration?: number;
   parameters?: Record<string, any>;
+  priority?: number;
 }
 
 export interface AttackResponse {
@@ -61,6 +62,7 @@ export interface AttackResponse {
   message: string;
   timestamp: string;
   estimated_duration?: number;
+  queue_position?: number;
 }
 
 export interface DefenseStatus {
@@ -94,7 +96,27 @@ export interface Statistics {
     attacks: number;
     blocked: number;
     latency: number;
+    latency_min?: number;
+    latency_max?: number;
   }>;
+  resolution?: string;
+  latency_percentiles?: LatencyPercentiles;
+  attack_type_latency?: Record<string, LatencyPercentiles>;
+}
+
+export interface LatencyPercentiles {
+  p50: number;
+  p95: number;
+  p99: number;
+  max: number;
+  count: number;
+}
+
+export interface TopTalkers {
+  dimension: 'ips' | 'hosts' | 'paths';
+  window: number;
+  total: number;
+  top: Array<{ key: string; count: number; share: number }>;
 }
 
 export interface DefenseMechanism {
@@ -107,6 +129,12 @@ export interface DefenseMechanism {
     blocked?: number;
     success_rate?: number;
     response_time?: number;
+    latency?: LatencyPercentiles;
+    requests_blocked?: number;
+    connections_rejected?: number;
+    rules_learned?: number;
+    threats_detected?: number;
+    anomalies_detected?: number;
   };
 }
 
@@ -138,6 +166,11 @@ export const api = {
     return response.data;
   },
 
+  async cancelAttack(attackId: string): Promise<{ attack_id: string; status: string; message: string }> {
+    const response = await apiClient.post(`/api/attacks/${attackId}/cancel`);
+    return response.data;
+  },
+
   async getAttackHistory(): Promise<AttackResponse[]> {
     const response = await apiClient.get('/api/attacks/history');
     return response.data;
@@ -164,9 +197,15 @@ export const api = {
     return response.data;
   },
 
-  async getLogsStream(): Promise<EventSource> {
+  getLogsStream(options: { level?: string; category?: string; lastId?: string } = {}): EventSource {
+    const params = new URLSearchParams();
     const token = Cookies.get('auth_token') || Cookies.get('api_key');
-    return new EventSource(`${API_URL}/api/logs/stream?token=${token}`);
+    if (token) params.append('token', token);
+    if (options.level) params.append('level', options.level);
+    if (options.category) params.append('category', options.category);
+    if (options.lastId) params.append('last_id', options.lastId);
+
+    return new EventSource(`${API_URL}/api/logs/stream?${params.toString()}`);
   },
 
   // Statistics
@@ -176,6 +215,14 @@ export const api = {
     return response.data;
   },
 
+  async getTopTalkers(dimension: 'ips' | 'hosts' | 'paths', limit?: number, window?: number): Promise<TopTalkers> {
+    const params = new URLSearchParams({ dimension });
+    if (limit) params.append('limit', limit.toString());
+    if (window) params.append('window', window.toString());
+    const response = await apiClient.get(`/api/statistics/top?${params.toString()}`);
+    return response.data;
+  },
+
   // Defense Control
   async getDefenseConfig(): Promise<DefenseConfig> {
     const response = await apiClient.get('/api/defense/config');
@@ -0,0 +1,150 @@
+// Shared WebSocket channel for dashboard snapshots and versioned deltas
+const API_URL = process.env.NEXT_PUBLIC_API_URL || process.env.API_URL || 'http://localhost:8000';
+const WS_URL = `${API_URL.replace(/^http/, 'ws')}/ws/dashboard`;
+
+export type DashboardTopic = 'defense' | 'mechanisms' | 'statistics' | 'attacks';
+
+export interface DashboardMessage {
+  type: 'snapshot' | 'delta' | 'ping' | 'error';
+  topic?: DashboardTopic;
+  version?: number;
+  key?: string;
+  data?: any;
+  timestamp?: string;
+  detail?: string;
+}
+
+type Listener = (message: DashboardMessage) => void;
+
+class DashboardChannel {
+  private socket: WebSocket | null = null;
+  private listeners: Map<DashboardTopic, Set<Listener>> = new Map();
+  private versions: Map<DashboardTopic, number> = new Map();
+  private connectedTopics: Set<DashboardTopic> = new Set();
+  private reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+  private retryDelay = 1000;
+
+  subscribe(topic: DashboardTopic, listener: Listener): () => void {
+    let topicListeners = this.listeners.get(topic);
+    const isNewTopic = !topicListeners;
+    if (!topicListeners) {
+      topicListeners = new Set();
+      this.listeners.set(topic, topicListeners);
+    }
+    topicListeners.add(listener);
+
+    if (!this.socket) {
+      this.connect();
+    } else if (this.socket.readyState === WebSocket.OPEN) {
+      // A new listener needs the current state too
+      this.send({ action: isNewTopic ? 'subscribe' : 'resync', topics: [topic] });
+      this.connectedTopics.add(topic);
+    }
+
+    return () => this.unsubscribe(topic, listener);
+  }
+
+  private unsubscribe(topic: DashboardTopic, listener: Listener) {
+    const topicListeners = this.listeners.get(topic);
+    if (!topicListeners) return;
+    topicListeners.delete(listener);
+    if (topicListeners.size > 0) return;
+
+    this.listeners.delete(topic);
+    this.versions.delete(topic);
+    this.connectedTopics.delete(topic);
+    if (this.listeners.size === 0) {
+      this.close();
+    } else {
+      this.send({ action: 'unsubscribe', topics: [topic] });
+    }
+  }
+
+  private connect() {
+    if (typeof window === 'undefined') return;
+    const topics = Array.from(this.listeners.keys());
+    this.connectedTopics = new Set(topics);
+    const socket = new WebSocket(`${WS_URL}?topics=${topics.join(',')}`);
+    this.socket = socket;
+
+    socket.onopen = () => {
+      this.retryDelay = 1000;
+      // Topics added while the socket was connecting
+      const pending = Array.from(this.listeners.keys()).filter((topic) => !this.connectedTopics.has(topic));
+      if (pending.length > 0) {
+        this.send({ action: 'subscribe', topics: pending });
+        pending.forEach((topic) => this.connectedTopics.add(topic));
+      }
+    };
+
+    socket.onmessage = (event) => {
+      this.handle(JSON.parse(event.data));
+    };
+
+    socket.onclose = () => {
+      if (this.socket !== socket) return;
+      this.socket = null;
+      this.versions.clear();
+      if (this.listeners.size > 0 && !this.reconnectTimer) {
+        this.reconnectTimer = setTimeout(() => {
+          this.reconnectTimer = null;
+          if (this.listeners.size > 0 && !this.socket) this.connect();
+        }, this.retryDelay);
+        this.retryDelay = Math.min(this.retryDelay * 2, 30000);
+      }
+    };
+  }
+
+  private close() {
+    if (this.reconnectTimer) {
+      clearTimeout(this.reconnectTimer);
+      this.reconnectTimer = null;
+    }
+    const socket = this.socket;
+    this.socket = null;
+    socket?.close();
+  }
+
+  private send(command: { action: string; topics: DashboardTopic[] }) {
+    if (this.socket?.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify(command));
+    }
+  }
+
+  private handle(message: DashboardMessage) {
+    if (!message.topic || message.version === undefined) return;
+    const topic = message.topic;
+
+    if (message.type === 'delta') {
+      const known = this.versions.get(topic);
+      if (known !== undefined && message.version <= known) return;
+      if (known !== undefined && message.version > known + 1) {
+        // Missed a delta: ask for a fresh snapshot instead of applying out of order
+        this.send({ action: 'resync', topics: [topic] });
+        return;
+      }
+    }
+
+    this.versions.set(topic, message.version);
+    this.listeners.get(topic)?.forEach((listener) => listener(message));
+  }
+}
+
+export const dashboardChannel = new DashboardChannel();
+
+// Merge a partial update into a plain object, recursing into nested objects
+export function mergeDelta<T>(target: T, data: Record<string, any>): T {
+  const merged: any = { ...target };
+  Object.entries(data).forEach(([key, value]) => {
+    const current = merged[key];
+    if (
+      value && typeof value === 'object' && !Array.isArray(value) &&
+      current && typeof current === 'object' && !Array.isArray(current)
+    ) {
+      merged[key] = mergeDelta(current, value);
+    } else {
+      merged[key] = value;
+    }
+  });
+  return merged;
+}